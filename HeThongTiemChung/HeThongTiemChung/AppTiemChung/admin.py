@@ -11,7 +11,7 @@ from django.urls import path
 from django.utils.html import mark_safe
 
 from .models import Vaccine, VaccineType, User, InjectionSite, InjectionSchedule, VaccinationRecord, Appointment, Faq, \
-    UnansweredQuestion
+    UnansweredQuestion, Notification, ChatConversation, FaqCandidate
 
 
 class AppTiemChungAdminSite(admin.AdminSite):
@@ -113,6 +113,26 @@ class UnansweredQuestionAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)
 
 
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipient', 'status', 'attempts', 'next_attempt_at', 'claimed_by', 'sent_at')
+    search_fields = ('recipient', 'subject')
+    list_filter = ('status', 'created_at')
+
+
+class ChatConversationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'last_message', 'unread_count', 'message_count', 'last_message_at')
+    search_fields = ('user__username', 'last_message')
+    ordering = ('-last_message_at',)
+
+
+class FaqCandidateAdmin(admin.ModelAdmin):
+    list_display = ('question', 'score', 'asked_count', 'unanswered_count', 'last_seen', 'status')
+    list_editable = ('status',)
+    list_filter = ('status',)
+    search_fields = ('question', 'keywords')
+    readonly_fields = ('examples', 'asked_count', 'unanswered_count', 'score', 'first_seen', 'last_seen', 'mined_at')
+
+
 admin_site.register(User, MyUserAdmin)
 
 admin_site.register(InjectionSite, InjectionSiteAdmin)
@@ -125,3 +145,6 @@ admin_site.register(Vaccine, VaccineAdmin)
 
 admin_site.register(Faq, FaqAdmin)
 admin_site.register(UnansweredQuestion, UnansweredQuestionAdmin)
+admin_site.register(Notification, NotificationAdmin)
+admin_site.register(ChatConversation, ChatConversationAdmin)
+admin_site.register(FaqCandidate, FaqCandidateAdmin)
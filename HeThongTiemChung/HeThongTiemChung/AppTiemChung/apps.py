@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ApptiemchungConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'AppTiemChung'
+
+    def ready(self):
+        from . import signals
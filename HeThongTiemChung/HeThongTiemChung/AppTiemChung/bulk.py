@@ -0,0 +1,117 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import dao, doses, notifications, slots, stats
+from .models import Appointment, VaccinationRecord
+
+
+def _lock(ids):
+    # Khóa riêng bảng Appointment rồi mới nạp kèm lịch, cơ sở, người dùng. Khóa theo thứ tự khóa chính
+    # để hai lần gọi đồng thời có ids chồng nhau không khóa chéo nhau (deadlock)
+    locked = list(Appointment.objects.select_for_update().filter(pk__in=ids).order_by('pk')
+                  .values_list('pk', flat=True))
+    appointments = dao.load_appointments().filter(pk__in=locked).order_by('pk')
+    return {appointment.pk: appointment for appointment in appointments}
+
+
+def _schedule_message(subject, verb, appointment):
+    return (
+        subject,
+        f'Your appointment on {appointment.schedule.date} at {appointment.schedule.site.name} has been {verb}.',
+        appointment.user.email,
+    )
+
+
+def bulk_confirm(ids, confirm=True):
+    """
+    Xác nhận (hoặc hủy xác nhận) nhiều lịch hẹn trong một transaction.
+    Trả về danh sách {'id', 'status'} theo đúng thứ tự ids gửi lên.
+    """
+    results = {}
+    with slots.atomic():
+        appointments = _lock(ids)
+        by_schedule = defaultdict(list)
+        for appointment in appointments.values():
+            if appointment.is_confirmed == confirm:
+                results[appointment.pk] = 'unchanged'
+            elif not confirm and appointment.is_inoculated:
+                results[appointment.pk] = 'inoculated'
+            else:
+                by_schedule[appointment.schedule_id].append(appointment)
+
+        changed = []
+        for schedule_id in sorted(by_schedule):
+            group = by_schedule[schedule_id]
+            if confirm:
+                granted = slots.reserve_slots(schedule_id, len(group))
+                for appointment in group[granted:]:
+                    results[appointment.pk] = 'sold_out'
+                group = group[:granted]
+            else:
+                slots.release_slots(schedule_id, len(group))
+            changed.extend(group)
+
+        now = timezone.now()
+        for appointment in changed:
+            appointment.is_confirmed = confirm
+            appointment.updated_date = now
+            results[appointment.pk] = 'confirmed' if confirm else 'unconfirmed'
+        Appointment.objects.bulk_update(changed, ['is_confirmed', 'updated_date'], batch_size=500)
+
+        if confirm:
+            notifications.enqueue_many([_schedule_message('Appointment Confirmed', 'confirmed', a) for a in changed])
+        else:
+            notifications.enqueue_many([_schedule_message('Appointment Cancelled', 'cancelled', a) for a in changed])
+
+    return [{'id': pk, 'status': results.get(pk, 'not_found')} for pk in ids]
+
+
+def bulk_inoculate(ids, inoculated=True):
+    results = {}
+    with transaction.atomic():
+        appointments = _lock(ids)
+        changed = []
+        for appointment in appointments.values():
+            if appointment.is_inoculated == inoculated:
+                results[appointment.pk] = 'unchanged'
+            elif inoculated and not appointment.is_confirmed:
+                results[appointment.pk] = 'not_confirmed'
+            else:
+                changed.append(appointment)
+
+        now = timezone.now()
+        for appointment in changed:
+            appointment.is_inoculated = inoculated
+            appointment.updated_date = now
+            results[appointment.pk] = 'inoculated' if inoculated else 'not_inoculated'
+        Appointment.objects.bulk_update(changed, ['is_inoculated', 'updated_date'], batch_size=500)
+        # bulk_update không gửi signal nên tự cập nhật bộ đếm thống kê
+        stats.bump(stats.COMPLETED, len(changed) if inoculated else -len(changed))
+
+        if inoculated:
+            _create_records(changed)
+
+    return [{'id': pk, 'status': results.get(pk, 'not_found')} for pk in ids]
+
+
+def _create_records(appointments):
+    if not appointments:
+        return []
+    # Khóa người dùng và đọc mũi lớn nhất của từng (người dùng, vaccine) một lần cho cả lô
+    last = doses.last_doses({(a.user_id, a.schedule.vaccine_id) for a in appointments})
+
+    records = []
+    for appointment in sorted(appointments, key=lambda a: (a.schedule.date, a.pk)):
+        key = (appointment.user_id, appointment.schedule.vaccine_id)
+        last[key] = last.get(key, 0) + 1
+        records.append(VaccinationRecord(
+            user_id=appointment.user_id,
+            vaccine_id=appointment.schedule.vaccine_id,
+            dose_number=last[key],
+            injection_date=appointment.schedule.date,
+            site_id=appointment.schedule.site_id,
+        ))
+    stats.records_created(records)
+    return VaccinationRecord.objects.bulk_create(records, batch_size=500)
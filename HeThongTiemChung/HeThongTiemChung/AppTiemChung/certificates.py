@@ -0,0 +1,148 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+PAGE_TOP = 800
+PAGE_BOTTOM = 50
+LINE_HEIGHT = 20
+# File cũ hơn ngần này mới được dọn, để không xóa file mà request khác đang trả về
+PRUNE_GRACE_SECONDS = 3600
+
+
+def cache_dir():
+    return Path(getattr(settings, 'CERTIFICATE_CACHE_DIR', Path(settings.BASE_DIR) / 'cache' / 'certificates'))
+
+
+def record_lines(records):
+    lines = []
+    for record in records:
+        vaccine_name = record.vaccine.name if record.vaccine else "Không xác định"
+        vaccine_type = record.vaccine.vaccine_type.name \
+            if record.vaccine and record.vaccine.vaccine_type else "Không xác định"
+        injection_date = record.injection_date.strftime('%Y-%m-%d')
+        lines.append(f"- {vaccine_name} ({vaccine_type}), Mũi {record.dose_number}, Ngày: {injection_date}")
+    return lines
+
+
+def single_record_lines(record):
+    return [
+        f"Vaccine: {record.vaccine.name if record.vaccine else 'N/A'}",
+        f"Dose: {record.dose_number}",
+        f"Date: {record.injection_date}",
+        f"Site: {record.site.name if record.site else 'N/A'}",
+    ]
+
+
+def build_payload(user, lines, kind='all'):
+    return {
+        'user_id': user.pk,
+        'kind': kind,
+        'name': user.get_full_name(),
+        'citizen_id': user.citizen_id,
+        'issue_date': datetime.today().strftime('%Y-%m-%d'),
+        'lines': lines,
+    }
+
+
+def render(payload):
+    """Vẽ giấy chứng nhận thành PDF, tự sang trang khi danh sách mũi tiêm dài."""
+    # reportlab chỉ cần khi thực sự vẽ PDF (cache trúng thì không), không nạp lúc khởi động
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer)
+
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(200, PAGE_TOP, "Vaccination Certificate")
+
+    p.setFont("Helvetica", 12)
+    p.drawString(50, 770, f"Name: {payload['name']}")
+    p.drawString(50, 755, f"Citizen ID: {payload['citizen_id']}")
+    p.drawString(50, 740, f"Issue Date: {payload['issue_date']}")
+
+    y = 710
+    for line in payload['lines']:
+        if y < PAGE_BOTTOM:
+            p.showPage()
+            p.setFont("Helvetica", 12)
+            y = PAGE_TOP
+        p.drawString(50, y, line)
+        y -= LINE_HEIGHT
+
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+def content_hash(payload):
+    # Ngày cấp được in trên giấy nên cũng nằm trong mã băm: bản cache chỉ dùng lại trong cùng ngày
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:32]
+
+
+def write_certificate(payload, directory=None):
+    """
+    Trả về đường dẫn PDF trong cache đĩa, chỉ vẽ lại khi nội dung đổi.
+    Tên file gồm mã băm nội dung nên hồ sơ thay đổi (hoặc sang ngày mới) sẽ tạo file mới; khi đó các bản cũ
+    của cùng người dùng và loại giấy đã quá PRUNE_GRACE_SECONDS được dọn luôn.
+    """
+    directory = Path(directory) if directory else cache_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    prefix = f"{payload['user_id']}-{payload['kind']}"
+    path = directory / f"{prefix}-{content_hash(payload)}.pdf"
+    if path.exists():
+        return str(path)
+
+    # Tên tạm riêng cho mỗi lần ghi: hai luồng cùng vẽ một giấy không ghi đè file tạm của nhau
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'{path.stem}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(render(payload))
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    prune(directory, PRUNE_GRACE_SECONDS, prefix=prefix)
+    return str(path)
+
+
+def prune(directory=None, grace_seconds=PRUNE_GRACE_SECONDS, prefix=None):
+    """
+    Xóa các bản cũ: với mỗi (người dùng, loại) chỉ giữ file mới nhất, và file tạm bị bỏ dở.
+    Chỉ xóa file đã cũ hơn `grace_seconds` để không xóa file mà request đang đọc.
+    `prefix` ("{user_id}-{kind}") giới hạn ở giấy của một người dùng. Trả về số file đã xóa.
+    """
+    directory = Path(directory) if directory else cache_dir()
+    if not directory.exists():
+        return 0
+    cutoff = time.time() - grace_seconds
+    latest, stale = {}, []
+    for path in (directory.glob(f'{prefix}-*') if prefix else directory.iterdir()):
+        try:
+            modified = path.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if path.suffix == '.tmp':
+            stale.append((path, modified))
+            continue
+        prefix = path.stem.rsplit('-', 1)[0]
+        current = latest.get(prefix)
+        if current is None or modified > current[1]:
+            if current is not None:
+                stale.append(current)
+            latest[prefix] = (path, modified)
+        else:
+            stale.append((path, modified))
+
+    removed = 0
+    for path, modified in stale:
+        if modified < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
@@ -0,0 +1,92 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .chat_backends import DatabaseBackend, get_backend, push_key
+from .models import ChatConversation, ChatMessage
+
+
+def summary_payload(conversation):
+    return {
+        'user_id': conversation.user_id,
+        'user_name': conversation.user.username,
+        'last_message': conversation.last_message,
+        'unread_count': conversation.unread_count,
+        'timestamp': int(conversation.last_message_at.timestamp() * 1000),
+    }
+
+
+def _write_after_commit(user_id, message):
+    backend = get_backend()
+    if backend is None:
+        return
+
+    def apply():
+        conversation = ChatConversation.objects.select_related('user').filter(pk=user_id).first()
+        # Backend chỉ là phụ: lỗi ghi không làm hỏng hội thoại đã lưu
+        try:
+            if message is not None:
+                backend.message(user_id, push_key(), message)
+            if conversation is not None:
+                backend.summary(user_id, summary_payload(conversation))
+        except Exception as e:
+            print(f"[CHAT] Không ghi được tin nhắn: {e}")
+
+    transaction.on_commit(apply)
+
+
+def post_message(user, text, sender=None, is_user=True):
+    """Cập nhật tóm tắt hội thoại của `user` (một câu UPDATE, tạo mới nếu chưa có) rồi ghi tin nhắn vào backend."""
+    now = timezone.now()
+    sender = sender or user.username
+    values = {
+        'last_message': text,
+        'last_sender': sender,
+        'last_is_user': is_user,
+        'last_message_at': now,
+        'message_count': F('message_count') + 1,
+        # Nhân viên trả lời nghĩa là đã đọc hội thoại
+        'unread_count': F('unread_count') + 1 if is_user else 0,
+    }
+    with transaction.atomic():
+        if not ChatConversation.objects.filter(pk=user.pk).update(**values):
+            try:
+                with transaction.atomic():
+                    ChatConversation.objects.create(
+                        user=user, last_message=text, last_sender=sender, last_is_user=is_user,
+                        last_message_at=now, message_count=1, unread_count=int(is_user),
+                    )
+            except IntegrityError:
+                # Request khác vừa tạo hội thoại này
+                ChatConversation.objects.filter(pk=user.pk).update(**values)
+        _write_after_commit(user.pk, {
+            'text': text,
+            'sender': sender,
+            'timestamp': int(now.timestamp() * 1000),
+            'is_user': is_user,
+        })
+
+
+def mark_read(user_id):
+    with transaction.atomic():
+        updated = ChatConversation.objects.filter(pk=user_id).update(unread_count=0)
+        if updated:
+            _write_after_commit(user_id, None)
+    return bool(updated)
+
+
+def inbox(unread_only=False):
+    conversations = ChatConversation.objects.select_related('user')
+    if unread_only:
+        conversations = conversations.filter(unread_count__gt=0)
+    return conversations
+
+
+def messages(user_id):
+    """
+    Lịch sử tin nhắn của một hội thoại, chỉ có khi CHAT_BACKEND='database'. Với Firebase (và memory) tin nhắn
+    không lưu trong DB, app đọc trực tiếp chats/{user_id}: trả về None.
+    """
+    if not isinstance(get_backend(), DatabaseBackend):
+        return None
+    return ChatMessage.objects.filter(user_id=user_id)
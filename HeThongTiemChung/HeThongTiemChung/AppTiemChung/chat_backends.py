@@ -0,0 +1,221 @@
+import atexit
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+
+
+class PushKeyGenerator:
+    """
+    Sinh khóa giống push() của Firebase ngay tại máy (8 ký tự thời gian + 12 ký tự ngẫu nhiên, tăng dần),
+    để ghi tin nhắn trong một lệnh update nhiều đường dẫn thay vì một request POST cho mỗi khóa.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_time = 0
+        self.last_random = [0] * 12
+
+    def __call__(self):
+        with self.lock:
+            now = int(time.time() * 1000)
+            if now == self.last_time:
+                # Cùng mili giây: tăng phần ngẫu nhiên để giữ thứ tự
+                for i in range(11, -1, -1):
+                    if self.last_random[i] != 63:
+                        self.last_random[i] += 1
+                        break
+                    self.last_random[i] = 0
+            else:
+                self.last_time = now
+                self.last_random = [random.randrange(64) for _ in range(12)]
+            stamp = []
+            for _ in range(8):
+                stamp.append(PUSH_CHARS[now % 64])
+                now //= 64
+            return ''.join(reversed(stamp)) + ''.join(PUSH_CHARS[i] for i in self.last_random)
+
+
+push_key = PushKeyGenerator()
+
+
+class MemoryBackend:
+    """Lưu trong bộ nhớ, dùng khi chạy thử / kiểm thử thay cho Firebase."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages = defaultdict(list)
+        self.summaries = {}
+
+    def message(self, user_id, key, payload):
+        with self.lock:
+            self.messages[user_id].append(dict(payload, key=key))
+
+    def summary(self, user_id, payload):
+        with self.lock:
+            self.summaries[user_id] = payload
+
+    def flush(self):
+        return 0
+
+
+class DatabaseBackend:
+    """Lưu lịch sử tin nhắn vào bảng ChatMessage (triển khai không dùng Firebase)."""
+
+    def message(self, user_id, key, payload):
+        from .models import ChatMessage
+
+        ChatMessage.objects.create(user_id=user_id, key=key, text=payload['text'], sender=payload['sender'],
+                                   is_user=payload['is_user'])
+
+    def summary(self, user_id, payload):
+        # Tóm tắt đã nằm trong ChatConversation
+        pass
+
+    def flush(self):
+        return 0
+
+
+_firebase_app = None
+_firebase_lock = threading.Lock()
+
+
+def firebase_app():
+    """
+    Khởi tạo app Firebase ở lần dùng đầu tiên (không phải lúc import views), một lần cho mỗi tiến trình.
+    firebase_admin giữ một HTTP client (requests.Session) cho mỗi app nên các lần ghi dùng lại kết nối.
+    """
+    global _firebase_app
+    if _firebase_app is None:
+        with _firebase_lock:
+            if _firebase_app is None:
+                import firebase_admin
+                from firebase_admin import credentials
+
+                try:
+                    _firebase_app = firebase_admin.get_app()
+                except ValueError:
+                    _firebase_app = firebase_admin.initialize_app(
+                        credentials.Certificate(str(settings.FIREBASE_CREDENTIALS)),
+                        {
+                            'databaseURL': settings.FIREBASE_DATABASE_URL,
+                            'httpTimeout': getattr(settings, 'FIREBASE_HTTP_TIMEOUT', 10),
+                        },
+                    )
+    return _firebase_app
+
+
+class FirebaseBackend:
+    """
+    Ghi tin nhắn vào chats/{user_id}/{key} và tóm tắt vào staff_chats/{user_id} để app đang nghe Firebase vẫn chạy.
+    Các thay đổi được gom lại và gửi bằng một lệnh update nhiều đường dẫn ở luồng nền
+    (khi đủ batch_size đường dẫn hoặc sau flush_interval giây); tóm tắt của cùng người dùng chỉ gửi bản mới nhất.
+    """
+
+    def __init__(self, batch_size=100, flush_interval=0.5, max_pending=10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.stopped = threading.Event()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='chat-firebase-writer', daemon=True)
+            self.thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+        self.flush()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                connection.close()
+
+    def _add(self, path, value):
+        with self.lock:
+            self.pending[path] = value
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.wakeup.set()
+
+    def message(self, user_id, key, payload):
+        self._add(f'chats/{user_id}/{key}', payload)
+
+    def summary(self, user_id, payload):
+        self._add(f'staff_chats/{user_id}', payload)
+
+    def flush(self):
+        with self.lock:
+            updates, self.pending = self.pending, {}
+        if not updates:
+            return 0
+        try:
+            from firebase_admin import db
+
+            db.reference('/', app=firebase_app()).update(updates)
+        except Exception as e:
+            print(f"[CHAT] Không ghi được Firebase: {e}")
+            with self.lock:
+                # Ghi lại ở lần sau; giá trị mới hơn cùng đường dẫn được giữ. Vượt max_pending thì
+                # chỉ bỏ các đường dẫn cũ nhất, không bỏ cả lô
+                retry = {path: value for path, value in updates.items() if path not in self.pending}
+                retry.update(self.pending)
+                dropped = max(len(retry) - self.max_pending, 0)
+                self.pending = dict(list(retry.items())[dropped:])
+            if dropped:
+                print(f"[CHAT] Bỏ {dropped} thay đổi cũ nhất chưa ghi được lên Firebase")
+            return 0
+        return len(updates)
+
+
+def _firebase_backend():
+    backend = FirebaseBackend(
+        batch_size=getattr(settings, 'CHAT_BACKEND_BATCH_SIZE', 100),
+        flush_interval=getattr(settings, 'CHAT_BACKEND_FLUSH_INTERVAL', 0.5),
+    )
+    backend.start()
+    return backend
+
+
+BACKENDS = {
+    'firebase': _firebase_backend,
+    'database': DatabaseBackend,
+    'memory': MemoryBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        name = getattr(settings, 'CHAT_BACKEND', 'firebase')
+        if not name:
+            return None
+        with _backend_lock:
+            if _backend is None:
+                _backend = BACKENDS[name]()
+    return _backend
+
+
+def set_backend(backend):
+    """Thay backend (ví dụ MemoryBackend trong kiểm thử); None để đọc lại theo CHAT_BACKEND."""
+    global _backend
+    _backend = backend
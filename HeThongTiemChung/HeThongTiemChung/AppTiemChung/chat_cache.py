@@ -0,0 +1,69 @@
+import hashlib
+import re
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import faq_index
+
+HITS_KEY = 'chat_response:hits'
+MISSES_KEY = 'chat_response:misses'
+
+
+def normalize(message):
+    message = unicodedata.normalize('NFC', message).lower()
+    message = re.sub(r'\s+', ' ', message).strip()
+    return message.rstrip(' ?!.')
+
+
+def version():
+    return cache.get(faq_index.VERSION_KEY, 0)
+
+
+def _key(message, version):
+    # Khóa gắn với phiên bản chỉ mục FAQ nên mọi lần sửa FAQ tự làm mất hiệu lực cache cũ
+    digest = hashlib.md5(message.encode('utf-8')).hexdigest()
+    return f"chat_response:{version}:{digest}"
+
+
+def _count(key):
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
+
+
+def is_answer(response):
+    return isinstance(response, dict) and 'answer' in response
+
+
+def lookup(message, version):
+    response = cache.get(_key(message, version))
+    _count(HITS_KEY if response is not None else MISSES_KEY)
+    return response
+
+
+def store(message, response, version):
+    """
+    `version` phải là phiên bản đọc trước khi dựng câu trả lời (cùng giá trị đã dùng cho lookup):
+    nếu FAQ được sửa trong lúc đó, câu trả lời cũ được lưu dưới khóa cũ thay vì khóa của phiên bản mới.
+    """
+    if is_answer(response):
+        timeout = getattr(settings, 'CHAT_RESPONSE_CACHE_TTL', 3600)
+    else:
+        # Câu hỏi chưa có câu trả lời được lưu ngắn hơn để FAQ mới sớm có hiệu lực
+        timeout = getattr(settings, 'CHAT_NEGATIVE_CACHE_TTL', 300)
+    cache.set(_key(message, version), response, timeout=timeout)
+
+
+def stats():
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0,
+    }
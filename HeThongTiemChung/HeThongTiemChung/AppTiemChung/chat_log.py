@@ -0,0 +1,126 @@
+import atexit
+import threading
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connection, transaction
+
+
+class LogBuffer:
+    """
+    Gom các dòng QueryLog / UnansweredQuestion trong bộ nhớ và ghi bằng bulk_create
+    khi đủ batch_size dòng hoặc sau mỗi flush_interval giây, để ai-chat không phải chờ INSERT.
+    """
+
+    def __init__(self, batch_size=100, flush_interval=2.0, max_pending=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Số dòng tối đa giữ lại trong bộ nhớ khi DB không ghi được; vượt thì bỏ các dòng cũ nhất
+        self.max_pending = max_pending or batch_size * 10
+        self.lock = threading.Lock()
+        self.query_logs = []
+        self.unanswered = []
+        self.stopped = threading.Event()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='chat-log-flusher', daemon=True)
+            self.thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+        self.flush()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                connection.close()
+
+    def add(self, query_log, unanswered=None):
+        with self.lock:
+            self.query_logs.append(query_log)
+            if unanswered is not None:
+                self.unanswered.append(unanswered)
+            full = len(self.query_logs) >= self.batch_size
+        if full:
+            # Đánh thức luồng nền thay vì ghi ngay trong request
+            self.wakeup.set()
+
+    def flush(self):
+        """Ghi các dòng đang chờ, trả về số dòng đã thực sự ghi vào DB."""
+        from .models import QueryLog, UnansweredQuestion
+
+        with self.lock:
+            query_logs, self.query_logs = self.query_logs, []
+            unanswered, self.unanswered = self.unanswered, []
+        return self._write(UnansweredQuestion, unanswered, 'unanswered') + \
+            self._write(QueryLog, query_logs, 'query_logs')
+
+    def _write(self, model, rows, attr):
+        if not rows:
+            return 0
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(rows, batch_size=self.batch_size)
+            return len(rows)
+        except (OperationalError, InterfaceError) as e:
+            # Mất kết nối DB: giữ lại cả lô để lần flush sau ghi tiếp
+            print(f"Error in chat log flush, keeping {len(rows)} rows: {e}")
+            self._requeue(attr, rows)
+            return 0
+        except Exception as e:
+            print(f"Error in chat log flush, writing rows one by one: {e}")
+
+        # Lỗi dữ liệu ở một vài dòng (vd. người dùng đã bị xóa): ghi từng dòng, chỉ bỏ các dòng lỗi
+        written = 0
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    row.save()
+                written += 1
+            except Exception as e:
+                print(f"Dropped chat log row: {e}")
+        return written
+
+    def _requeue(self, attr, rows):
+        with self.lock:
+            pending = rows + getattr(self, attr)
+            setattr(self, attr, pending[-self.max_pending:])
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = LogBuffer(
+                batch_size=getattr(settings, 'CHAT_LOG_BATCH_SIZE', 100),
+                flush_interval=getattr(settings, 'CHAT_LOG_FLUSH_INTERVAL', 2.0),
+            )
+            _buffer.start()
+    return _buffer
+
+
+def log_query(user, question, answer, unanswered=False):
+    from .models import QueryLog, UnansweredQuestion
+
+    query_log = QueryLog(user=user, question=question, answer=answer)
+    unanswered_question = UnansweredQuestion(question=question, user=user) if unanswered else None
+
+    if getattr(settings, 'CHAT_LOG_BUFFERED', True):
+        get_buffer().add(query_log, unanswered_question)
+        return
+
+    if unanswered_question is not None:
+        unanswered_question.save()
+    query_log.save()
@@ -0,0 +1,56 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def fingerprint(queryset, related=()):
+    """
+    updated_date lớn nhất và số dòng của queryset (số dòng đổi khi có bản ghi bị xóa),
+    cộng updated_date lớn nhất của các bảng danh mục nhỏ được hiển thị kèm trong response.
+    Bảng liên quan được gộp riêng từng bảng để không phải JOIN cả bảng lớn.
+    """
+    values = queryset.order_by().aggregate(last=Max('updated_date'), count=Count('pk'))
+    for model in related:
+        values[model._meta.label] = model.objects.aggregate(last=Max('updated_date'))['last']
+    stamps = [value for key, value in values.items() if key != 'count' and value is not None]
+    return max(stamps) if stamps else None, values
+
+
+def make_etag(request, values):
+    raw = f"{request.get_full_path()}|{sorted((k, str(v)) for k, v in values.items())}"
+    return f'"{hashlib.sha1(raw.encode("utf-8")).hexdigest()}"'
+
+
+def not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag in etags
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE') or '')
+    if if_modified_since is not None and last_modified is not None:
+        return int(last_modified.timestamp()) <= if_modified_since
+    return False
+
+
+class ConditionalGetMixin:
+    """
+    Trả 304 khi client đã có bản mới nhất, không serialize lại danh mục.
+    `related` là các model liên quan có dữ liệu nằm trong response (tên vaccine, cơ sở...).
+    """
+
+    def conditional_response(self, queryset, build, related=()):
+        last_modified, values = fingerprint(queryset, related)
+        etag = make_etag(self.request, values)
+        if not_modified(self.request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = build()
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Client phải hỏi lại mỗi lần, nhưng có thể dùng bản cũ nếu nhận 304
+        response['Cache-Control'] = 'private, no-cache'
+        return response
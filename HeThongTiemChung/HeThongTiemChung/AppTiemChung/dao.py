@@ -1,18 +1,20 @@
-from django.db.models import Count, Q
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
 
-from .models import VaccineType, Vaccine
+from . import geo, search
+from .models import VaccineType, Vaccine, Appointment, InjectionSchedule, InjectionSite, VaccinationRecord
 
 
 def load_vaccine(param={}):
-    q = Vaccine.objects.filter(status='Active')
-    kw = param.get('kw')
-    if kw:
-        q = q.filter(name__icontains=kw)
-
+    q = Vaccine.objects.select_related('vaccine_type').filter(status='Active')
     vaccine_type_id = param.get('vaccine_type')
     if vaccine_type_id:
         q = q.filter(vaccine_type_id=vaccine_type_id)
 
+    kw = param.get('kw')
+    if kw:
+        # Tìm qua chỉ mục toàn văn (bỏ dấu), kết quả sắp theo độ khớp
+        q = search.search_vaccines(q, kw)
+
     return q
 
 
@@ -20,3 +22,51 @@ def count_vaccine_by_type():
     return VaccineType.objects.annotate(
         count=Count('vaccine', filter=Q(vaccine__status='Active'))
     ).values('id', 'name', 'count').order_by('-count')
+
+
+def load_vaccines():
+    return Vaccine.objects.select_related('vaccine_type')
+
+
+def load_schedules():
+    return InjectionSchedule.objects.select_related('vaccine__vaccine_type', 'site')
+
+
+def load_appointments():
+    return Appointment.objects.select_related('user', 'schedule__vaccine__vaccine_type', 'schedule__site')
+
+
+def load_vaccination_records():
+    return VaccinationRecord.objects.select_related('user', 'vaccine__vaccine_type', 'site')
+
+
+def load_nearest_sites(latitude, longitude, date_from, date_to, vaccine_id=None, limit=10, precision=5):
+    """
+    Các cơ sở gần nhất còn lịch tiêm trống trong khoảng ngày, kèm `distance_km` và `next_date`.
+    Tra theo tiền tố geohash của ô chứa vị trí và 8 ô lân cận; nếu chưa đủ `limit` cơ sở
+    trong bán kính chắc chắn của ô thì lùi về độ chính xác thấp hơn (ô lớn hơn).
+    """
+    open_schedules = InjectionSchedule.objects.filter(
+        site=OuterRef('pk'), active=True, slot_count__gt=0, date__gte=date_from, date__lte=date_to,
+    )
+    if vaccine_id:
+        open_schedules = open_schedules.filter(vaccine_id=vaccine_id)
+    sites = InjectionSite.objects.filter(Exists(open_schedules), active=True).annotate(
+        next_date=Subquery(open_schedules.order_by('date').values('date')[:1])
+    )
+
+    center = geo.encode(latitude, longitude, precision)
+    nearest = []
+    for level in range(precision, 0, -1):
+        cells = geo.neighbours(center[:level])
+        prefix = Q()
+        for cell in cells:
+            prefix |= Q(geohash__startswith=cell)
+        candidates = list(sites.filter(prefix))
+        for site in candidates:
+            site.distance_km = geo.haversine(latitude, longitude, site.latitude, site.longitude)
+        candidates.sort(key=lambda site: (site.distance_km, site.pk))
+        nearest = candidates[:limit]
+        if len(nearest) == limit and nearest[-1].distance_km <= geo.cell_min_km(level, latitude):
+            return nearest
+    return nearest
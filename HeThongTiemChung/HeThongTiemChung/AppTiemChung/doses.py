@@ -0,0 +1,43 @@
+from django.db import IntegrityError, transaction
+
+
+def last_doses(pairs):
+    """
+    Khóa các người dùng liên quan rồi đọc có khóa các mũi hiện có, trả về
+    {(user_id, vaccine_id): mũi lớn nhất}. Phải gọi bên trong transaction.
+    """
+    from .models import User, VaccinationRecord
+
+    user_ids = sorted({user_id for user_id, _ in pairs})
+    vaccine_ids = {vaccine_id for _, vaccine_id in pairs}
+    # Khóa dòng User để hai lần tiêm đồng thời của cùng một người xếp hàng, kể cả khi chưa có mũi nào
+    list(User.objects.select_for_update().filter(pk__in=user_ids).order_by('pk').values_list('pk', flat=True))
+
+    doses = {}
+    existing = VaccinationRecord.objects.select_for_update() \
+        .filter(user_id__in=user_ids, vaccine_id__in=vaccine_ids) \
+        .values_list('user_id', 'vaccine_id', 'dose_number')
+    for user_id, vaccine_id, dose_number in existing:
+        key = (user_id, vaccine_id)
+        doses[key] = max(doses.get(key, 0), dose_number)
+    return doses
+
+
+def create_record(user_id, vaccine_id, injection_date, site_id, retries=3):
+    from .models import VaccinationRecord
+
+    for attempt in range(retries):
+        try:
+            with transaction.atomic():
+                dose_number = last_doses([(user_id, vaccine_id)]).get((user_id, vaccine_id), 0) + 1
+                return VaccinationRecord.objects.create(
+                    user_id=user_id,
+                    vaccine_id=vaccine_id,
+                    dose_number=dose_number,
+                    injection_date=injection_date,
+                    site_id=site_id,
+                )
+        except IntegrityError:
+            # Trùng (user, vaccine, dose_number) do một giao dịch khác vừa ghi: đọc lại và thử lại
+            if attempt == retries - 1:
+                raise
@@ -0,0 +1,207 @@
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import connection
+
+from . import tokenizer
+from .suggest import NgramSuggester
+
+SNAPSHOT_KEY = 'faq_index:snapshot'
+VERSION_KEY = 'faq_index:version'
+LOCK_KEY = 'faq_index:lock'
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 5
+UPDATE_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize_keywords(text):
+    return tokenizer.tokenize(text.lower())
+
+
+class FaqIndex:
+    """
+    Chỉ mục đảo từ khóa FAQ: token -> các FAQ chứa token đó.
+    Chỉ lưu từ khóa đã tách sẵn để mỗi tin nhắn không phải tách lại toàn bộ FAQ.
+    """
+
+    def __init__(self, entries=None, version=0):
+        self.entries = {}
+        self.postings = defaultdict(set)
+        self.version = version
+        self._vocabulary = None
+        self._questions = None
+        self._keyword_suggester = None
+        self._question_suggester = None
+        for faq_id, entry in (entries or {}).items():
+            self._put(faq_id, entry)
+
+    def _put(self, faq_id, entry):
+        self.entries[faq_id] = entry
+        for token in set(entry['keywords']):
+            self.postings[token].add(faq_id)
+        self._invalidate()
+
+    def add(self, faq):
+        self.remove(faq.pk)
+        self._put(faq.pk, {
+            'keywords': tokenize_keywords(faq.question_keywords),
+            'question': faq.question_keywords.lower(),
+            'answer': faq.answer,
+        })
+
+    def remove(self, faq_id):
+        entry = self.entries.pop(faq_id, None)
+        if entry is None:
+            return
+        for token in set(entry['keywords']):
+            ids = self.postings.get(token)
+            if ids is not None:
+                ids.discard(faq_id)
+                if not ids:
+                    del self.postings[token]
+        self._invalidate()
+
+    def _invalidate(self):
+        self._vocabulary = self._questions = None
+        self._keyword_suggester = self._question_suggester = None
+
+    @property
+    def vocabulary(self):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    @property
+    def questions(self):
+        if self._questions is None:
+            self._questions = [entry['question'] for _, entry in sorted(self.entries.items())]
+        return self._questions
+
+    def suggest_keywords(self, token, limit=3, cutoff=0.5):
+        if self._keyword_suggester is None:
+            self._keyword_suggester = NgramSuggester(self.vocabulary)
+        return self._keyword_suggester.lookup(token, limit, cutoff)
+
+    def suggest_questions(self, message, limit=3, cutoff=0.5):
+        if self._question_suggester is None:
+            self._question_suggester = NgramSuggester(self.questions)
+        return self._question_suggester.lookup(message, limit, cutoff)
+
+    def best_match(self, message_tokens):
+        message_tokens = set(message_tokens)
+        candidates = set()
+        for token in message_tokens:
+            candidates.update(self.postings.get(token, ()))
+
+        best_match, best_score = None, 0
+        for faq_id in sorted(candidates):
+            entry = self.entries[faq_id]
+            score = sum(1 for keyword in entry['keywords'] if keyword in message_tokens)
+            if score > best_score:
+                best_score = score
+                best_match = entry['answer']
+        return best_match
+
+    @classmethod
+    def build(cls):
+        from .models import Faq
+
+        index = cls()
+        faqs = list(Faq.objects.only('id', 'question_keywords', 'answer'))
+        # Tách từ khóa của mọi FAQ trong một lượt thay vì từng FAQ một
+        keywords = tokenizer.tokenize_many([faq.question_keywords.lower() for faq in faqs])
+        for faq, tokens in zip(faqs, keywords):
+            index._put(faq.pk, {
+                'keywords': tokens,
+                'question': faq.question_keywords.lower(),
+                'answer': faq.answer,
+            })
+        return index
+
+
+_index = None
+
+
+def _publish(index):
+    cache.add(VERSION_KEY, 0, timeout=None)
+    index.version = cache.incr(VERSION_KEY)
+    cache.set(SNAPSHOT_KEY, {'version': index.version, 'entries': index.entries}, timeout=None)
+
+
+def get_index():
+    """Trả về chỉ mục dùng chung giữa các worker qua snapshot trong cache, chỉ tải lại khi phiên bản đổi."""
+    global _index
+    version = cache.get(VERSION_KEY)
+    if _index is not None and _index.version == version:
+        return _index
+
+    snapshot = cache.get(SNAPSHOT_KEY) if version is not None else None
+    if snapshot is not None:
+        _index = FaqIndex(snapshot['entries'], snapshot['version'])
+    else:
+        _index = FaqIndex.build()
+        _publish(_index)
+    return _index
+
+
+def _acquire(token):
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(LOCK_KEY, token, timeout=LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def _release(token):
+    # Chỉ xóa khóa của chính mình: khóa đã hết hạn có thể đang thuộc về worker khác
+    if cache.get(LOCK_KEY) == token:
+        cache.delete(LOCK_KEY)
+
+
+def _update(apply, attempt=1):
+    global _index
+    # Khóa ngắn để hai worker cùng sửa FAQ không ghi đè snapshot của nhau
+    token = uuid.uuid4().hex
+    if not _acquire(token):
+        # Không sửa snapshot khi chưa giữ khóa: thử lại ở nền sau khi khóa hiện tại chắc chắn đã hết hạn
+        if attempt < UPDATE_ATTEMPTS:
+            timer = threading.Timer(LOCK_TIMEOUT, _retry, args=(apply, attempt + 1))
+            timer.daemon = True
+            timer.start()
+        else:
+            # Bỏ snapshot và tăng phiên bản: lần đọc sau của mọi worker dựng lại chỉ mục từ DB
+            # thay vì tiếp tục trả về FAQ đã sửa hoặc đã xóa
+            logger.error("FAQ index lock not acquired after %d attempts, dropping the snapshot", attempt)
+            cache.delete(SNAPSHOT_KEY)
+            cache.add(VERSION_KEY, 0, timeout=None)
+            cache.incr(VERSION_KEY)
+        return
+    try:
+        index = get_index()
+        apply(index)
+        _publish(index)
+        _index = index
+    finally:
+        _release(token)
+
+
+def _retry(apply, attempt):
+    try:
+        _update(apply, attempt)
+    finally:
+        connection.close()
+
+
+def faq_saved(faq):
+    _update(lambda index: index.add(faq))
+
+
+def faq_deleted(faq_id):
+    _update(lambda index: index.remove(faq_id))
@@ -0,0 +1,253 @@
+import string
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from . import tokenizer
+
+MERSENNE_PRIME = (1 << 31) - 1
+PUNCTUATION = set(string.punctuation) | {'…', '“', '”', '‘', '’'}
+MAX_EXAMPLES = 5
+
+
+def normalize(text):
+    return tokenizer.normalize(text.lower())
+
+
+def shingles(tokens):
+    """
+    Từ (đã tách) và các âm tiết của từ ghép, bỏ dấu câu. Không dùng thứ tự từ: cùng một câu hỏi thường được
+    đảo từ, và pyvi có thể ghép âm tiết khác nhau giữa hai cách hỏi gần giống nhau.
+    """
+    words = [token for token in tokens if not all(char in PUNCTUATION for char in token)]
+    return words, set(words) | {syllable for word in words if '_' in word for syllable in word.split('_')}
+
+
+class MinHasher:
+    """
+    Chữ ký MinHash tính theo lô bằng NumPy: mỗi hoán vị là h -> (a*h + b) mod p trên crc32 của shingle,
+    lấy min theo từng câu bằng np.minimum.reduceat thay vì vòng lặp Python cho từng hoán vị.
+    """
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = np.random.default_rng(seed)
+        # a, b, h < p = 2^31 - 1 nên a*h + b không tràn uint64; a trải hết [1, p) để phép nhân trộn đều
+        self.a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signatures(self, shingle_sets):
+        lengths = np.fromiter((len(s) for s in shingle_sets), dtype=np.int64, count=len(shingle_sets))
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) % MERSENNE_PRIME
+                              for s in shingle_sets for shingle in s), dtype=np.uint64, count=int(lengths.sum()))
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        values = (np.multiply.outer(self.a, hashes) + self.b[:, None]) % MERSENNE_PRIME
+        return np.minimum.reduceat(values, offsets, axis=1).T.astype(np.uint32)
+
+
+class Cluster:
+    __slots__ = ('signature', 'keys', 'tokens', 'examples', 'asked', 'unanswered', 'first_seen', 'last_seen')
+
+    def __init__(self, signature, tokens):
+        self.signature = signature
+        self.keys = []
+        self.tokens = tokens
+        self.examples = Counter()
+        self.asked = self.unanswered = 0
+        self.first_seen = self.last_seen = None
+
+    @property
+    def score(self):
+        # Câu hỏi không có câu trả lời là chỗ FAQ còn thiếu nên được tính gấp đôi
+        # (chúng cũng có mặt trong QueryLog)
+        return self.asked + self.unanswered
+
+    @property
+    def question(self):
+        return self.examples.most_common(1)[0][0]
+
+    def absorb(self, other):
+        self.asked += other.asked
+        self.unanswered += other.unanswered
+        for text, count in other.examples.most_common():
+            if text in self.examples or len(self.examples) < MAX_EXAMPLES:
+                self.examples[text] += count
+        if other.first_seen is not None:
+            self.first_seen = min(self.first_seen or other.first_seen, other.first_seen)
+            self.last_seen = max(self.last_seen or other.last_seen, other.last_seen)
+
+
+class ClusterIndex:
+    """
+    Gom câu hỏi gần giống nhau bằng LSH trên chữ ký MinHash (bands x rows), nối vào cụm có
+    độ tương đồng Jaccard ước lượng >= threshold. Bộ nhớ bị chặn bởi max_clusters: khi vượt, các cụm
+    có tần suất thấp nhất bị loại (lossy counting), nên số đếm của câu hỏi hiếm có thể bị thiếu
+    nhưng các cụm phổ biến vẫn đúng thứ hạng.
+    """
+
+    def __init__(self, num_perm=64, bands=16, threshold=0.6, max_clusters=50000):
+        if num_perm % bands:
+            raise ValueError("num_perm phải chia hết cho bands.")
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.threshold = threshold
+        self.max_clusters = max_clusters
+        self.buckets = {}
+        self.clusters = {}
+        self.next_id = 0
+        self.evicted = 0
+
+    def band_keys(self, signature):
+        return [hash((band, signature[band * self.rows:(band + 1) * self.rows].tobytes()))
+                for band in range(self.bands)]
+
+    def add(self, signature, text, tokens, asked=0, unanswered=0, first_seen=None, last_seen=None):
+        keys = self.band_keys(signature)
+        candidates = {self.buckets[key] for key in keys if key in self.buckets}
+        best, best_similarity = None, self.threshold
+        for cluster_id in candidates:
+            similarity = float(np.count_nonzero(self.clusters[cluster_id].signature == signature)) / signature.size
+            if similarity >= best_similarity:
+                best, best_similarity = cluster_id, similarity
+
+        if best is None:
+            best = self.next_id
+            self.next_id += 1
+            # Sao chép: dòng của ma trận chữ ký cả lô sẽ giữ cả ma trận trong bộ nhớ
+            self.clusters[best] = Cluster(signature.copy(), tokens)
+        cluster = self.clusters[best]
+        # Đăng ký các band mới của biến thể để bắt được các câu gần với nó, có giới hạn cho mỗi cụm
+        for key in keys:
+            if key not in self.buckets and len(cluster.keys) < self.bands * 4:
+                self.buckets[key] = best
+                cluster.keys.append(key)
+
+        cluster.asked += asked
+        cluster.unanswered += unanswered
+        if text in cluster.examples or len(cluster.examples) < MAX_EXAMPLES:
+            leader = cluster.question if cluster.examples else text
+            cluster.examples[text] += asked + unanswered
+            if text != leader and cluster.examples[text] > cluster.examples[leader]:
+                # So khớp các câu sau với cách hỏi phổ biến nhất của cụm thay vì câu gặp đầu tiên
+                cluster.signature = signature.copy()
+                cluster.tokens = tokens
+        if first_seen is not None:
+            cluster.first_seen = min(cluster.first_seen or first_seen, first_seen)
+            cluster.last_seen = max(cluster.last_seen or last_seen, last_seen)
+
+        if len(self.clusters) > self.max_clusters:
+            self.prune()
+        return best
+
+    def prune(self):
+        ids = np.fromiter(self.clusters, dtype=np.int64, count=len(self.clusters))
+        scores = np.fromiter((cluster.score for cluster in self.clusters.values()), dtype=np.int64, count=len(ids))
+        # Giảm về 3/4 sức chứa để không phải dọn sau mỗi câu
+        drop = len(ids) - self.max_clusters * 3 // 4
+        cutoff = np.partition(scores, drop - 1)[drop - 1]
+        for cluster_id in ids[scores <= cutoff].tolist():
+            cluster = self.clusters.pop(cluster_id)
+            for key in cluster.keys:
+                if self.buckets.get(key) == cluster_id:
+                    del self.buckets[key]
+            self.evicted += 1
+
+    def top(self, limit=100, min_count=2):
+        """
+        Các cụm điểm cao nhất. Một câu hỏi có thể bị tách thành vài cụm khi câu gặp đầu tiên là biến thể xa;
+        trước khi xếp hạng, cụm nhỏ được gộp vào cụm lớn hơn có cách hỏi phổ biến đủ giống.
+        """
+        ranked = sorted(self.clusters.values(), key=lambda cluster: cluster.score, reverse=True)[:limit * 3]
+        merged, signatures = [], []
+        for cluster in ranked:
+            if signatures:
+                similarity = np.count_nonzero(np.asarray(signatures) == cluster.signature, axis=1) / cluster.signature.size
+                best = int(similarity.argmax())
+                if similarity[best] >= self.threshold:
+                    merged[best].absorb(cluster)
+                    continue
+            merged.append(cluster)
+            signatures.append(cluster.signature)
+        merged = [cluster for cluster in merged if cluster.score >= min_count]
+        merged.sort(key=lambda cluster: (cluster.score, cluster.unanswered), reverse=True)
+        return merged[:limit]
+
+
+class FaqMiner:
+    def __init__(self, num_perm=64, bands=16, threshold=0.6, max_clusters=50000, processes=None, seed=1):
+        self.hasher = MinHasher(num_perm, seed)
+        self.index = ClusterIndex(num_perm, bands, threshold, max_clusters)
+        self.processes = processes
+        self.rows = 0
+        self.skipped = 0
+
+    def add_chunk(self, rows, unanswered=False):
+        """rows: danh sách (câu hỏi, thời điểm). Câu trùng trong cùng lô chỉ tách từ và băm một lần."""
+        self.rows += len(rows)
+        counts = Counter()
+        seen = {}
+        for text, seen_at in rows:
+            key = normalize(text or '')
+            if not key:
+                self.skipped += 1
+                continue
+            counts[key] += 1
+            if seen_at is not None:
+                first, last = seen.get(key, (seen_at, seen_at))
+                seen[key] = min(first, seen_at), max(last, seen_at)
+
+        texts = list(counts)
+        words, shingle_sets = [], []
+        for tokens in tokenizer.tokenize_many(texts, processes=self.processes):
+            cleaned, shingle_set = shingles(tokens)
+            words.append(cleaned)
+            shingle_sets.append(shingle_set)
+
+        keep = [i for i, shingle_set in enumerate(shingle_sets) if shingle_set]
+        self.skipped += sum(counts[texts[i]] for i in range(len(texts)) if not shingle_sets[i])
+        if not keep:
+            return
+        signatures = self.hasher.signatures([shingle_sets[i] for i in keep])
+        for signature, i in zip(signatures, keep):
+            count = counts[texts[i]]
+            first_seen, last_seen = seen.get(texts[i], (None, None))
+            self.index.add(signature, texts[i], words[i], asked=0 if unanswered else count,
+                           unanswered=count if unanswered else 0, first_seen=first_seen, last_seen=last_seen)
+
+
+def stream(queryset, field, date_field, chunk_size=2000):
+    """Đọc bảng theo khóa chính tăng dần từng lô (không dùng OFFSET, không giữ cả bảng trong bộ nhớ)."""
+    last = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last).order_by('pk').values_list('pk', field, date_field)[:chunk_size])
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield [(text, seen_at) for _, text, seen_at in rows]
+
+
+def save_candidates(clusters):
+    """Thay các ứng viên chưa duyệt bằng kết quả mới; bỏ qua câu đã được admin duyệt hoặc loại trước đó."""
+    from django.db import transaction
+
+    from .models import FaqCandidate
+
+    with transaction.atomic():
+        FaqCandidate.objects.filter(status=FaqCandidate.NEW).delete()
+        reviewed = {normalize(question) for question in FaqCandidate.objects.values_list('question', flat=True)}
+        candidates = [
+            FaqCandidate(
+                question=cluster.question[:500],
+                keywords=' '.join(cluster.tokens)[:255],
+                examples=[text for text, _ in cluster.examples.most_common()],
+                asked_count=cluster.asked,
+                unanswered_count=cluster.unanswered,
+                score=cluster.score,
+                first_seen=cluster.first_seen,
+                last_seen=cluster.last_seen,
+            )
+            for cluster in clusters if normalize(cluster.question) not in reviewed
+        ]
+        FaqCandidate.objects.bulk_create(candidates, batch_size=500)
+    return len(candidates)
@@ -0,0 +1,77 @@
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371.0088
+PRECISION = 9
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def cell_min_km(precision, latitude):
+    """
+    Cạnh ngắn nhất (km) của ô geohash quanh vĩ độ `latitude`: điểm nằm trong khoảng này quanh vị trí tìm kiếm
+    chắc chắn thuộc ô trung tâm hoặc 8 ô lân cận. Bề ngang ô co lại theo cos(vĩ độ) (ở Hà Nội còn khoảng 93%
+    so với xích đạo) nên tính tại vĩ độ xa xích đạo nhất của khối 3x3 ô.
+    """
+    lat_bits = precision * 5 // 2
+    lat_degrees = 180.0 / 2 ** lat_bits
+    lng_degrees = 360.0 / 2 ** (precision * 5 - lat_bits)
+    edge = min(abs(latitude) + 2 * lat_degrees, 90.0)
+    return min(lat_degrees, lng_degrees * math.cos(math.radians(edge))) * KM_PER_DEGREE
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, rng = (longitude, lng_range) if even else (latitude, lat_range)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def bounds(geohash):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range, lng_range
+
+
+def neighbours(geohash):
+    """Ô trung tâm và 8 ô xung quanh cùng độ chính xác."""
+    (lat_min, lat_max), (lng_min, lng_max) = bounds(geohash)
+    lat_step, lng_step = lat_max - lat_min, lng_max - lng_min
+    lat_center, lng_center = (lat_min + lat_max) / 2, (lng_min + lng_max) / 2
+    cells = set()
+    for dlat in (-1, 0, 1):
+        lat = lat_center + dlat * lat_step
+        if not -90 <= lat <= 90:
+            continue
+        for dlng in (-1, 0, 1):
+            lng = (lng_center + dlng * lng_step + 180) % 360 - 180
+            cells.add(encode(lat, lng, len(geohash)))
+    return sorted(cells)
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
@@ -0,0 +1,56 @@
+import statistics
+import time
+import uuid
+
+from AppTiemChung import chat_log
+from AppTiemChung.models import QueryLog, UnansweredQuestion, User
+from AppTiemChung.views import ai_chat_free_api
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+MESSAGES = [
+    'vắc xin có tác dụng phụ không',
+    'tiêm mũi nhắc lại khi nào',
+    'đặt lịch tiêm ở đâu',
+    'trẻ em mấy tuổi được tiêm',
+    'câu hỏi không có trong faq',
+]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Measure ai-chat latency with synchronous and buffered QueryLog writes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        user = User.objects.create(username=f'bench-{uuid.uuid4().hex[:8]}')
+        factory = APIRequestFactory()
+
+        try:
+            for buffered in (False, True):
+                with override_settings(CHAT_LOG_BUFFERED=buffered):
+                    timings = []
+                    for i in range(options['requests']):
+                        request = factory.post('/ai-chat/', {'message': MESSAGES[i % len(MESSAGES)]}, format='json')
+                        force_authenticate(request, user=user)
+                        start = time.perf_counter()
+                        ai_chat_free_api(request)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    if buffered:
+                        chat_log.get_buffer().flush()
+
+                self.stdout.write(
+                    f"{'buffered' if buffered else 'sync':8s} mean={statistics.mean(timings):7.3f}ms "
+                    f"p50={percentile(timings, 0.5):7.3f}ms p99={percentile(timings, 0.99):7.3f}ms"
+                )
+            self.stdout.write(f"QueryLog đã ghi: {QueryLog.objects.filter(user=user).count()}")
+        finally:
+            UnansweredQuestion.objects.filter(user=user).delete()
+            user.delete()
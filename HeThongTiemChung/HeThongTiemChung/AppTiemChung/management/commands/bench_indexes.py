@@ -0,0 +1,152 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+
+from AppTiemChung import dao
+from AppTiemChung.models import Appointment, InjectionSchedule, InjectionSite, QueryLog, User, Vaccine
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+# (model, fields) của các index cần so sánh, khớp với Meta.indexes
+BENCH_INDEXES = [
+    (Appointment, ['schedule', 'is_confirmed', 'reminder_enabled', 'reminder_sent_at']),
+    (InjectionSchedule, ['date']),
+    (Vaccine, ['status', 'name']),
+    (QueryLog, ['user', '-timestamp']),
+]
+
+
+class Command(BaseCommand):
+    help = ('Seed data and compare EXPLAIN plans and timings of hot queries with and without the query indexes. '
+            'Runs in a separate test database (test_<NAME>); the configured database is never touched.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20000)
+        parser.add_argument('--sites', type=int, default=20)
+        parser.add_argument('--vaccines', type=int, default=200)
+        parser.add_argument('--schedules', type=int, default=20000)
+        parser.add_argument('--appointments', type=int, default=100000)
+        parser.add_argument('--query-logs', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=20, help='Số lần chạy mỗi truy vấn để lấy trung vị')
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Dùng lại cơ sở dữ liệu thử đã giữ bằng --keep, không tạo thêm dữ liệu')
+        parser.add_argument('--keep', action='store_true', help='Không xóa cơ sở dữ liệu thử sau khi chạy')
+
+    def handle(self, *args, **options):
+        # Xóa và tạo lại index (và tạo dữ liệu thử) trên cơ sở dữ liệu riêng như khi chạy test:
+        # không khóa bảng hay làm chậm truy vấn của hệ thống đang chạy
+        keepdb = options['keep'] or options['no_seed']
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb)
+        self.stdout.write(f"Cơ sở dữ liệu thử: {connection.settings_dict['NAME']}")
+        try:
+            self.bench(options)
+        finally:
+            if not options['keep']:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=False)
+
+    def bench(self, options):
+        if not options['no_seed']:
+            start = time.perf_counter()
+            self.seed(uuid.uuid4().hex[:8], options)
+            self.stdout.write(f"Đã tạo dữ liệu thử trong {time.perf_counter() - start:.1f}s")
+
+        queries = self.queries()
+        indexes = [self.find_index(model, fields) for model, fields in BENCH_INDEXES]
+        try:
+            with connection.schema_editor() as editor:
+                for model, index in indexes:
+                    editor.remove_index(model, index)
+            before = self.run(queries, options['repeat'], 'KHÔNG có index')
+        finally:
+            with connection.schema_editor() as editor:
+                for model, index in indexes:
+                    editor.add_index(model, index)
+        after = self.run(queries, options['repeat'], 'CÓ index')
+
+        self.stdout.write("\nTóm tắt (trung vị):")
+        for name in queries:
+            speedup = before[name] / after[name] if after[name] else float('inf')
+            self.stdout.write(f"  {name:<12} {before[name]:8.2f} ms -> {after[name]:8.2f} ms  (x{speedup:.1f})")
+
+    def find_index(self, model, fields):
+        for index in model._meta.indexes:
+            if index.fields == fields:
+                return model, index
+        raise LookupError(f"{model.__name__} không có index {fields}")
+
+    def queries(self):
+        schedule = InjectionSchedule.objects.order_by('?').only('date').first()
+        target = schedule.date if schedule else date.today()
+        user_id = QueryLog.objects.values_list('user_id', flat=True).order_by('?').first()
+        return {
+            'reminders': Appointment.objects.filter(
+                schedule__date=target,
+                is_confirmed=True,
+                reminder_enabled=True,
+                reminder_sent_at__isnull=True,
+            ).select_related('schedule__site', 'user').order_by('pk'),
+            'upcoming': dao.load_schedules().filter(date__gte=date.today()).order_by('date', 'id')[:20],
+            'vaccines': dao.load_vaccine({}).order_by('name')[:20],
+            'query_logs': QueryLog.objects.filter(user_id=user_id).order_by('-timestamp')[:20],
+        }
+
+    def run(self, queries, repeat, label):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {label} =="))
+        medians = {}
+        for name, queryset in queries.items():
+            self.stdout.write(f"-- {name}")
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f"   {line}")
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            medians[name] = statistics.median(timings)
+            self.stdout.write(f"   {medians[name]:.2f} ms")
+        return medians
+
+    def seed(self, tag, options):
+        rng = random.Random(tag)
+        User.objects.bulk_create([
+            User(username=f'bench-{tag}-{i}', email=f'bench-{tag}-{i}@example.com', citizen_id=None)
+            for i in range(options['users'])
+        ], batch_size=1000)
+        user_ids = list(User.objects.filter(username__startswith=f'bench-{tag}-').values_list('pk', flat=True))
+
+        InjectionSite.objects.bulk_create([
+            InjectionSite(name=f'bench-{tag}-{i}', address='bench') for i in range(options['sites'])
+        ])
+        site_ids = list(InjectionSite.objects.filter(name__startswith=f'bench-{tag}-').values_list('pk', flat=True))
+        statuses = [Vaccine.Status.ACTIVE] * 3 + [Vaccine.Status.DISCONTINUED, Vaccine.Status.EXPIRED]
+        Vaccine.objects.bulk_create([
+            Vaccine(name=f'bench-{tag}-{i}', status=rng.choice(statuses)) for i in range(options['vaccines'])
+        ])
+        vaccine_ids = list(Vaccine.objects.filter(name__startswith=f'bench-{tag}-').values_list('pk', flat=True))
+
+        # Lịch trải từ 1 năm trước đến 3 tháng tới, không trùng (vaccine, cơ sở, ngày)
+        today = date.today()
+        combos = set()
+        while len(combos) < options['schedules']:
+            combos.add((rng.choice(vaccine_ids), rng.choice(site_ids), today + timedelta(days=rng.randint(-365, 90))))
+        InjectionSchedule.objects.bulk_create([
+            InjectionSchedule(vaccine_id=v, site_id=s, date=d, slot_count=100) for v, s, d in combos
+        ], batch_size=1000)
+        schedule_ids = list(InjectionSchedule.objects.filter(vaccine_id__in=vaccine_ids).values_list('pk', flat=True))
+
+        pairs = set()
+        while len(pairs) < options['appointments']:
+            pairs.add((rng.choice(user_ids), rng.choice(schedule_ids)))
+        Appointment.objects.bulk_create([
+            Appointment(user_id=u, schedule_id=s, is_confirmed=rng.random() < 0.7,
+                        reminder_enabled=rng.random() < 0.5)
+            for u, s in pairs
+        ], batch_size=1000)
+
+        QueryLog.objects.bulk_create([
+            QueryLog(user_id=rng.choice(user_ids), question='bench', answer='bench')
+            for _ in range(options['query_logs'])
+        ], batch_size=1000)
+
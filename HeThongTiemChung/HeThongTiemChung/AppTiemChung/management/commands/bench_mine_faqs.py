@@ -0,0 +1,91 @@
+import random
+import resource
+import time
+from itertools import islice
+
+from AppTiemChung import faq_mining, tokenizer
+from AppTiemChung.management.commands.bench_suggest import SYLLABLES
+from django.core.management.base import BaseCommand
+
+FILLERS = ['ạ', 'vậy', 'ơi', 'nhỉ', 'không', 'thế nào']
+
+
+def make_variant(rng, words):
+    words = list(words)
+    if rng.random() < 0.3 and len(words) > 4:
+        del words[rng.randrange(len(words))]
+    if rng.random() < 0.2:
+        position = rng.randrange(len(words) - 1)
+        words[position], words[position + 1] = words[position + 1], words[position]
+    if rng.random() < 0.3:
+        words.append(rng.choice(FILLERS))
+    text = ' '.join(words) + rng.choice(('?', '', ' ?'))
+    return text.capitalize() if rng.random() < 0.5 else text
+
+
+def synthetic_log(rng, rows, templates, noise):
+    """Câu hỏi lặp theo phân bố Zipf trên `templates` mẫu (có biến thể) cộng một tỉ lệ câu ngẫu nhiên."""
+    questions = [[rng.choice(SYLLABLES) for _ in range(rng.randint(6, 12))] for _ in range(templates)]
+    weights = [1 / (rank + 1) for rank in range(templates)]
+    for _ in range(rows):
+        if rng.random() < noise:
+            yield None, ' '.join(rng.choice(SYLLABLES) for _ in range(rng.randint(4, 12)))
+        else:
+            label = rng.choices(range(templates), weights)[0]
+            yield label, make_variant(rng, questions[label])
+
+
+class Command(BaseCommand):
+    help = 'Measure mine_faqs throughput (rows/s), peak memory and cluster quality on a synthetic question log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000)
+        parser.add_argument('--templates', type=int, default=200, help='Số câu hỏi gốc (cụm đúng)')
+        parser.add_argument('--noise', type=float, default=0.3, help='Tỉ lệ câu hỏi ngẫu nhiên không lặp lại')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--max-clusters', type=int, default=20000)
+        parser.add_argument('--threshold', type=float, default=0.6)
+        parser.add_argument('--processes', type=int, default=None)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        miner = faq_mining.FaqMiner(threshold=options['threshold'], max_clusters=options['max_clusters'],
+                                    processes=options['processes'])
+        # Nhãn của từng biến thể (không lưu câu nhiễu) để chấm chất lượng cụm
+        labels = {}
+        log = synthetic_log(rng, options['rows'], options['templates'], options['noise'])
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        start = time.perf_counter()
+        tokenize_time = 0.0
+        while chunk := list(islice(log, options['chunk_size'])):
+            for label, text in chunk:
+                if label is not None:
+                    labels.setdefault(faq_mining.normalize(text), label)
+            # Thời gian tách từ đo riêng vì phụ thuộc pyvi và cache, không phải thuật toán gom cụm
+            tokenize_start = time.perf_counter()
+            tokenizer.tokenize_many([faq_mining.normalize(text) for _, text in chunk],
+                                    processes=options['processes'])
+            tokenize_time += time.perf_counter() - tokenize_start
+            miner.add_chunk([(text, None) for _, text in chunk])
+        elapsed = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        top = miner.index.top(options['templates'], min_count=2)
+        found = {labels.get(cluster.question) for cluster in top} - {None}
+        pure = sum(1 for cluster in top
+                   if len({labels.get(text) for text in cluster.examples}) == 1
+                   and labels.get(cluster.question) is not None)
+        self.stdout.write(
+            f"{miner.rows} dòng trong {elapsed:.1f}s: {miner.rows / elapsed:.0f} dòng/s "
+            f"(tách từ {tokenize_time:.1f}s, gom cụm {miner.rows / max(elapsed - tokenize_time, 1e-9):.0f} dòng/s)"
+        )
+        self.stdout.write(
+            f"{len(miner.index.clusters)} cụm trong bộ nhớ, {miner.index.evicted} cụm hiếm bị loại, "
+            f"RSS đỉnh {rss_after / 1024:.0f}MB (tăng {(rss_after - rss_before) / 1024:.0f}MB)"
+        )
+        self.stdout.write(
+            f"top {len(top)} cụm: tìm lại {len(found)}/{options['templates']} câu gốc, "
+            f"{pure / max(len(top), 1) * 100:.1f}% cụm thuần một câu gốc"
+        )
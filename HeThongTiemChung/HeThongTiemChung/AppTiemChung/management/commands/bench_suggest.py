@@ -0,0 +1,83 @@
+import random
+import statistics
+import time
+from difflib import get_close_matches
+
+from AppTiemChung.suggest import NgramSuggester
+from django.core.management.base import BaseCommand
+
+SYLLABLES = [
+    'tiêm', 'chủng', 'vắc', 'xin', 'lịch', 'hẹn', 'mũi', 'nhắc', 'lại', 'trẻ', 'em', 'người', 'lớn',
+    'sốt', 'phản', 'ứng', 'phụ', 'tác', 'dụng', 'giá', 'phí', 'bảo', 'hiểm', 'giấy', 'chứng', 'nhận',
+    'cúm', 'sởi', 'viêm', 'gan', 'dại', 'uốn', 'ván', 'bạch', 'hầu', 'ho', 'gà', 'thủy', 'đậu', 'não',
+    'nhật', 'bản', 'phế', 'cầu', 'rota', 'hpv', 'covid', 'bao', 'lâu', 'khi', 'nào', 'ở', 'đâu', 'có',
+    'không', 'được', 'mấy', 'tuổi', 'cần', 'chuẩn', 'bị', 'gì', 'sau', 'trước', 'đăng', 'ký', 'hủy',
+]
+
+
+def make_word(rng):
+    return '_'.join(rng.choice(SYLLABLES) for _ in range(rng.choice((1, 1, 2, 2, 3))))
+
+
+def make_typo(rng, word):
+    chars = list(word)
+    position = rng.randrange(len(chars))
+    if rng.random() < 0.5 and len(chars) > 2:
+        del chars[position]
+    else:
+        chars[position] = rng.choice('aăâbcdđeêghiklmnoôơpqrstuưvxy')
+    return ''.join(chars)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Compare the n-gram suggestion engine with difflib on a synthetic FAQ keyword corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--faqs', type=int, default=10000)
+        parser.add_argument('--queries', type=int, default=300)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        keywords = []
+        for _ in range(options['faqs']):
+            keywords.extend(make_word(rng) for _ in range(rng.randint(2, 5)))
+        vocabulary = list(dict.fromkeys(keywords))
+        queries = [make_typo(rng, rng.choice(vocabulary)) for _ in range(options['queries'])]
+
+        start = time.perf_counter()
+        suggester = NgramSuggester(vocabulary)
+        build_time = time.perf_counter() - start
+
+        results = {}
+        for name, lookup in (
+                ('difflib', lambda q: get_close_matches(q, vocabulary, n=3, cutoff=0.5)),
+                ('ngram', lambda q: suggester.lookup(q, 3, 0.5)),
+        ):
+            timings, answers = [], []
+            for query in queries:
+                start = time.perf_counter()
+                answers.append(lookup(query))
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = (timings, answers)
+            self.stdout.write(
+                f"{name:8s} mean={statistics.mean(timings):8.3f}ms p50={percentile(timings, 0.5):8.3f}ms "
+                f"p99={percentile(timings, 0.99):8.3f}ms"
+            )
+
+        # Chất lượng: tỉ lệ gợi ý của difflib cũng xuất hiện trong gợi ý của n-gram
+        overlaps, top1 = [], 0
+        for expected, actual in zip(results['difflib'][1], results['ngram'][1]):
+            if expected:
+                overlaps.append(len(set(expected) & set(actual)) / len(expected))
+                top1 += bool(actual) and actual[0] == expected[0]
+        judged = len(overlaps) or 1
+        self.stdout.write(
+            f"{len(vocabulary)} từ khóa, dựng chỉ mục {build_time * 1000:.1f}ms; "
+            f"trùng gợi ý@3={statistics.mean(overlaps or [0]) * 100:.1f}%, trùng top-1={top1 / judged * 100:.1f}%"
+        )
@@ -0,0 +1,73 @@
+import random
+import time
+
+from AppTiemChung import tokenizer
+from AppTiemChung.management.commands.bench_suggest import SYLLABLES
+from AppTiemChung.models import QueryLog
+from django.core.management.base import BaseCommand, CommandError
+
+
+def synthetic_corpus(rng, count, distinct):
+    # Câu hỏi chat lặp lại nhiều nên lấy `count` chuỗi từ `distinct` câu khác nhau
+    sentences = [' '.join(rng.choice(SYLLABLES) for _ in range(rng.randint(4, 20))) + rng.choice(('?', '', '.'))
+                 for _ in range(distinct)]
+    return [rng.choice(sentences) for _ in range(count)]
+
+
+class Command(BaseCommand):
+    help = 'Measure Vietnamese tokenization throughput (strings/s): plain pyvi, batch, LRU cache and process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=('synthetic', 'querylog'), default='synthetic',
+                            help='querylog: re-tokenize the questions stored in QueryLog')
+        parser.add_argument('--count', type=int, default=5000, help='Number of strings (upper bound for querylog)')
+        parser.add_argument('--distinct', type=int, default=None,
+                            help='Distinct synthetic sentences (default: half of --count)')
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['source'] == 'querylog':
+            texts = list(QueryLog.objects.order_by('pk').values_list('question', flat=True)[:options['count']])
+            if not texts:
+                raise CommandError("QueryLog trống.")
+        else:
+            texts = synthetic_corpus(random.Random(options['seed']), options['count'],
+                                    options['distinct'] or max(options['count'] // 2, 1))
+        unique = len(set(map(tokenizer.normalize, texts)))
+        self.stdout.write(f"{len(texts)} chuỗi ({unique} khác nhau), nguồn {options['source']}")
+
+        # Nạp mô hình trước để không tính vào lần đo đầu
+        vi_tokenizer = tokenizer.get_tokenizer()
+        vi_tokenizer.tokenize('khởi động')
+        cache = tokenizer.get_cache()
+
+        def plain():
+            return [vi_tokenizer.tokenize(text).split() for text in texts]
+
+        def batch():
+            cache.clear()
+            return tokenizer.tokenize_many(texts, chunk_size=options['chunk_size'])
+
+        def cached():
+            return tokenizer.tokenize_many(texts, chunk_size=options['chunk_size'])
+
+        def pool():
+            cache.clear()
+            return tokenizer.tokenize_many(texts, processes=options['processes'], chunk_size=options['chunk_size'])
+
+        reference = None
+        for name, run in (('pyvi', plain), ('batch', batch), ('cache', cached),
+                          (f"pool x{options['processes']}", pool)):
+            start = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - start
+            if reference is None:
+                reference = result
+            # Chuỗi được chuẩn hóa khoảng trắng trước khi tách nên chỉ so với pyvi trên danh sách token
+            same = sum(a == b for a, b in zip(reference, result)) / len(texts) * 100
+            self.stdout.write(f"{name:10s} {elapsed * 1000:9.1f}ms {len(texts) / elapsed:12.0f} chuỗi/s  khớp {same:.1f}%")
+
+        info = tokenizer.cache_info()
+        self.stdout.write(f"cache: {info['size']}/{info['maxsize']} mục, {info['hits']} trúng, {info['misses']} trượt")
@@ -0,0 +1,46 @@
+import time
+from datetime import datetime, timedelta
+
+from AppTiemChung import rollups
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Build daily appointment rollups per site, vaccine and date (incremental by default)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Tính lại toàn bộ các ngày có lịch hẹn')
+        parser.add_argument('--from', dest='date_from', help='Tính lại từ ngày (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Tính lại đến ngày (YYYY-MM-DD)')
+        parser.add_argument('--lookback', type=int, default=2, help='Số ngày gần nhất luôn được tính lại')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Số ngày tính trong một transaction')
+
+    def parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError("Ngày không hợp lệ (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        full = False
+        if options['date_from'] or options['date_to']:
+            if not (options['date_from'] and options['date_to']):
+                raise CommandError("Cần cả --from và --to.")
+            start, end = self.parse_date(options['date_from']), self.parse_date(options['date_to'])
+            dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        else:
+            since = None if options['full'] else rollups.last_run()
+            # Lần chạy đầu tiên (chưa có dòng tổng hợp nào) thì backfill toàn bộ
+            full = since is None
+            dates = rollups.all_dates() if full else rollups.changed_dates(since, options['lookback'])
+
+        written = 0
+        begin = time.perf_counter()
+        for i in range(0, len(dates), options['chunk_days']):
+            written += rollups.rebuild(dates[i:i + options['chunk_days']], computed_at=started)
+        if full:
+            rollups.prune(started)
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã tính lại {len(dates)} ngày, ghi {written} dòng tổng hợp trong {time.perf_counter() - begin:.1f}s."))
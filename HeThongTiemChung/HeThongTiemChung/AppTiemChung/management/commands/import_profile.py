@@ -0,0 +1,80 @@
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)\s*$')
+
+# Các thư viện nặng chỉ được nạp khi thực sự dùng (tokenizer.py, certificates.render, chat_backends)
+HEAVY_MODULES = ['pyvi', 'sklearn', 'sklearn_crfsuite', 'reportlab', 'firebase_admin', 'google.cloud', 'numpy']
+
+
+def profile(targets):
+    """Chạy một tiến trình Python mới với -X importtime, trả về {module: (self_us, cumulative_us)} và tổng (µs)."""
+    code = 'import django; django.setup()\n' + ''.join(f'import {target}\n' for target in targets)
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'HeThongTiemChung.settings'))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            cwd=str(settings.BASE_DIR), env=env)
+    if result.returncode != 0:
+        raise CommandError(f"Không import được {', '.join(targets)}:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        own, cumulative, name = int(match[1]), int(match[2]), match[3]
+        modules[name] = (own, cumulative)
+        total += own
+    return modules, total
+
+
+class Command(BaseCommand):
+    help = 'Profile cold-start import time (python -X importtime) and fail when it exceeds the budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help='Modules to import after django.setup() (default: ROOT_URLCONF)')
+        parser.add_argument('--runs', type=int, default=3, help='Keep the fastest of N runs to reduce noise')
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--budget-ms', type=float, default=None,
+                            help='Fail when total import time exceeds this (default: IMPORT_TIME_BUDGET_MS)')
+        parser.add_argument('--allow-heavy', action='store_true',
+                            help='Do not fail when a deferred heavy dependency is imported at startup')
+
+    def handle(self, *args, **options):
+        targets = options['targets'] or [settings.ROOT_URLCONF]
+        best = None
+        for _ in range(max(options['runs'], 1)):
+            modules, total = profile(targets)
+            if best is None or total < best[1]:
+                best = modules, total
+        modules, total = best
+
+        ranked = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:options['top']]
+        self.stdout.write(f"{'self(ms)':>9} {'cumul(ms)':>10}  module")
+        for name, (own, cumulative) in ranked:
+            self.stdout.write(f"{own / 1000:9.1f} {cumulative / 1000:10.1f}  {name}")
+
+        own_app = sum(own for name, (own, _) in modules.items() if name.split('.')[0] == 'AppTiemChung')
+        self.stdout.write(f"{len(modules)} module, tổng {total / 1000:.1f}ms (AppTiemChung {own_app / 1000:.1f}ms)")
+
+        problems = []
+        if not options['allow_heavy']:
+            heavy = sorted(name for name in modules
+                           if any(name == prefix or name.startswith(prefix + '.') for prefix in HEAVY_MODULES))
+            if heavy:
+                problems.append(f"thư viện nặng bị nạp lúc khởi động: {', '.join(heavy[:10])}")
+
+        budget = options['budget_ms']
+        if budget is None:
+            budget = getattr(settings, 'IMPORT_TIME_BUDGET_MS', None)
+        if budget is not None and total / 1000 > budget:
+            problems.append(f"tổng thời gian import {total / 1000:.1f}ms vượt ngân sách {budget:.0f}ms")
+
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS("Thời gian khởi động trong ngân sách."))
@@ -0,0 +1,80 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from itertools import islice
+
+from AppTiemChung import certificates, dao
+from AppTiemChung.models import User, VaccinationRecord
+from django.core.management.base import BaseCommand, CommandError
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Render vaccination certificates for a site and/or date range into the certificate cache, '
+            'then remove superseded certificate files')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, help='ID cơ sở tiêm')
+        parser.add_argument('--from', dest='date_from', help='Từ ngày tiêm (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Đến ngày tiêm (YYYY-MM-DD)')
+        parser.add_argument('--processes', type=int, default=4, help='Số tiến trình vẽ PDF song song')
+        parser.add_argument('--batch-size', type=int, default=200, help='Số người dùng nạp từ DB mỗi lượt')
+        parser.add_argument('--prune-only', action='store_true', help='Chỉ dọn các file giấy chứng nhận đã cũ')
+        parser.add_argument('--grace', type=int, default=3600,
+                            help='Chỉ xóa file cũ hơn số giây này (request có thể đang đọc file vừa bị thay)')
+
+    def parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError("Ngày không hợp lệ (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        if options['prune_only']:
+            self.prune(options)
+            return
+        if not (options['site'] or options['date_from'] or options['date_to']):
+            raise CommandError("Cần ít nhất một trong --site, --from, --to.")
+
+        records = VaccinationRecord.objects.all()
+        if options['site']:
+            records = records.filter(site_id=options['site'])
+        if options['date_from']:
+            records = records.filter(injection_date__gte=self.parse_date(options['date_from']))
+        if options['date_to']:
+            records = records.filter(injection_date__lte=self.parse_date(options['date_to']))
+
+        user_ids = records.values_list('user_id', flat=True).distinct().order_by('user_id')
+        # Tiến trình con chỉ vẽ và ghi file, không chạm DB; thư mục được truyền sẵn để không phụ thuộc settings
+        render = partial(certificates.write_certificate, directory=str(certificates.cache_dir()))
+
+        issued = 0
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=options['processes']) as pool:
+            for batch in batched(user_ids.iterator(), options['batch_size']):
+                users = User.objects.in_bulk(batch)
+                history = {}
+                for record in dao.load_vaccination_records().filter(user_id__in=batch) \
+                        .order_by('user_id', 'injection_date', 'pk'):
+                    history.setdefault(record.user_id, []).append(record)
+
+                # Giấy chứng nhận gồm toàn bộ lịch sử tiêm của người dùng, giống endpoint /certificate/
+                payloads = [certificates.build_payload(users[user_id], certificates.record_lines(history[user_id]))
+                            for user_id in batch if user_id in history]
+                issued += sum(1 for _ in pool.map(render, payloads, chunksize=16))
+                self.stdout.write(f"Đã tạo {issued} giấy chứng nhận...")
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã tạo {issued} giấy chứng nhận trong {elapsed:.1f}s tại {certificates.cache_dir()}"))
+        self.prune(options)
+
+    def prune(self, options):
+        removed = certificates.prune(grace_seconds=options['grace'])
+        self.stdout.write(f"Đã xóa {removed} file giấy chứng nhận cũ.")
@@ -0,0 +1,53 @@
+import time
+from datetime import timedelta
+
+from AppTiemChung import faq_mining
+from AppTiemChung.models import QueryLog, UnansweredQuestion
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Cluster near-duplicate questions from QueryLog and UnansweredQuestion into ranked FAQ candidates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Chỉ xét câu hỏi trong N ngày gần nhất')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Số dòng đọc từ DB mỗi lượt')
+        parser.add_argument('--threshold', type=float, default=0.6, help='Độ tương đồng Jaccard tối thiểu để gộp cụm')
+        parser.add_argument('--num-perm', type=int, default=64)
+        parser.add_argument('--bands', type=int, default=16)
+        parser.add_argument('--max-clusters', type=int, default=50000, help='Giới hạn số cụm giữ trong bộ nhớ')
+        parser.add_argument('--processes', type=int, default=None, help='Tách từ bằng pool tiến trình')
+        parser.add_argument('--top', type=int, default=100, help='Số ứng viên lưu lại')
+        parser.add_argument('--min-count', type=int, default=3, help='Điểm tối thiểu của một cụm')
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ in kết quả, không ghi FaqCandidate')
+
+    def handle(self, *args, **options):
+        miner = faq_mining.FaqMiner(num_perm=options['num_perm'], bands=options['bands'],
+                                    threshold=options['threshold'], max_clusters=options['max_clusters'],
+                                    processes=options['processes'])
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+
+        start = time.perf_counter()
+        for model, date_field, unanswered in ((QueryLog, 'timestamp', False),
+                                              (UnansweredQuestion, 'created_at', True)):
+            queryset = model.objects.all()
+            if since is not None:
+                queryset = queryset.filter(**{f'{date_field}__gte': since})
+            for rows in faq_mining.stream(queryset, 'question', date_field, options['chunk_size']):
+                miner.add_chunk(rows, unanswered=unanswered)
+            self.stdout.write(f"{model.__name__}: đã đọc {miner.rows} dòng, {len(miner.index.clusters)} cụm")
+        elapsed = time.perf_counter() - start
+
+        clusters = miner.index.top(options['top'], options['min_count'])
+        for cluster in clusters[:20]:
+            self.stdout.write(f"{cluster.score:7d} ({cluster.unanswered} chưa trả lời)  {cluster.question}")
+        self.stdout.write(
+            f"{miner.rows} dòng trong {elapsed:.1f}s ({miner.rows / max(elapsed, 1e-9):.0f} dòng/s), "
+            f"{len(miner.index.clusters)} cụm, {miner.index.evicted} cụm hiếm bị loại, {miner.skipped} dòng rỗng"
+        )
+
+        if options['dry_run']:
+            return
+        saved = faq_mining.save_candidates(clusters)
+        self.stdout.write(self.style.SUCCESS(f"Đã lưu {saved} ứng viên FAQ."))
@@ -0,0 +1,13 @@
+from AppTiemChung import sync
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than SYNC_TOMBSTONE_DAYS (clients with older cursors get a full resync)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Override SYNC_TOMBSTONE_DAYS')
+
+    def handle(self, *args, **options):
+        removed = sync.prune(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Đã xóa {removed} dấu vết xóa cũ."))
@@ -0,0 +1,12 @@
+from AppTiemChung import stats
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Recompute the incremental statistics counters from the raw tables (repair job, run periodically)'
+
+    def handle(self, *args, **options):
+        for name, (old, new) in stats.recompute().items():
+            drift = '' if old is None or old == new else f' (lệch {new - old:+d})'
+            self.stdout.write(f"{name}: {old} -> {new}{drift}")
+        self.stdout.write(self.style.SUCCESS("Đã tính lại thống kê."))
@@ -0,0 +1,37 @@
+import time
+from datetime import date
+
+from AppTiemChung import slots
+from AppTiemChung.models import InjectionSchedule
+from django.core.management.base import BaseCommand
+from django.utils.timezone import timedelta
+
+
+class Command(BaseCommand):
+    help = 'Write Redis slot counters back into InjectionSchedule.slot_count and repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Chạy liên tục như một tiến trình nền')
+        parser.add_argument('--interval', type=float, default=5.0, help='Số giây giữa hai lần đồng bộ')
+        parser.add_argument('--days-back', type=int, default=1,
+                            help='Đồng bộ cả các lịch đã qua trong số ngày này')
+
+    def handle(self, *args, **options):
+        counter = slots.get_counter()
+        while True:
+            since = date.today() - timedelta(days=options['days_back'])
+            flushed = repaired = 0
+            for schedule_id in InjectionSchedule.objects.filter(date__gte=since).values_list('pk', flat=True):
+                result = counter.reconcile(schedule_id)
+                if result is None:
+                    continue
+                consumed, drift = result
+                flushed += consumed
+                if drift:
+                    repaired += 1
+                    self.stdout.write(f"Lịch {schedule_id}: sửa lệch {drift:+d} chỗ")
+
+            self.stdout.write(f"Đã ghi {flushed} chỗ vào DB, sửa lệch {repaired} lịch.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,29 @@
+import time
+
+from AppTiemChung import notifications
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued notification e-mails with retries and backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Chạy liên tục như một worker')
+        parser.add_argument('--interval', type=float, default=5.0, help='Số giây chờ khi hàng đợi trống')
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        while True:
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = notifications.deliver_due(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent + failed < options['batch_size']:
+                    break
+
+            if total_sent or total_failed or not options['loop']:
+                self.stdout.write(f"Đã gửi {total_sent} thông báo, lỗi {total_failed}.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -1,34 +1,112 @@
-from datetime import date
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime
+from itertools import islice
 
+from AppTiemChung import notifications
 from AppTiemChung.models import Appointment
 from django.conf import settings
-from django.core.mail import send_mail
-from django.core.management.base import BaseCommand
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
 from django.utils.timezone import timedelta
 
 
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
 class Command(BaseCommand):
     help = 'Send reminder emails for appointments scheduled for tomorrow'
 
-    def handle(self, *args, **kwargs):
-        tomorrow = date.today() + timedelta(days=1)
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Ngày của lịch hẹn cần nhắc (YYYY-MM-DD), mặc định là ngày mai')
+        parser.add_argument('--workers', type=int, default=4, help='Số luồng gửi mail song song')
+        parser.add_argument('--batch-size', type=int, default=500, help='Số mail gửi qua một kết nối SMTP')
+        parser.add_argument('--queue', action='store_true',
+                            help='Chỉ ghi nhắc nhở vào hàng đợi thông báo để worker gửi')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                target = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("Ngày không hợp lệ (YYYY-MM-DD).")
+        else:
+            target = date.today() + timedelta(days=1)
+
+        # Chỉ lấy các lịch hẹn chưa được nhắc để chạy lại không gửi trùng
         appointments = Appointment.objects.filter(
-            schedule__date=tomorrow,
+            schedule__date=target,
             is_confirmed=True,
-            reminder_enabled=True
-        )
+            reminder_enabled=True,
+            reminder_sent_at__isnull=True,
+        ).select_related('schedule__site', 'user') \
+            .only('id', 'schedule__date', 'schedule__site__name', 'user__email') \
+            .order_by('pk')
 
-        count = 0
-        for appt in appointments:
-            send_mail(
-                'Nhắc nhở lịch tiêm',
-                f'Bạn có lịch hẹn vào ngày {appt.schedule.date} tại {appt.schedule.site.name}.',
-                settings.EMAIL_HOST_USER,
-                [appt.user.email],
-                fail_silently=False,
-            )
-            count += 1
+        if options['queue']:
+            count = 0
+            for batch in batched(appointments.iterator(chunk_size=options['batch_size']), options['batch_size']):
+                count += self.enqueue_batch(batch)
+            self.stdout.write(f"Đã đưa {count} nhắc nhở vào hàng đợi.")
+            return
+
+        count = failed = 0
+        workers = max(options['workers'], 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for batch in batched(appointments.iterator(chunk_size=options['batch_size']), options['batch_size']):
+                pending.add(pool.submit(self.send_batch, batch))
+                # Giới hạn số lô đang chờ để bộ nhớ không tăng theo số lịch hẹn
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        sent, errors = future.result()
+                        count, failed = count + sent, failed + errors
+            for future in pending:
+                sent, errors = future.result()
+                count, failed = count + sent, failed + errors
 
         self.stdout.write(f"Đã gửi nhắc nhở {count} cuộc hẹn.")
-        import os
-        os.system("pause")
+        if failed:
+            raise CommandError(f"{failed} nhắc nhở gửi thất bại, chạy lại lệnh để gửi tiếp.")
+
+    def reminder(self, appt):
+        return (
+            'Nhắc nhở lịch tiêm',
+            f'Bạn có lịch hẹn vào ngày {appt.schedule.date} tại {appt.schedule.site.name}.',
+            appt.user.email,
+        )
+
+    def enqueue_batch(self, batch):
+        batch = [appt for appt in batch if appt.user.email]
+        with transaction.atomic():
+            notifications.enqueue_many([self.reminder(appt) for appt in batch])
+            Appointment.objects.filter(pk__in=[appt.pk for appt in batch]).update(reminder_sent_at=timezone.now())
+        return len(batch)
+
+    def send_batch(self, batch):
+        """
+        Gửi từng mail qua một kết nối SMTP chung cho cả lô và đánh dấu lịch hẹn ngay sau khi mail của nó gửi xong,
+        để lỗi giữa lô không làm gửi lại các mail đã đi. Trả về (số đã gửi, số lỗi).
+        """
+        batch = [appt for appt in batch if appt.user.email]
+        sent = 0
+        try:
+            # Mở kết nối trước: send_messages tự mở rồi đóng kết nối cho mỗi lần gọi nếu chưa mở
+            with get_connection(fail_silently=False) as mail_connection:
+                for appt in batch:
+                    subject, body, recipient = self.reminder(appt)
+                    mail_connection.send_messages([EmailMessage(subject, body, settings.EMAIL_HOST_USER, [recipient])])
+                    Appointment.objects.filter(pk=appt.pk).update(reminder_sent_at=timezone.now())
+                    sent += 1
+        except Exception as e:
+            # Các lịch hẹn chưa đánh dấu sẽ được gửi ở lần chạy sau
+            self.stderr.write(f"Lỗi gửi nhắc nhở, còn {len(batch) - sent} mail của lô chưa gửi: {e}")
+        finally:
+            # Lô chạy ở luồng của pool: đóng kết nối DB của luồng
+            connection.close()
+        return sent, len(batch) - sent
@@ -0,0 +1,71 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from AppTiemChung import stats
+from AppTiemChung.models import Appointment, InjectionSchedule, InjectionSite, User, Vaccine, VaccinationRecord
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, IntegrityError, OperationalError
+from django.utils.timezone import timedelta
+
+
+class Command(BaseCommand):
+    help = 'Stress test dose numbering: mark many appointments of one user inoculated in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointments', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--keep', action='store_true', help='Không xóa dữ liệu thử sau khi chạy')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create(username=f'stress-{tag}', email=f'stress-{tag}@example.com')
+        site = InjectionSite.objects.create(name=f'stress-{tag}', address='stress test')
+        vaccine = Vaccine.objects.create(name=f'stress-{tag}')
+        InjectionSchedule.objects.bulk_create([
+            InjectionSchedule(vaccine=vaccine, site=site, date=date.today() + timedelta(days=i), slot_count=10)
+            for i in range(options['appointments'])
+        ])
+        Appointment.objects.bulk_create([
+            Appointment(user=user, schedule=schedule, is_confirmed=True)
+            for schedule in InjectionSchedule.objects.filter(vaccine=vaccine)
+        ])
+        appointment_ids = list(Appointment.objects.filter(user=user).values_list('pk', flat=True))
+        stats.bump(stats.APPOINTMENTS, len(appointment_ids))
+
+        def inoculate(pk):
+            try:
+                appointment = Appointment.objects.select_related('schedule').get(pk=pk)
+                appointment.is_inoculated = True
+                appointment.save()
+                return 'ok'
+            except IntegrityError:
+                return 'integrity'
+            except OperationalError:
+                return 'error'
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(inoculate, appointment_ids))
+        elapsed = time.perf_counter() - start
+
+        dose_numbers = sorted(VaccinationRecord.objects.filter(user=user, vaccine=vaccine)
+                              .values_list('dose_number', flat=True))
+        expected = list(range(1, results.count('ok') + 1))
+        self.stdout.write(
+            f"{len(appointment_ids)} lần tiêm, {options['workers']} luồng, {elapsed:.2f}s: "
+            f"ok={results.count('ok')} integrity={results.count('integrity')} error={results.count('error')}"
+        )
+        self.stdout.write(f"Các mũi đã ghi: {dose_numbers[:10]}{'...' if len(dose_numbers) > 10 else ''}")
+
+        if not options['keep']:
+            user.delete()
+            vaccine.delete()
+            site.delete()
+
+        if results.count('integrity') or dose_numbers != expected:
+            raise CommandError("Đánh số mũi tiêm bị trùng hoặc bị nhảy số!")
+        self.stdout.write(self.style.SUCCESS("Đánh số mũi tiêm liên tục, không lỗi toàn vẹn."))
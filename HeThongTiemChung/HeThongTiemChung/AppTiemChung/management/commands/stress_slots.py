@@ -0,0 +1,75 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from AppTiemChung import stats
+from AppTiemChung.models import Appointment, InjectionSchedule, InjectionSite, User, Vaccine
+from AppTiemChung.slots import ScheduleFullError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+from django.utils.timezone import timedelta
+
+
+class Command(BaseCommand):
+    help = 'Stress test slot reservation: confirm many appointments concurrently and check for overbooking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slots', type=int, default=50)
+        parser.add_argument('--appointments', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=32)
+        parser.add_argument('--keep', action='store_true', help='Không xóa dữ liệu thử sau khi chạy')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        site = InjectionSite.objects.create(name=f'stress-{tag}', address='stress test')
+        vaccine = Vaccine.objects.create(name=f'stress-{tag}')
+        schedule = InjectionSchedule.objects.create(vaccine=vaccine, site=site,
+                                                    date=date.today() + timedelta(days=1),
+                                                    slot_count=options['slots'])
+        User.objects.bulk_create([
+            User(username=f'stress-{tag}-{i}', email=f'stress-{tag}-{i}@example.com', citizen_id=None)
+            for i in range(options['appointments'])
+        ])
+        users = User.objects.filter(username__startswith=f'stress-{tag}-')
+        Appointment.objects.bulk_create([Appointment(user=u, schedule=schedule) for u in users])
+        stats.bump(stats.APPOINTMENTS, len(users))
+        appointment_ids = list(Appointment.objects.filter(schedule=schedule).values_list('pk', flat=True))
+
+        def confirm(pk):
+            try:
+                appointment = Appointment.objects.select_related('schedule').get(pk=pk)
+                appointment.is_confirmed = True
+                appointment.save()
+                return 'confirmed'
+            except ScheduleFullError:
+                return 'full'
+            except OperationalError:
+                return 'error'
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(confirm, appointment_ids))
+        elapsed = time.perf_counter() - start
+
+        schedule.refresh_from_db()
+        confirmed = Appointment.objects.filter(schedule=schedule, is_confirmed=True).count()
+        overbooked = confirmed > options['slots'] or confirmed + schedule.slot_count != options['slots']
+
+        self.stdout.write(
+            f"{len(appointment_ids)} yêu cầu, {options['workers']} luồng, {elapsed:.2f}s: "
+            f"confirmed={results.count('confirmed')} full={results.count('full')} error={results.count('error')}"
+        )
+        self.stdout.write(f"DB: confirmed={confirmed}, slot_count còn lại={schedule.slot_count}")
+
+        if not options['keep']:
+            User.objects.filter(username__startswith=f'stress-{tag}-').delete()
+            schedule.delete()
+            vaccine.delete()
+            site.delete()
+
+        if overbooked:
+            raise CommandError("Phát hiện đặt vượt số chỗ!")
+        self.stdout.write(self.style.SUCCESS("Không có đặt vượt số chỗ."))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 15:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('AppTiemChung', '0018_stats_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('appointments', models.PositiveIntegerField(default=0)),
+                ('confirmations', models.PositiveIntegerField(default=0)),
+                ('inoculations', models.PositiveIntegerField(default=0)),
+                ('no_shows', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='AppTiemChung.injectionsite')),
+                ('vaccine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='AppTiemChung.vaccine')),
+            ],
+            options={
+                'unique_together': {('date', 'site', 'vaccine')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('AppTiemChung', '0019_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['schedule', 'is_confirmed', 'reminder_enabled', 'reminder_sent_at'], name='AppTiemChun_schedul_3ee5c9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['updated_date'], name='AppTiemChun_updated_b4c4a5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='injectionschedule',
+            index=models.Index(fields=['date'], name='AppTiemChun_date_666ac8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='querylog',
+            index=models.Index(fields=['user', '-timestamp'], name='AppTiemChun_user_id_1c4dbe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccine',
+            index=models.Index(fields=['status', 'name'], name='AppTiemChun_status_a16396_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2 on 2026-10-18 15:40
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+FULLTEXT_INDEXES = [
+    ('AppTiemChung_vaccine', 'vaccine_search_text_ft'),
+    ('AppTiemChung_injectionsite', 'injectionsite_search_text_ft'),
+]
+
+
+# Bản sao của search.fold/document tại thời điểm tạo migration: migration không import code của app
+# để vẫn chạy được khi module search thay đổi sau này
+def document(*parts):
+    text = ' '.join(part for part in parts if part).lower().replace('đ', 'd')
+    text = ''.join(ch for ch in unicodedata.normalize('NFD', text) if not unicodedata.combining(ch))
+    return ' '.join(re.findall(r'\w+', text))
+
+
+def fill_search_text(apps, schema_editor):
+    Vaccine = apps.get_model('AppTiemChung', 'Vaccine')
+    InjectionSite = apps.get_model('AppTiemChung', 'InjectionSite')
+    vaccines = list(Vaccine.objects.only('name', 'manufacturer'))
+    for vaccine in vaccines:
+        vaccine.search_text = document(vaccine.name, vaccine.manufacturer)
+    Vaccine.objects.bulk_update(vaccines, ['search_text'], batch_size=500)
+    sites = list(InjectionSite.objects.only('name', 'address'))
+    for site in sites:
+        site.search_text = document(site.name, site.address)
+    InjectionSite.objects.bulk_update(sites, ['search_text'], batch_size=500)
+
+
+def add_fulltext(apps, schema_editor):
+    # Chỉ MySQL có FULLTEXT; SQLite dùng chỉ mục trong bộ nhớ của search.MemoryBackend
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, name in FULLTEXT_INDEXES:
+        schema_editor.execute(f"ALTER TABLE `{table}` ADD FULLTEXT INDEX `{name}` (`search_text`)")
+
+
+def drop_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, name in FULLTEXT_INDEXES:
+        schema_editor.execute(f"ALTER TABLE `{table}` DROP INDEX `{name}`")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('AppTiemChung', '0020_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='injectionsite',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='vaccine',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(add_fulltext, drop_fulltext),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('AppTiemChung', '0021_search_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='injectionsite',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=9),
+        ),
+        migrations.AddField(
+            model_name='injectionsite',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='injectionsite',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 15:46
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('AppTiemChung', '0022_injectionsite_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('user_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['user', 'updated_date'], name='AppTiemChun_user_id_92bed3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='injectionschedule',
+            index=models.Index(fields=['updated_date'], name='AppTiemChun_updated_b3518c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccinationrecord',
+            index=models.Index(fields=['user', 'updated_date'], name='AppTiemChun_user_id_540fd3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['deleted_at'], name='AppTiemChun_deleted_fda6f9_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 15:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('AppTiemChung', '0023_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatConversation',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='chat', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_message', models.TextField(blank=True)),
+                ('last_sender', models.CharField(blank=True, max_length=150)),
+                ('last_is_user', models.BooleanField(default=True)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('last_message_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-last_message_at'], name='AppTiemChun_last_me_b55dca_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('AppTiemChung', '0025_chatmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaqCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question', models.CharField(max_length=500)),
+                ('keywords', models.CharField(blank=True, max_length=255)),
+                ('examples', models.JSONField(blank=True, default=list)),
+                ('asked_count', models.PositiveIntegerField(default=0)),
+                ('unanswered_count', models.PositiveIntegerField(default=0)),
+                ('score', models.PositiveIntegerField(default=0)),
+                ('first_seen', models.DateTimeField(blank=True, null=True)),
+                ('last_seen', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('new', 'Mới'), ('accepted', 'Đã thêm FAQ'), ('dismissed', 'Bỏ qua')], default='new', max_length=20)),
+                ('mined_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['status', '-score'], name='AppTiemChun_status_05e2ce_idx')],
+            },
+        ),
+    ]
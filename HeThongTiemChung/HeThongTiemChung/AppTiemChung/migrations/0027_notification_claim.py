@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-18 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('AppTiemChung', '0026_faqcandidate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='claimed_by',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='status',
+            field=models.CharField(choices=[('Pending', 'Chờ gửi'), ('Sending', 'Đang gửi'), ('Sent', 'Đã gửi'), ('Failed', 'Gửi thất bại')], default='Pending', max_length=10),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-18 16:18
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def fill_vaccinated(apps, schema_editor):
+    User = apps.get_model('AppTiemChung', 'User')
+    VaccinationRecord = apps.get_model('AppTiemChung', 'VaccinationRecord')
+    User.objects.update(vaccinated=Exists(VaccinationRecord.objects.filter(user=OuterRef('pk'))))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('AppTiemChung', '0027_notification_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='vaccinated',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(fill_vaccinated, migrations.RunPython.noop),
+    ]
@@ -3,10 +3,12 @@ from cloudinary.models import CloudinaryField
 from django.contrib.auth.models import AbstractUser
 
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from . import doses, geo, search, slots
+
 
 # Create your models here.
 class BaseModel(models.Model):
@@ -37,6 +39,8 @@ class User(AbstractUser, BaseModel):
     phone_number = models.CharField(max_length=11, unique=True, null=True, blank=True)
     avatar = CloudinaryField(null=True)
     is_verified = models.BooleanField(default=False)
+    # Đã có hồ sơ tiêm; chỉ stats đổi cờ này bằng UPDATE có điều kiện để đếm số người đã tiêm
+    vaccinated = models.BooleanField(default=False, editable=False)
     modified_date = models.DateTimeField(default=timezone.now)
 
     USERNAME_FIELD = 'username'
@@ -78,23 +82,45 @@ class Vaccine(BaseModel):
         choices=Status.choices,
         default=Status.ACTIVE
     )
+    # Tên + hãng sản xuất đã bỏ dấu, dùng cho tìm kiếm toàn văn
+    search_text = models.TextField(blank=True, default='', editable=False)
 
     class Meta:
         unique_together = (('name', 'vaccine_type'),)
+        indexes = [
+            models.Index(fields=['status', 'name']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.search_text = search.document(self.name, self.manufacturer)
+        super().save(*args, **kwargs)
+
 
 class InjectionSite(BaseModel):
     name = models.CharField(max_length=100, unique=True)
     address = models.TextField()
     phone = models.CharField(max_length=15, blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
+    search_text = models.TextField(blank=True, default='', editable=False)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    # Geohash của tọa độ, tra theo tiền tố để tìm cơ sở gần nhất
+    geohash = models.CharField(max_length=geo.PRECISION, blank=True, default='', db_index=True, editable=False)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.search_text = search.document(self.name, self.address)
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        super().save(*args, **kwargs)
+
 
 class InjectionSchedule(BaseModel):
     vaccine = models.ForeignKey(Vaccine, on_delete=models.CASCADE)
@@ -104,6 +130,10 @@ class InjectionSchedule(BaseModel):
 
     class Meta:
         unique_together = ('vaccine', 'site', 'date')
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['updated_date']),
+        ]
 
     def __str__(self):
         return f"{self.vaccine.name} - {self.date}"
@@ -114,6 +144,7 @@ class Appointment(BaseModel):
     schedule = models.ForeignKey(InjectionSchedule, on_delete=models.CASCADE)
     registered_at = models.DateTimeField(auto_now_add=True)
     reminder_enabled = models.BooleanField(default=False)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True)
     is_confirmed = models.BooleanField(default=False)
     is_inoculated = models.BooleanField(default=False)
 
@@ -126,45 +157,50 @@ class Appointment(BaseModel):
 
     def save(self, *args, **kwargs):
         self.clean()
-        # Kiểm tra nếu lịch hẹn mới được xác nhận
-        if self.pk is not None:
-            old = Appointment.objects.get(pk=self.pk)
-            if not old.is_confirmed and self.is_confirmed:
-                if self.schedule.slot_count > 0:
-                    self.schedule.slot_count -= 1
-                    self.schedule.save()
-                else:
-                    raise ValueError("Lịch tiêm đã hết chỗ!")
-            if old.is_confirmed and not self.is_confirmed:
-                self.schedule.slot_count += 1
-                self.schedule.save()
-        elif self.is_confirmed:
-            if self.schedule.slot_count > 0:
-                self.schedule.slot_count -= 1
-                self.schedule.save()
-            else:
-                raise ValueError("Lịch tiêm đã hết chỗ!")
-
-        super().save(*args, **kwargs)
-
-        if self.is_inoculated and not hasattr(self, 'vaccinationrecord'):
-            self.create_vaccination_record()
+        with slots.atomic():
+            # Khóa dòng lịch hẹn cũ để hai lần xác nhận đồng thời không trừ chỗ hai lần
+            was_confirmed, was_inoculated, old_schedule_id = False, False, None
+            if self.pk is not None:
+                old = Appointment.objects.select_for_update() \
+                    .filter(pk=self.pk).values_list('is_confirmed', 'is_inoculated', 'schedule_id').first()
+                if old:
+                    was_confirmed, was_inoculated, old_schedule_id = old
+
+            if was_confirmed and old_schedule_id != self.schedule_id:
+                # Đổi sang lịch khác: trả chỗ cho lịch cũ rồi giữ chỗ ở lịch mới
+                slots.release_slot(InjectionSchedule(pk=old_schedule_id))
+                was_confirmed = False
+
+            if self.is_confirmed and not was_confirmed:
+                slots.reserve_slot(self.schedule)
+            elif was_confirmed and not self.is_confirmed:
+                slots.release_slot(self.schedule)
+
+            # Signal post_save dựa vào giá trị cũ để cập nhật bộ đếm thống kê
+            self._was_inoculated = was_inoculated
+            super().save(*args, **kwargs)
+
+            # Chỉ tạo hồ sơ tiêm khi lịch hẹn vừa chuyển sang ĐÃ TIÊM
+            if self.is_inoculated and not was_inoculated:
+                self.create_vaccination_record()
 
     def create_vaccination_record(self):
-        previous_doses = VaccinationRecord.objects.filter(
-            user=self.user,
-            vaccine=self.schedule.vaccine
-        ).count()
-        VaccinationRecord.objects.create(
-            user=self.user,
-            vaccine=self.schedule.vaccine,
-            dose_number=previous_doses + 1,
+        return doses.create_record(
+            user_id=self.user_id,
+            vaccine_id=self.schedule.vaccine_id,
             injection_date=self.schedule.date,
-            site=self.schedule.site,
+            site_id=self.schedule.site_id,
         )
 
     class Meta:
         unique_together = ('user', 'schedule')
+        indexes = [
+            # Truy vấn nhắc lịch của send_reminds
+            models.Index(fields=['schedule', 'is_confirmed', 'reminder_enabled', 'reminder_sent_at']),
+            # Quét các lịch hẹn thay đổi (build_rollups, sync)
+            models.Index(fields=['updated_date']),
+            models.Index(fields=['user', 'updated_date']),
+        ]
 
 
 class VaccinationRecord(BaseModel):
@@ -180,6 +216,9 @@ class VaccinationRecord(BaseModel):
 
     class Meta:
         unique_together = ('user', 'vaccine', 'dose_number')
+        indexes = [
+            models.Index(fields=['user', 'updated_date']),
+        ]
 
 
 class Faq(models.Model):
@@ -215,6 +254,164 @@ class QueryLog(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['user', '-timestamp']),
+        ]
 
     def __str__(self):
         return f"Query by {self.user.username} at {self.timestamp}"
+
+
+class Notification(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'Pending', _('Chờ gửi')
+        SENDING = 'Sending', _('Đang gửi')
+        SENT = 'Sent', _('Đã gửi')
+        FAILED = 'Failed', _('Gửi thất bại')
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    recipient = models.EmailField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # Với trạng thái Đang gửi: thời điểm hết hạn giữ chỗ của worker `claimed_by`
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True, default='')
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
+
+
+class StatCounter(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class VaccineTally(models.Model):
+    vaccine = models.OneToOneField(Vaccine, on_delete=models.CASCADE, primary_key=True, related_name='tally')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-count']),
+        ]
+
+    def __str__(self):
+        return f"{self.vaccine_id}: {self.count}"
+
+
+class DailyRollup(models.Model):
+    date = models.DateField()
+    site = models.ForeignKey(InjectionSite, on_delete=models.CASCADE)
+    vaccine = models.ForeignKey(Vaccine, on_delete=models.CASCADE)
+    appointments = models.PositiveIntegerField(default=0)
+    confirmations = models.PositiveIntegerField(default=0)
+    inoculations = models.PositiveIntegerField(default=0)
+    no_shows = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('date', 'site', 'vaccine')
+
+    def __str__(self):
+        return f"{self.date} - {self.site_id} - {self.vaccine_id}"
+
+
+class SyncTombstone(models.Model):
+    """Dấu vết bản ghi bị xóa hẳn, để API sync báo cho app xóa bản sao cục bộ."""
+    kind = models.CharField(max_length=20)
+    object_id = models.PositiveIntegerField()
+    # Không dùng khóa ngoại: dấu vết phải còn sau khi người dùng bị xóa; NULL = dữ liệu chung (lịch tiêm)
+    user_id = models.PositiveIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id} deleted at {self.deleted_at}"
+
+
+class ChatConversation(models.Model):
+    """Tóm tắt hội thoại của một người dùng với nhân viên, cập nhật mỗi khi có tin nhắn (hộp thư nhân viên)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='chat')
+    last_message = models.TextField(blank=True)
+    last_sender = models.CharField(max_length=150, blank=True)
+    last_is_user = models.BooleanField(default=True)
+    # Số tin nhắn của người dùng mà nhân viên chưa đọc
+    unread_count = models.PositiveIntegerField(default=0)
+    message_count = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-last_message_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.last_message[:50]}"
+
+
+class ChatMessage(models.Model):
+    """Lịch sử tin nhắn khi dùng backend chat 'database' thay cho Firebase."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_messages')
+    key = models.CharField(max_length=20, unique=True)
+    text = models.TextField()
+    sender = models.CharField(max_length=150)
+    is_user = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'key']),
+        ]
+
+    def __str__(self):
+        return f"{self.sender}: {self.text[:50]}"
+
+
+class FaqCandidate(models.Model):
+    """Câu hỏi hay gặp được gom từ QueryLog / UnansweredQuestion (lệnh mine_faqs) để admin cân nhắc thêm FAQ."""
+    NEW = 'new'
+    ACCEPTED = 'accepted'
+    DISMISSED = 'dismissed'
+    STATUS_CHOICES = [
+        (NEW, 'Mới'),
+        (ACCEPTED, 'Đã thêm FAQ'),
+        (DISMISSED, 'Bỏ qua'),
+    ]
+
+    question = models.CharField(max_length=500)
+    keywords = models.CharField(max_length=255, blank=True)
+    # Vài cách hỏi khác nhau trong cụm, nhiều nhất trước
+    examples = models.JSONField(default=list, blank=True)
+    asked_count = models.PositiveIntegerField(default=0)
+    unanswered_count = models.PositiveIntegerField(default=0)
+    score = models.PositiveIntegerField(default=0)
+    first_seen = models.DateTimeField(null=True, blank=True)
+    last_seen = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=NEW)
+    mined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['status', '-score']),
+        ]
+
+    def __str__(self):
+        return f"{self.question} ({self.score})"
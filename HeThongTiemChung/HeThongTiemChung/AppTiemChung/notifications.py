@@ -0,0 +1,155 @@
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.timezone import timedelta
+
+from .models import Notification
+
+LEASE_SECONDS = 120
+
+
+def enqueue(subject, body, recipient):
+    """
+    Ghi thông báo vào hàng đợi trong cùng transaction với thay đổi nghiệp vụ;
+    worker chỉ được đánh thức sau khi transaction commit.
+    """
+    if not recipient:
+        return None
+    notification = Notification.objects.create(subject=subject, body=body, recipient=recipient)
+    transaction.on_commit(wake_worker)
+    return notification
+
+
+def enqueue_many(messages):
+    notifications = Notification.objects.bulk_create([
+        Notification(subject=subject, body=body, recipient=recipient)
+        for subject, body, recipient in messages if recipient
+    ], batch_size=500)
+    if notifications:
+        transaction.on_commit(wake_worker)
+    return notifications
+
+
+def backoff(attempts):
+    # 30s, 60s, 120s, ... tối đa 1 giờ
+    return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600))
+
+
+def claim_due(batch_size, token):
+    """
+    Chuyển một lô thông báo đến hạn sang Đang gửi, gắn mã của worker và hạn giữ chỗ LEASE_SECONDS.
+    Thông báo Đang gửi đã quá hạn (worker dừng giữa chừng) được nhận lại như thông báo chờ gửi.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = list(Notification.objects.select_for_update(
+            skip_locked=connection.features.has_select_for_update_skip_locked
+        ).filter(
+            status__in=[Notification.Status.PENDING, Notification.Status.SENDING],
+            next_attempt_at__lte=now,
+        ).order_by('next_attempt_at')[:batch_size])
+        if due:
+            Notification.objects.filter(pk__in=[n.pk for n in due]).update(
+                status=Notification.Status.SENDING,
+                claimed_by=token,
+                next_attempt_at=now + timedelta(seconds=LEASE_SECONDS),
+            )
+    return due
+
+
+def extend_lease(notification, token):
+    """Gia hạn giữ chỗ ngay trước khi gửi; False nếu thông báo đã hết hạn và thuộc về worker khác."""
+    return Notification.objects.filter(
+        pk=notification.pk, status=Notification.Status.SENDING, claimed_by=token,
+    ).update(next_attempt_at=timezone.now() + timedelta(seconds=LEASE_SECONDS)) > 0
+
+
+def deliver_due(batch_size=100):
+    """Gửi một lô thông báo đến hạn qua một kết nối SMTP. Trả về (số đã gửi, số lỗi)."""
+    token = uuid.uuid4().hex
+    due = claim_due(batch_size, token)
+    if not due:
+        return 0, 0
+
+    max_attempts = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+    sent = failed = 0
+    mail_connection = get_connection(fail_silently=False)
+    try:
+        mail_connection.open()
+    except Exception:
+        # Không mở được kết nối: mỗi lần send() sẽ thử lại và lỗi được ghi theo từng thông báo
+        pass
+    try:
+        for notification in due:
+            # SMTP chậm có thể làm cả lô vượt LEASE_SECONDS: giữ chỗ được gia hạn theo từng thư
+            # để thư chưa gửi không bị worker khác nhận lại và gửi trùng
+            if not extend_lease(notification, token):
+                continue
+            changes = {'attempts': notification.attempts + 1, 'claimed_by': ''}
+            try:
+                EmailMessage(notification.subject, notification.body, settings.EMAIL_HOST_USER,
+                             [notification.recipient], connection=mail_connection).send()
+            except Exception as e:
+                failed += 1
+                changes['last_error'] = str(e)
+                if changes['attempts'] >= max_attempts:
+                    changes['status'] = Notification.Status.FAILED
+                else:
+                    changes['status'] = Notification.Status.PENDING
+                    changes['next_attempt_at'] = timezone.now() + backoff(changes['attempts'])
+            else:
+                sent += 1
+                changes['status'] = Notification.Status.SENT
+                changes['sent_at'] = timezone.now()
+            # Ghi kết quả ngay sau mỗi thư: lỗi giữa lô không làm các thư đã gửi bị gửi lại
+            Notification.objects.filter(pk=notification.pk, claimed_by=token).update(**changes)
+    finally:
+        mail_connection.close()
+
+    return sent, failed
+
+
+class LocalWorker:
+    """Luồng nền trong tiến trình web, gửi thông báo ngay sau commit và thử lại định kỳ."""
+
+    def __init__(self, poll_interval=30.0, batch_size=100):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def wake(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='notification-worker', daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+            try:
+                while deliver_due(self.batch_size)[0] == self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"Error in notification worker: {e}")
+            finally:
+                connection.close()
+
+
+_worker = None
+
+
+def wake_worker():
+    global _worker
+    if not getattr(settings, 'NOTIFICATION_LOCAL_WORKER', True):
+        return
+    if _worker is None:
+        _worker = LocalWorker(poll_interval=getattr(settings, 'NOTIFICATION_POLL_INTERVAL', 30.0))
+    _worker.wake()
@@ -0,0 +1,48 @@
+from rest_framework import pagination
+
+
+class CursorPaginator(pagination.CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-id'
+
+
+class SchedulePaginator(CursorPaginator):
+    ordering = ('date', 'id')
+
+
+class UserPaginator(CursorPaginator):
+    ordering = ('username', 'id')
+
+
+class RecordPaginator(CursorPaginator):
+    # Mũi tiêm gần nhất trước
+    ordering = ('-injection_date', '-id')
+
+
+class InboxPaginator(CursorPaginator):
+    # Nhiều hội thoại có thể cùng last_message_at: thêm pk để cursor không bỏ sót hay lặp dòng
+    ordering = ('-last_message_at', '-pk')
+
+
+class ChatMessagePaginator(CursorPaginator):
+    # Khóa push tăng dần theo thời gian gửi
+    ordering = '-key'
+
+
+class SearchPaginator(pagination.PageNumberPagination):
+    # Kết quả tìm kiếm sắp theo điểm khớp nên không dùng được cursor theo id
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CursorPaginatedMixin:
+    pagination_class = CursorPaginator
+
+    def paginated_response(self, queryset, serializer_class=None, pagination_class=None):
+        paginator = (pagination_class or self.pagination_class)()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        serializer = (serializer_class or self.serializer_class)(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,127 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+NAMES_KEY = 'resp_cache:names'
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _label(model):
+    return model if isinstance(model, str) else model._meta.label
+
+
+def _version_key(model):
+    return f"resp_version:{_label(model)}"
+
+
+def _count(key):
+    cache = get_cache()
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
+
+
+def versions(models):
+    cache = get_cache()
+    keys = [_version_key(model) for model in models]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            # Khởi tạo bằng thời điểm hiện tại (không phải 0) để khi cache bị xóa khóa phiên bản
+            # thì không quay lại một phiên bản cũ còn sót entry
+            cache.add(key, time.time_ns() // 1000, timeout=None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def bump(model):
+    """Tăng phiên bản của model sau khi transaction commit; mọi entry phụ thuộc tự hết hiệu lực."""
+    key = _version_key(model)
+
+    def apply():
+        cache = get_cache()
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns() // 1000, timeout=None)
+
+    transaction.on_commit(apply)
+
+
+def _entry_key(name, models, parts):
+    version = '.'.join(str(v) for v in versions(models))
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f"resp:{name}:{version}:{digest}"
+
+
+def cached(name, models, build, parts=()):
+    """
+    Trả response.data đã cache cho (name, phiên bản các model, parts) hoặc gọi build().
+    Chỉ một request dựng lại entry (khóa cache.add); các request khác chờ ngắn rồi đọc entry đó.
+    """
+    cache = get_cache()
+    key = _entry_key(name, models, parts)
+    data = cache.get(key)
+    if data is not None:
+        _count(f"resp_cache:{name}:hits")
+        return Response(data)
+
+    _count(f"resp_cache:{name}:misses")
+    lock_key = f"{key}:lock"
+    lock_timeout = getattr(settings, 'RESPONSE_CACHE_LOCK_TIMEOUT', 10)
+    if not cache.add(lock_key, 1, timeout=lock_timeout):
+        deadline = time.monotonic() + getattr(settings, 'RESPONSE_CACHE_WAIT', 2.0)
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            data = cache.get(key)
+            if data is not None:
+                _count(f"resp_cache:{name}:waits")
+                return Response(data)
+        # Request dựng entry quá chậm hoặc đã lỗi: tự dựng nhưng không ghi đè
+        return build()
+
+    try:
+        response = build()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout=getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 86400))
+            names = cache.get(NAMES_KEY) or set()
+            if name not in names:
+                cache.set(NAMES_KEY, names | {name}, timeout=None)
+        return response
+    finally:
+        cache.delete(lock_key)
+
+
+class CachedResponseMixin:
+    """Cache dữ liệu đã serialize của các action chỉ đọc, khóa theo phiên bản của các model liên quan."""
+
+    def cached_response(self, name, models, build, parts=()):
+        return cached(name, models, build, parts=(self.request.build_absolute_uri(), *parts))
+
+
+def stats():
+    cache = get_cache()
+    result = {}
+    for name in sorted(cache.get(NAMES_KEY) or ()):
+        counters = cache.get_many([f"resp_cache:{name}:{kind}" for kind in ('hits', 'misses', 'waits')])
+        hits = counters.get(f"resp_cache:{name}:hits", 0)
+        misses = counters.get(f"resp_cache:{name}:misses", 0)
+        waits = counters.get(f"resp_cache:{name}:waits", 0)
+        total = hits + misses
+        result[name] = {
+            'hits': hits,
+            'misses': misses,
+            'waits': waits,
+            'hit_ratio': round((hits + waits) / total, 4) if total else 0,
+        }
+    return result
@@ -0,0 +1,116 @@
+import threading
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from .models import Appointment, DailyRollup, InjectionSchedule
+
+GROUPS = {
+    'date': ('date',),
+    'site': ('site', 'site__name'),
+    'vaccine': ('vaccine', 'vaccine__name'),
+}
+MEASURES = ('appointments', 'confirmations', 'inoculations', 'no_shows')
+
+_pending = threading.local()
+
+
+def last_run():
+    return DailyRollup.objects.aggregate(last=Max('computed_at'))['last']
+
+
+def changed_dates(since, lookback=2):
+    """
+    Các ngày cần tính lại: ngày của lịch hẹn bị sửa từ lần chạy trước, cộng với
+    `lookback` ngày gần nhất (số vắng mặt thay đổi khi qua ngày). Lịch hẹn bị xóa không còn
+    updated_date nên ngày của nó được tính lại ngay khi xóa (xem appointment_deleted).
+    """
+    today = date.today()
+    dates = {today - timedelta(days=i) for i in range(lookback + 1)}
+    dates.update(Appointment.objects.filter(updated_date__gte=since)
+                 .values_list('schedule__date', flat=True).distinct())
+    return sorted(dates)
+
+
+def all_dates():
+    return list(Appointment.objects.values_list('schedule__date', flat=True).distinct().order_by('schedule__date'))
+
+
+def rebuild(dates, computed_at=None):
+    """Tính lại toàn bộ dòng tổng hợp của các ngày cho trước, trả về số dòng đã ghi."""
+    computed_at = computed_at or timezone.now()
+    today = date.today()
+    rows = Appointment.objects.filter(schedule__date__in=dates) \
+        .values('schedule__date', 'schedule__site', 'schedule__vaccine') \
+        .annotate(
+            appointments=Count('id'),
+            confirmations=Count('id', filter=Q(is_confirmed=True)),
+            inoculations=Count('id', filter=Q(is_inoculated=True)),
+            no_shows=Count('id', filter=Q(is_confirmed=True, is_inoculated=False, schedule__date__lt=today)),
+        ).order_by()
+
+    rollups = [
+        DailyRollup(
+            date=row['schedule__date'],
+            site_id=row['schedule__site'],
+            vaccine_id=row['schedule__vaccine'],
+            appointments=row['appointments'],
+            confirmations=row['confirmations'],
+            inoculations=row['inoculations'],
+            no_shows=row['no_shows'],
+            computed_at=computed_at,
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        DailyRollup.objects.filter(date__in=dates).delete()
+        DailyRollup.objects.bulk_create(rollups, batch_size=500)
+    return len(rollups)
+
+
+def appointment_deleted(schedule_id):
+    _mark_deleted(schedule_ids={schedule_id})
+
+
+def schedule_deleted(schedule_date):
+    _mark_deleted(dates={schedule_date})
+
+
+def _mark_deleted(schedule_ids=(), dates=()):
+    # Xóa theo cascade gửi post_delete cho từng lịch hẹn: gom lại, lần flush đầu tiên lúc commit xử lý hết
+    pending = _pending.__dict__.setdefault('deleted', {'schedule_ids': set(), 'dates': set()})
+    pending['schedule_ids'].update(schedule_ids)
+    pending['dates'].update(dates)
+    transaction.on_commit(lambda: _flush_deleted(pending))
+
+
+def _flush_deleted(pending):
+    """Tính lại các ngày đã có dòng tổng hợp; giữ nguyên computed_at để lần chạy tăng dần sau không bỏ sót."""
+    schedule_ids, dates = set(pending['schedule_ids']), set(pending['dates'])
+    pending['schedule_ids'].clear()
+    pending['dates'].clear()
+    if schedule_ids:
+        dates.update(InjectionSchedule.objects.filter(pk__in=schedule_ids).values_list('date', flat=True))
+    if not dates:
+        return
+    computed_at = last_run()
+    dates = sorted(DailyRollup.objects.filter(date__in=dates).values_list('date', flat=True).distinct())
+    if dates:
+        rebuild(dates, computed_at=computed_at)
+
+
+def prune(before):
+    """Xóa các dòng không được tính lại trong lần chạy toàn bộ (ngày không còn lịch hẹn nào)."""
+    return DailyRollup.objects.filter(computed_at__lt=before).delete()[0]
+
+
+def query(date_from, date_to, group_by='date', site=None, vaccine=None):
+    fields = GROUPS[group_by]
+    rollups = DailyRollup.objects.filter(date__gte=date_from, date__lte=date_to)
+    if site:
+        rollups = rollups.filter(site_id=site)
+    if vaccine:
+        rollups = rollups.filter(vaccine_id=vaccine)
+    return rollups.values(*fields).annotate(**{measure: Sum(measure) for measure in MEASURES}).order_by(*fields)
@@ -0,0 +1,160 @@
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, Case, Count, FloatField, Max, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def fold(text):
+    """Chữ thường, bỏ dấu tiếng Việt ("Viêm gan Đ" -> "viem gan d")."""
+    text = (text or '').lower().replace('đ', 'd')
+    text = unicodedata.normalize('NFD', text)
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(fold(text))
+
+
+def document(*parts):
+    """Chuỗi đã bỏ dấu lưu vào cột search_text để đánh chỉ mục."""
+    return ' '.join(tokenize(' '.join(part for part in parts if part)))
+
+
+class InvertedIndex:
+    """
+    Chỉ mục đảo trong bộ nhớ cho SQLite / môi trường test: token -> {pk: tần suất}.
+    Từ vựng được sắp xếp để mở rộng tiền tố bằng bisect (gõ "viem ga" khớp "viem gan").
+    """
+
+    def __init__(self, documents, signature=None):
+        self.signature = signature
+        self.postings = defaultdict(dict)
+        for pk, text in documents:
+            for token in text.split():
+                self.postings[token][pk] = self.postings[token].get(pk, 0) + 1
+        self.vocabulary = sorted(self.postings)
+        self.size = len(documents)
+
+    def expand(self, prefix):
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + '\uffff')
+        return self.vocabulary[start:end]
+
+    def search(self, query, limit):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        scores = None
+        for token in tokens:
+            # Mọi token phải khớp (AND), điểm là tf-idf lớn nhất trong các từ cùng tiền tố
+            token_scores = {}
+            for word in self.expand(token):
+                idf = math.log(1 + self.size / len(self.postings[word]))
+                for pk, tf in self.postings[word].items():
+                    token_scores[pk] = max(token_scores.get(pk, 0), tf * idf)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {pk: score + token_scores[pk] for pk, score in scores.items() if pk in token_scores}
+            if not scores:
+                return []
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+class MemoryBackend:
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def signature(self, model):
+        return tuple(model.objects.aggregate(count=Count('pk'), last=Max('updated_date')).values())
+
+    def get_index(self, model):
+        signature = self.signature(model)
+        index = self._indexes.get(model)
+        if index is None or index.signature != signature:
+            with self._lock:
+                index = self._indexes.get(model)
+                if index is None or index.signature != signature:
+                    index = InvertedIndex(list(model.objects.values_list('pk', 'search_text')), signature)
+                    self._indexes[model] = index
+        return index
+
+    def match(self, model, query, limit):
+        return self.get_index(model).search(query, limit)
+
+
+class MySQLBackend:
+    """Dùng FULLTEXT index trên cột search_text (cần innodb_ft_min_token_size=2 cho âm tiết tiếng Việt)."""
+
+    def boolean_query(self, query):
+        return ' '.join(f'+{token}*' for token in tokenize(query))
+
+    def match(self, model, query, limit):
+        against = self.boolean_query(query)
+        if not against:
+            return []
+        column = f"{connection.ops.quote_name(model._meta.db_table)}.{connection.ops.quote_name('search_text')}"
+        sql = f"MATCH ({column}) AGAINST (%s IN BOOLEAN MODE)"
+        return list(
+            model.objects.filter(RawSQL(sql, [against], output_field=BooleanField()))
+            .annotate(score=RawSQL(sql, [against], output_field=FloatField()))
+            .order_by('-score', 'pk').values_list('pk', 'score')[:limit]
+        )
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        name = getattr(settings, 'SEARCH_BACKEND', 'auto')
+        if name == 'auto':
+            name = 'mysql' if connection.vendor == 'mysql' else 'memory'
+        _backend = MySQLBackend() if name == 'mysql' else MemoryBackend()
+    return _backend
+
+
+def max_matches():
+    return getattr(settings, 'SEARCH_MAX_MATCHES', 500)
+
+
+def score_of(field, scores):
+    """Biểu thức CASE trả về điểm khớp theo pk (số pk bị giới hạn bởi SEARCH_MAX_MATCHES)."""
+    if not scores:
+        return Value(0.0)
+    return Case(*[When(**{field: pk}, then=Value(score)) for pk, score in scores.items()],
+                default=Value(0.0), output_field=FloatField())
+
+
+def search_vaccines(queryset, query):
+    from .models import Vaccine
+
+    scores = dict(get_backend().match(Vaccine, query, max_matches()))
+    if not scores:
+        return queryset.none()
+    return queryset.filter(pk__in=list(scores)).annotate(rank=score_of('pk', scores)).order_by('-rank', 'name', 'id')
+
+
+def search_schedules(queryset, query):
+    """Lịch tiêm khớp khi tên vaccine hoặc tên/địa chỉ cơ sở khớp từ khóa."""
+    from .models import InjectionSite, Vaccine
+
+    backend = get_backend()
+    vaccine_scores = dict(backend.match(Vaccine, query, max_matches()))
+    site_scores = dict(backend.match(InjectionSite, query, max_matches()))
+    if not vaccine_scores and not site_scores:
+        return queryset.none()
+    return queryset.filter(Q(vaccine_id__in=list(vaccine_scores)) | Q(site_id__in=list(site_scores))) \
+        .annotate(rank=score_of('vaccine_id', vaccine_scores) + score_of('site_id', site_scores)) \
+        .order_by('-rank', 'date', 'id')
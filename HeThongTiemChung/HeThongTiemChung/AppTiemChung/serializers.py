@@ -4,7 +4,8 @@ from datetime import date, datetime
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 
-from .models import Vaccine, VaccineType, User, Appointment, VaccinationRecord, InjectionSchedule, InjectionSite
+from .models import Vaccine, VaccineType, User, Appointment, VaccinationRecord, InjectionSchedule, InjectionSite, \
+    ChatConversation, ChatMessage
 
 
 class VaccineTypeSerializer(serializers.ModelSerializer):
@@ -204,4 +205,21 @@ class InjectionScheduleSerializer(serializers.ModelSerializer):
 class InjectionSiteSerializer(serializers.ModelSerializer):
     class Meta:
         model = InjectionSite
-        fields = ['id', 'name', 'address', 'phone']
+        fields = ['id', 'name', 'address', 'phone', 'latitude', 'longitude']
+        extra_kwargs = {'latitude': {'min_value': -90, 'max_value': 90},
+                        'longitude': {'min_value': -180, 'max_value': 180}}
+
+
+class ChatConversationSerializer(serializers.ModelSerializer):
+    user_name = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = ChatConversation
+        fields = ['user_id', 'user_name', 'last_message', 'last_sender', 'last_is_user',
+                  'unread_count', 'message_count', 'last_message_at']
+
+
+class ChatMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatMessage
+        fields = ['key', 'text', 'sender', 'is_user', 'created_at']
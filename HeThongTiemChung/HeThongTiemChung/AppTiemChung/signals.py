@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import faq_index, response_cache, rollups, stats, sync
+from .models import Appointment, Faq, InjectionSchedule, InjectionSite, VaccinationRecord, Vaccine, VaccineType
+
+
+@receiver(post_save, sender=Faq)
+def update_faq_index(sender, instance, **kwargs):
+    transaction.on_commit(lambda: faq_index.faq_saved(instance))
+
+
+@receiver(post_delete, sender=Faq)
+def remove_from_faq_index(sender, instance, **kwargs):
+    faq_id = instance.pk
+    transaction.on_commit(lambda: faq_index.faq_deleted(faq_id))
+
+
+@receiver(post_save, sender=Appointment)
+def count_appointment(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(stats.APPOINTMENTS)
+    was_inoculated = getattr(instance, '_was_inoculated', False)
+    stats.bump(stats.COMPLETED, int(instance.is_inoculated) - int(was_inoculated))
+
+
+@receiver(post_delete, sender=Appointment)
+def uncount_appointment(sender, instance, **kwargs):
+    sync.record_deletion('appointments', instance, instance.user_id)
+    rollups.appointment_deleted(instance.schedule_id)
+    stats.bump(stats.APPOINTMENTS, -1)
+    if instance.is_inoculated:
+        stats.bump(stats.COMPLETED, -1)
+
+
+@receiver(post_save, sender=VaccinationRecord)
+def count_record(sender, instance, created, **kwargs):
+    if created:
+        stats.records_created([instance])
+
+
+@receiver(post_delete, sender=VaccinationRecord)
+def uncount_record(sender, instance, **kwargs):
+    sync.record_deletion('records', instance, instance.user_id)
+    stats.record_deleted(instance)
+
+
+@receiver(post_delete, sender=InjectionSchedule)
+def record_schedule_deletion(sender, instance, **kwargs):
+    sync.record_deletion('schedules', instance)
+    rollups.schedule_deleted(instance.date)
+
+
+def bump_response_cache(sender, **kwargs):
+    response_cache.bump(sender)
+
+
+# Các danh mục có response được cache theo phiên bản model
+for cached_model in (Vaccine, VaccineType, InjectionSite, InjectionSchedule):
+    post_save.connect(bump_response_cache, sender=cached_model,
+                      dispatch_uid=f'response_cache_save_{cached_model.__name__}')
+    post_delete.connect(bump_response_cache, sender=cached_model,
+                        dispatch_uid=f'response_cache_delete_{cached_model.__name__}')
@@ -0,0 +1,290 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+class ScheduleFullError(ValueError):
+    def __init__(self, message="Lịch tiêm đã hết chỗ!"):
+        super().__init__(message)
+
+
+class ShardedSlotCounter:
+    """
+    Bộ đếm số chỗ còn lại của mỗi lịch tiêm, chia thành nhiều phân mảnh trong cache (Redis).
+    Khóa `base` lưu giá trị slot_count của DB tại lần đồng bộ gần nhất để reconciler
+    tính ra số chỗ đã dùng và ghi ngược lại vào InjectionSchedule.
+    """
+
+    def __init__(self, alias=None, shards=None):
+        self.cache = caches[alias or getattr(settings, 'SLOT_COUNTER_CACHE', 'default')]
+        self.shards = shards or getattr(settings, 'SLOT_COUNTER_SHARDS', 8)
+
+    def shard_key(self, schedule_id, shard):
+        return f"slots:{schedule_id}:{shard}"
+
+    def base_key(self, schedule_id):
+        return f"slots:{schedule_id}:base"
+
+    def shard_keys(self, schedule_id):
+        return [self.shard_key(schedule_id, i) for i in range(self.shards)]
+
+    def seed(self, schedule_id, slot_count=None):
+        """
+        Khởi tạo bộ đếm từ slot_count của DB nếu chưa có. Nếu khóa base còn nhưng một số phân mảnh bị mất
+        (Redis evict), tạo lại các phân mảnh đó với 0: số chỗ còn trong phân mảnh đã mất không biết được,
+        thà thiếu chỗ (reconcile tính là đã dùng, admin sửa slot_count) còn hơn bán quá số chỗ.
+        """
+        base_key = self.base_key(schedule_id)
+        keys = self.shard_keys(schedule_id)
+        if self.cache.get(base_key) is None:
+            if slot_count is None:
+                from .models import InjectionSchedule
+
+                slot_count = InjectionSchedule.objects.filter(pk=schedule_id) \
+                    .values_list('slot_count', flat=True).first()
+                if slot_count is None:
+                    raise KeyError(schedule_id)
+            # Tiến trình tạo được base là tiến trình ghi các phân mảnh
+            if self.cache.add(base_key, slot_count, timeout=None):
+                per_shard, remainder = divmod(slot_count, self.shards)
+                self.cache.set_many({key: per_shard + (1 if i < remainder else 0) for i, key in enumerate(keys)},
+                                    timeout=None)
+                return
+        for key in set(keys) - set(self.cache.get_many(keys)):
+            self.cache.add(key, 0, timeout=None)
+
+    def available(self, schedule_id):
+        values = self.cache.get_many(self.shard_keys(schedule_id))
+        if len(values) < self.shards:
+            self.seed(schedule_id)
+            values = self.cache.get_many(self.shard_keys(schedule_id))
+        return max(sum(values.values()), 0)
+
+    def reserve(self, schedule_id):
+        start = random.randrange(self.shards)
+        for i in range(self.shards):
+            key = self.shard_key(schedule_id, (start + i) % self.shards)
+            try:
+                remaining = self.cache.decr(key)
+            except ValueError:
+                self.seed(schedule_id)
+                remaining = self.cache.decr(key)
+            if remaining >= 0:
+                return
+            # Phân mảnh đã cạn: hoàn lại rồi thử phân mảnh tiếp theo
+            self.cache.incr(key)
+        raise ScheduleFullError()
+
+    def release(self, schedule_id):
+        key = self.shard_key(schedule_id, random.randrange(self.shards))
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.seed(schedule_id)
+            self.cache.incr(key)
+
+    def reconcile(self, schedule_id):
+        """
+        Ghi số chỗ đã dùng trong Redis vào slot_count và sửa lệch nếu DB bị chỉnh tay.
+        Trả về (số chỗ đã ghi, độ lệch đã sửa) hoặc None nếu lịch chưa có bộ đếm.
+        """
+        from .models import InjectionSchedule
+
+        base = self.cache.get(self.base_key(schedule_id))
+        if base is None:
+            return None
+        total = sum(self.cache.get_many(self.shard_keys(schedule_id)).values())
+        consumed = base - total
+
+        with transaction.atomic():
+            db_value = InjectionSchedule.objects.select_for_update() \
+                .filter(pk=schedule_id).values_list('slot_count', flat=True).first()
+            if db_value is None:
+                self.forget(schedule_id)
+                return None
+            drift = db_value - base
+            InjectionSchedule.objects.filter(pk=schedule_id).update(
+                slot_count=max(db_value - consumed, 0),
+                updated_date=timezone.now(),
+            )
+            schedules_changed()
+
+        if drift:
+            self.cache.incr(self.shard_key(schedule_id, 0), drift)
+        if drift - consumed:
+            self.cache.incr(self.base_key(schedule_id), drift - consumed)
+        return consumed, drift
+
+    def forget(self, schedule_id):
+        self.cache.delete_many(self.shard_keys(schedule_id) + [self.base_key(schedule_id)])
+
+
+_counter = None
+
+
+def schedules_changed():
+    # UPDATE bằng F() không gửi signal nên tự làm mất hiệu lực cache danh sách lịch tiêm
+    from . import response_cache
+
+    response_cache.bump('AppTiemChung.InjectionSchedule')
+
+
+def redis_mode():
+    return getattr(settings, 'SLOT_RESERVATION_MODE', 'db') == 'redis'
+
+
+_scopes = threading.local()
+
+
+@contextmanager
+def atomic():
+    """
+    transaction.atomic() có trả chỗ Redis: các chỗ giữ trong khối được trả lại ngay khi khối ném lỗi hoặc bị
+    đánh dấu rollback. Khối lồng trong khối khác chuyển các chỗ đã giữ lên khối ngoài khi thành công, để
+    rollback ở khối ngoài vẫn trả được. Code gói việc giữ chỗ trong transaction của mình phải dùng hàm này
+    thay cho transaction.atomic(), nếu không rollback của nó sẽ làm rò chỗ trong Redis.
+    """
+    stack = _scopes.__dict__.setdefault('stack', [])
+    held = []
+    stack.append(held)
+    try:
+        with transaction.atomic():
+            yield
+            rolled_back = transaction.get_rollback()
+    except BaseException:
+        stack.pop()
+        release_held(held)
+        raise
+    stack.pop()
+    if rolled_back:
+        release_held(held)
+    elif stack:
+        stack[-1].extend(held)
+
+
+def release_held(held):
+    for undo in reversed(held):
+        undo()
+
+
+def hold(undo):
+    """Ghi lại cách trả một chỗ Redis vừa giữ cho khối atomic() trong cùng; ngoài khối thì chỗ đã chốt."""
+    stack = getattr(_scopes, 'stack', None)
+    if stack:
+        stack[-1].append(undo)
+
+
+def get_counter():
+    global _counter
+    if _counter is None:
+        _counter = ShardedSlotCounter()
+    return _counter
+
+
+def reserve_slot(schedule):
+    if redis_mode():
+        # Redis không nằm trong transaction của DB: trả lại chỗ nếu lịch hẹn không được commit
+        counter, schedule_id = get_counter(), schedule.pk
+        counter.reserve(schedule_id)
+        hold(lambda: counter.release(schedule_id))
+    else:
+        # Trừ chỗ bằng một câu UPDATE có điều kiện, không đọc-sửa-ghi trong Python
+        from .models import InjectionSchedule
+
+        updated = InjectionSchedule.objects.filter(pk=schedule.pk, slot_count__gt=0).update(
+            slot_count=F('slot_count') - 1,
+            updated_date=timezone.now(),
+        )
+        if not updated:
+            raise ScheduleFullError()
+        schedules_changed()
+        # Giá trị trong bộ nhớ có thể đã cũ (request khác vừa giữ chỗ): đọc lại giá trị sau khi trừ
+        schedule.refresh_from_db(fields=['slot_count'])
+
+
+def release_slot(schedule):
+    if redis_mode():
+        # Chỉ trả chỗ khi việc hủy đã commit, nếu không chỗ vẫn bị giữ mà bộ đếm đã cộng lại
+        counter, schedule_id = get_counter(), schedule.pk
+        transaction.on_commit(lambda: counter.release(schedule_id))
+    else:
+        from .models import InjectionSchedule
+
+        InjectionSchedule.objects.filter(pk=schedule.pk).update(
+            slot_count=F('slot_count') + 1,
+            updated_date=timezone.now(),
+        )
+        schedules_changed()
+        schedule.refresh_from_db(fields=['slot_count'])
+
+
+def available_slots(schedule_id):
+    if redis_mode():
+        return get_counter().available(schedule_id)
+
+    from .models import InjectionSchedule
+
+    slot_count = InjectionSchedule.objects.filter(pk=schedule_id).values_list('slot_count', flat=True).first()
+    if slot_count is None:
+        raise KeyError(schedule_id)
+    return slot_count
+
+
+def reserve_slots(schedule_id, count):
+    """Giữ tối đa `count` chỗ của một lịch, trả về số chỗ thực sự giữ được."""
+    if count <= 0:
+        return 0
+    if redis_mode():
+        counter = get_counter()
+        granted = 0
+        while granted < count:
+            try:
+                counter.reserve(schedule_id)
+            except ScheduleFullError:
+                break
+            granted += 1
+        if granted:
+            hold(lambda: release_counter(counter, schedule_id, granted))
+        return granted
+
+    from .models import InjectionSchedule
+
+    with transaction.atomic():
+        slot_count = InjectionSchedule.objects.select_for_update() \
+            .filter(pk=schedule_id).values_list('slot_count', flat=True).first()
+        granted = min(count, slot_count or 0)
+        if granted:
+            InjectionSchedule.objects.filter(pk=schedule_id).update(
+                slot_count=F('slot_count') - granted,
+                updated_date=timezone.now(),
+            )
+            schedules_changed()
+    return granted
+
+
+def release_counter(counter, schedule_id, count):
+    for _ in range(count):
+        counter.release(schedule_id)
+
+
+def release_slots(schedule_id, count):
+    if count <= 0:
+        return
+    if redis_mode():
+        counter = get_counter()
+        transaction.on_commit(lambda: release_counter(counter, schedule_id, count))
+        return
+
+    from .models import InjectionSchedule
+
+    InjectionSchedule.objects.filter(pk=schedule_id).update(
+        slot_count=F('slot_count') + count,
+        updated_date=timezone.now(),
+    )
+    schedules_changed()
@@ -0,0 +1,173 @@
+import threading
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef
+from django.db.models.functions import Greatest
+
+VACCINATED = 'total_vaccinated'
+APPOINTMENTS = 'total_appointments'
+COMPLETED = 'completed_appointments'
+COUNTERS = (VACCINATED, APPOINTMENTS, COMPLETED)
+
+# Thời gian cache giá trị thống kê tính đếm khi bộ đếm chưa được khởi tạo
+FALLBACK_TIMEOUT = 300
+
+_pending = threading.local()
+
+
+def bump(name, delta=1):
+    """
+    Cộng dồn bộ đếm sau khi transaction hiện tại commit, để dòng đếm (điểm nóng)
+    không bị khóa suốt transaction của lịch hẹn. Bộ đếm chưa khởi tạo thì bỏ qua:
+    lệnh recompute_stats sẽ tính lại toàn bộ.
+    """
+    from .models import StatCounter
+
+    if delta:
+        transaction.on_commit(lambda: StatCounter.objects.filter(name=name).update(value=F('value') + delta))
+
+
+def bump_vaccines(deltas):
+    from .models import VaccineTally
+
+    deltas = {vaccine_id: delta for vaccine_id, delta in deltas.items() if vaccine_id and delta}
+    if not deltas:
+        return
+
+    def apply():
+        for vaccine_id, delta in sorted(deltas.items()):
+            # Bảng tổng có thể lệch (dữ liệu cũ, recompute chạy xen giữa) nên không để số đếm xuống dưới 0
+            count = Greatest(F('count') + delta, 0)
+            if not VaccineTally.objects.filter(vaccine_id=vaccine_id).update(count=count):
+                VaccineTally.objects.get_or_create(vaccine_id=vaccine_id)
+                VaccineTally.objects.filter(vaccine_id=vaccine_id).update(count=count)
+
+    transaction.on_commit(apply)
+
+
+def records_created(records):
+    """Cập nhật thống kê cho các hồ sơ tiêm mới (với bulk_create có thể gọi trước khi ghi)."""
+    records = list(records)
+    if not records:
+        return
+    bump_vaccines(Counter(record.vaccine_id for record in records))
+
+    user_ids = {record.user_id for record in records}
+    transaction.on_commit(lambda: _mark_vaccinated(user_ids))
+
+
+def _mark_vaccinated(user_ids):
+    """
+    Người dùng được tính là đã tiêm khi cờ User.vaccinated được lật từ False sang True. Việc lật nằm trong
+    một câu UPDATE có điều kiện (khóa dòng), nên hai transaction cùng ghi mũi đầu cho một người
+    chỉ có một bên lật được cờ và người đó chỉ được cộng một lần.
+    """
+    from .models import StatCounter, User
+
+    with transaction.atomic():
+        added = User.objects.filter(pk__in=user_ids, vaccinated=False).update(vaccinated=True)
+        if added:
+            StatCounter.objects.filter(name=VACCINATED).update(value=F('value') + added)
+
+
+def record_deleted(record):
+    bump_vaccines({record.vaccine_id: -1})
+
+    # Xóa theo cascade gọi post_delete cho từng hồ sơ sau khi đã xóa hết, nên gom người dùng vào một tập
+    # của thread; lần flush đầu tiên lúc commit xử lý cả tập, các lần sau thấy tập rỗng. Người dùng còn sót
+    # lại từ transaction bị rollback được kiểm tra lại với DB ở lần flush sau nên không trừ nhầm.
+    users = _pending.__dict__.setdefault('users', set())
+    users.add(record.user_id)
+    transaction.on_commit(lambda: _flush_deleted_users(users))
+
+
+def _flush_deleted_users(pending):
+    from .models import StatCounter, User, VaccinationRecord
+
+    if not pending:
+        return
+    users = set(pending)
+    pending.clear()
+    still_vaccinated = set(VaccinationRecord.objects.filter(user_id__in=users)
+                           .values_list('user_id', flat=True).distinct())
+    gone = users - still_vaccinated
+    if not gone:
+        return
+    with transaction.atomic():
+        # Người dùng bị xóa (hồ sơ bị xóa theo cascade) không còn cờ để lật nhưng vẫn phải trừ
+        existing = set(User.objects.filter(pk__in=gone).values_list('pk', flat=True))
+        removed = User.objects.filter(pk__in=gone, vaccinated=True).update(vaccinated=False) + len(gone - existing)
+        if removed:
+            StatCounter.objects.filter(name=VACCINATED).update(value=F('value') - removed)
+
+
+def recompute():
+    """
+    Tính lại toàn bộ bộ đếm và bảng tổng theo vaccine từ dữ liệu gốc.
+    Trả về {tên bộ đếm: (giá trị cũ, giá trị mới)} để báo độ lệch.
+    """
+    from .models import Appointment, StatCounter, User, VaccinationRecord, VaccineTally
+
+    with transaction.atomic():
+        values = {
+            VACCINATED: VaccinationRecord.objects.values('user').distinct().count(),
+            APPOINTMENTS: Appointment.objects.count(),
+            COMPLETED: Appointment.objects.filter(is_inoculated=True).count(),
+        }
+        old = dict(StatCounter.objects.values_list('name', 'value'))
+        User.objects.update(vaccinated=Exists(VaccinationRecord.objects.filter(user=OuterRef('pk'))))
+        for name, value in values.items():
+            StatCounter.objects.update_or_create(name=name, defaults={'value': value})
+
+        tallies = VaccinationRecord.objects.filter(vaccine__isnull=False) \
+            .values('vaccine').annotate(count=Count('id')).order_by()
+        VaccineTally.objects.all().delete()
+        VaccineTally.objects.bulk_create([VaccineTally(vaccine_id=t['vaccine'], count=t['count']) for t in tallies],
+                                         batch_size=500)
+
+    return {name: (old.get(name), value) for name, value in values.items()}
+
+
+def snapshot(top=3):
+    """
+    Đọc bộ đếm đã cộng dồn. Khi bộ đếm chưa được khởi tạo (chưa chạy recompute_stats) thì trả về giá trị
+    tính đếm chỉ-đọc, cache FALLBACK_TIMEOUT giây; request không bao giờ ghi hay gọi recompute().
+    """
+    from .models import StatCounter, VaccineTally
+
+    counters = dict(StatCounter.objects.filter(name__in=COUNTERS).values_list('name', 'value'))
+    if len(counters) < len(COUNTERS):
+        return _fallback_snapshot(top)
+
+    popular = VaccineTally.objects.select_related('vaccine').filter(count__gt=0).order_by('-count')[:top]
+    return _snapshot(counters, [(tally.vaccine.name, tally.count) for tally in popular])
+
+
+def _snapshot(counters, popular):
+    total_appointments = counters[APPOINTMENTS]
+    completion_rate = (counters[COMPLETED] / total_appointments) if total_appointments > 0 else 0
+    return {
+        "total_vaccinated": counters[VACCINATED],
+        "completion_rate": round(completion_rate * 100, 2),
+        "popular_vaccines": [{"name": name, "count": count} for name, count in popular],
+    }
+
+
+def _fallback_snapshot(top):
+    from .models import Appointment, VaccinationRecord
+
+    key = f'stats:fallback:{top}'
+    data = cache.get(key)
+    if data is None:
+        counters = {
+            VACCINATED: VaccinationRecord.objects.values('user').distinct().count(),
+            APPOINTMENTS: Appointment.objects.count(),
+            COMPLETED: Appointment.objects.filter(is_inoculated=True).count(),
+        }
+        popular = VaccinationRecord.objects.filter(vaccine__isnull=False).values('vaccine__name') \
+            .annotate(count=Count('id')).order_by('-count')[:top]
+        data = _snapshot(counters, [(row['vaccine__name'], row['count']) for row in popular])
+        cache.set(key, data, timeout=FALLBACK_TIMEOUT)
+    return data
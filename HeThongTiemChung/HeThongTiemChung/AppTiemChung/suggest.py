@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+from .search import fold
+
+
+def ngrams(text, n=3):
+    # N-gram của cả chữ gốc và chữ đã bỏ dấu: gõ thiếu / sai dấu ("sôt", "tiem") vẫn chung n-gram
+    # với từ đúng, còn từ khớp cả dấu thì chung nhiều n-gram hơn nên đứng trước khi lọc sơ bộ
+    grams = set()
+    for variant in {text, fold(text)}:
+        padded = f" {variant} "
+        if len(padded) <= n:
+            grams.add(padded)
+        else:
+            grams.update(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+
+class NgramSuggester:
+    """
+    Gợi ý gần đúng thay cho difflib.get_close_matches trên toàn bộ từ vựng.
+    Chỉ những từ có chung n-gram ký tự (đã bỏ dấu) với truy vấn mới được xét, sau đó xếp hạng lại
+    bằng SequenceMatcher.ratio() trên chữ gốc nên kết quả giữ cùng thang điểm với difflib.
+    """
+
+    def __init__(self, words, n=3, shortlist=30):
+        self.n = n
+        self.shortlist = shortlist
+        self.words = list(dict.fromkeys(words))
+        self.gram_counts = []
+        self.postings = defaultdict(list)
+        for word_id, word in enumerate(self.words):
+            grams = ngrams(word, n)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(word_id)
+
+    def __len__(self):
+        return len(self.words)
+
+    def lookup(self, query, limit=3, cutoff=0.5):
+        query_grams = ngrams(query, self.n)
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for word_id in self.postings.get(gram, ()):
+                shared[word_id] += 1
+        if not shared:
+            return []
+
+        # Lọc sơ bộ bằng hệ số Dice trên n-gram rồi mới tính ratio() cho nhóm nhỏ
+        query_size = len(query_grams)
+        candidates = sorted(
+            shared,
+            key=lambda word_id: 2 * shared[word_id] / (query_size + self.gram_counts[word_id]),
+            reverse=True,
+        )[:self.shortlist]
+
+        from difflib import SequenceMatcher
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(query)
+        scored = []
+        for word_id in candidates:
+            word = self.words[word_id]
+            matcher.set_seq1(word)
+            if matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+                score = matcher.ratio()
+                if score >= cutoff:
+                    scored.append((score, word))
+        scored.sort(reverse=True)
+        return [word for _, word in scored[:limit]]
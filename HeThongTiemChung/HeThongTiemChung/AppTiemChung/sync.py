@@ -0,0 +1,145 @@
+import base64
+import json
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import dao, serializers
+from .models import InjectionSchedule, SyncTombstone
+
+KINDS = ('appointments', 'records', 'schedules')
+CURSOR_KEYS = KINDS + ('day', 'deleted')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def sources(user):
+    return {
+        'appointments': (dao.load_appointments().filter(user=user), serializers.AppointmentSerializer),
+        'records': (dao.load_vaccination_records().filter(user=user), serializers.VaccinationRecordSerializer),
+        # Lịch tiêm là dữ liệu chung, app chỉ giữ các lịch từ hôm nay trở đi
+        'schedules': (dao.load_schedules().filter(date__gte=date.today()), serializers.InjectionScheduleSerializer),
+    }
+
+
+def encode_cursor(positions):
+    raw = json.dumps({kind: [stamp.isoformat(), pk] for kind, (stamp, pk) in positions.items()})
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor("Cursor không hợp lệ.")
+    # Chuỗi hợp lệ vẫn có thể sai cấu trúc: chỉ nhận {kind: [thời điểm có múi giờ, pk]}
+    if not isinstance(raw, dict):
+        raise InvalidCursor("Cursor không hợp lệ.")
+    positions = {}
+    for kind, value in raw.items():
+        if kind not in CURSOR_KEYS or not isinstance(value, list) or len(value) != 2:
+            raise InvalidCursor("Cursor không hợp lệ.")
+        stamp, pk = value
+        if not isinstance(stamp, str) or not isinstance(pk, int) or isinstance(pk, bool):
+            raise InvalidCursor("Cursor không hợp lệ.")
+        try:
+            stamp = datetime.fromisoformat(stamp)
+        except ValueError:
+            raise InvalidCursor("Cursor không hợp lệ.")
+        if not timezone.is_aware(stamp):
+            raise InvalidCursor("Cursor không hợp lệ.")
+        positions[kind] = (stamp, pk)
+    return positions
+
+
+def after(queryset, field, position):
+    if position is None:
+        return queryset
+    stamp, pk = position
+    return queryset.filter(Q(**{f'{field}__gt': stamp}) | Q(**{field: stamp, 'pk__gt': pk}))
+
+
+def advance(rows, field, has_more, ceiling):
+    """
+    Vị trí cursor mới sau một trang. Còn trang sau thì dừng ở dòng cuối; đã đọc hết thì đặt ở `ceiling`
+    (now - skew): cursor luôn tiến theo thời gian kể cả khi không có thay đổi, và các transaction dài
+    commit muộn với updated_date trước `ceiling` vẫn được trả về ở lần sau.
+    """
+    if has_more:
+        last = rows[-1]
+        return getattr(last, field), last.pk
+    return ceiling, 0
+
+
+def page(queryset, field, position, limit):
+    rows = list(after(queryset, field, position).order_by(field, 'pk')[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def changes(user, cursor=None, context=None):
+    now = timezone.now()
+    limit = getattr(settings, 'SYNC_PAGE_SIZE', 500)
+    ceiling = now - timedelta(seconds=getattr(settings, 'SYNC_CURSOR_SKEW', 5))
+    positions = decode_cursor(cursor) if cursor else {}
+
+    # Cursor cũ hơn thời gian giữ dấu vết xóa thì không đảm bảo đủ thay đổi: app phải tải lại toàn bộ
+    retention = now - timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 30))
+    stamps = [stamp for kind, (stamp, _) in positions.items() if kind != 'day']
+    if stamps and min(stamps) < retention:
+        positions = {}
+        reset = True
+    else:
+        reset = not positions
+
+    result = {'deleted': {kind: [] for kind in KINDS}}
+    has_more = False
+    for kind, (queryset, serializer_class) in sources(user).items():
+        if kind not in positions:
+            # Lần đồng bộ đầu: chỉ cần bản ghi đang hoạt động
+            queryset = queryset.filter(active=True)
+        rows, more = page(queryset, 'updated_date', positions.get(kind), limit)
+        has_more |= more
+        result[kind] = serializer_class([row for row in rows if row.active], many=True, context=context).data
+        result['deleted'][kind].extend(row.pk for row in rows if not row.active)
+        positions[kind] = advance(rows, 'updated_date', more, ceiling)
+
+    # Lịch tiêm đã qua ngày không còn trong phạm vi đồng bộ: báo app xóa các lịch của những ngày đã qua
+    # kể từ lần đồng bộ trước
+    today = date.today()
+    if 'day' in positions and 'schedules' in positions:
+        last_day = timezone.localdate(positions['day'][0])
+        if last_day < today:
+            result['deleted']['schedules'].extend(
+                InjectionSchedule.objects.filter(date__gte=last_day, date__lt=today).values_list('pk', flat=True))
+    positions['day'] = (timezone.make_aware(datetime.combine(today, time.min)), 0)
+
+    if 'deleted' not in positions:
+        # Lần đầu không cần dấu vết xóa cũ, bắt đầu từ thời điểm hiện tại
+        positions['deleted'] = (ceiling, 0)
+    else:
+        tombstones = SyncTombstone.objects.filter(Q(user_id=user.pk) | Q(user_id__isnull=True), kind__in=KINDS)
+        rows, more = page(tombstones, 'deleted_at', positions['deleted'], limit)
+        has_more |= more
+        for tombstone in rows:
+            result['deleted'][tombstone.kind].append(tombstone.object_id)
+        positions['deleted'] = advance(rows, 'deleted_at', more, ceiling)
+
+    result.update({
+        'cursor': encode_cursor(positions),
+        'has_more': has_more,
+        'reset': reset,
+    })
+    return result
+
+
+def record_deletion(kind, instance, user_id=None):
+    SyncTombstone.objects.create(kind=kind, object_id=instance.pk, user_id=user_id)
+
+
+def prune(days=None):
+    days = days if days is not None else getattr(settings, 'SYNC_TOMBSTONE_DAYS', 30)
+    return SyncTombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days)).delete()[0]
@@ -1 +1,1130 @@
-# Create your tests here.
+import base64
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from difflib import get_close_matches
+from unittest import mock
+
+import fakeredis
+import numpy as np
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from . import (bulk, certificates, chat_backends, chat_cache, chat_log, dao, doses, faq_index, faq_mining, geo,
+               notifications, response_cache, rollups, search, slots, stats, suggest, sync, tokenizer, views)
+from .models import (Appointment, ChatConversation, DailyRollup, Faq, FaqCandidate, InjectionSchedule, InjectionSite, Notification, QueryLog, StatCounter, User,
+                     VaccinationRecord, Vaccine, VaccineTally, VaccineType)
+
+
+def make_schedule(days=1, slot_count=5, name='S'):
+    vaccine_type, _ = VaccineType.objects.get_or_create(name='T')
+    vaccine, _ = Vaccine.objects.get_or_create(name='V', defaults={'vaccine_type': vaccine_type})
+    site, _ = InjectionSite.objects.get_or_create(name=name, defaults={'address': 'addr'})
+    return InjectionSchedule.objects.create(vaccine=vaccine, site=site, date=date.today() + timedelta(days=days),
+                                            slot_count=slot_count)
+
+
+def make_user(username='u'):
+    return User.objects.create(username=username, email=f'{username}@x.com')
+
+
+FAKE_REDIS = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'slots': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://fakeredis:6379/0',
+        'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+    },
+}
+
+
+@override_settings(CACHES=FAKE_REDIS, SLOT_RESERVATION_MODE='redis', SLOT_COUNTER_CACHE='slots', SLOT_COUNTER_SHARDS=4,
+                   NOTIFICATION_LOCAL_WORKER=False)
+class RedisSlotTestCase(TransactionTestCase):
+    def setUp(self):
+        caches['slots'].clear()
+        slots._counter = None
+        self.addCleanup(setattr, slots, '_counter', None)
+
+
+@override_settings(SYNC_CURSOR_SKEW=0, SYNC_TOMBSTONE_DAYS=30)
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.schedule = make_schedule()
+        self.appointment = Appointment.objects.create(user=self.user, schedule=self.schedule)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, cursor=None):
+        response = self.client.get('/sync/', {'since': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_unchanged_rows_do_not_force_reset(self):
+        # Dữ liệu không đổi lâu hơn thời gian giữ dấu vết xóa vẫn phải đồng bộ gia tăng
+        old = timezone.now() - timedelta(days=60)
+        Appointment.objects.filter(pk=self.appointment.pk).update(updated_date=old)
+        InjectionSchedule.objects.filter(pk=self.schedule.pk).update(updated_date=old)
+        first = self.sync()
+        self.assertTrue(first['reset'])
+        self.assertEqual(len(first['appointments']), 1)
+
+        second = self.sync(first['cursor'])
+        self.assertFalse(second['reset'])
+        self.assertEqual(second['appointments'], [])
+
+    def test_changes_and_deletes_since_cursor(self):
+        cursor = self.sync()['cursor']
+        self.appointment.reminder_enabled = True
+        self.appointment.save()
+        other = Appointment.objects.create(user=self.user, schedule=make_schedule(days=2, name='S2'))
+        other_id = other.pk
+        other.delete()
+
+        data = self.sync(cursor)
+        self.assertEqual([row['id'] for row in data['appointments']], [self.appointment.pk])
+        self.assertEqual(data['deleted']['appointments'], [other_id])
+
+    @override_settings(SYNC_PAGE_SIZE=1)
+    def test_paging(self):
+        Appointment.objects.create(user=self.user, schedule=make_schedule(days=2, name='S2'))
+        data = self.sync()
+        seen = [row['id'] for row in data['appointments']]
+        while data['has_more']:
+            data = self.sync(data['cursor'])
+            seen += [row['id'] for row in data['appointments']]
+        self.assertEqual(sorted(seen), sorted(Appointment.objects.values_list('pk', flat=True)))
+
+    def test_past_schedules_reported_deleted(self):
+        cursor = self.sync()['cursor']
+        positions = json.loads(base64.urlsafe_b64decode(cursor))
+        positions['day'] = [timezone.make_aware(datetime.combine(date.today() - timedelta(days=2), datetime.min.time()))
+                            .isoformat(), 0]
+        past = make_schedule(days=-1, name='S3')
+        data = self.sync(base64.urlsafe_b64encode(json.dumps(positions).encode()).decode())
+        self.assertIn(past.pk, data['deleted']['schedules'])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/sync/', {'since': 'garbage'}).status_code, 400)
+        self.assertRaises(sync.InvalidCursor, sync.decode_cursor, 'e30')
+
+        def encode(raw):
+            return base64.urlsafe_b64encode(json.dumps(raw).encode('utf-8')).decode('ascii')
+
+        stamp = timezone.now().isoformat()
+        for raw in ([1, 2], 'x', None, {'records': stamp}, {'records': [stamp]}, {'records': [stamp, 1, 2]},
+                    {'records': [1, 1]}, {'records': [stamp, '1']}, {'records': [stamp, True]},
+                    {'records': ['not a date', 1]}, {'other': [stamp, 1]},
+                    {'records': [datetime(2026, 1, 1).isoformat(), 1]}):
+            self.assertRaises(sync.InvalidCursor, sync.decode_cursor, encode(raw))
+            self.assertEqual(self.client.get('/sync/', {'since': encode(raw)}).status_code, 400, raw)
+
+
+class TokenizerTests(TestCase):
+    TEXTS = ['', '   ', '?!...', 'Tiêm vắc xin ở đâu?', 'Lịch tiêm  phòng  COVID-19 cho trẻ 6 tháng tuổi',
+             'Hà Nội có bao nhiêu điểm tiêm, giá 1.500.000 đồng?', 'email test@x.com ==> xem https://a.vn']
+
+    def setUp(self):
+        tokenizer.get_cache().clear()
+
+    def test_batch_path_matches_pyvi(self):
+        vi_tokenizer = tokenizer.get_tokenizer()
+        self.assertTrue(hasattr(vi_tokenizer, 'model'))
+        expected = [vi_tokenizer.tokenize(tokenizer.normalize(text)).split() for text in self.TEXTS]
+        self.assertEqual(tokenizer.tokenize_many(self.TEXTS), expected)
+        # Lần hai lấy từ cache
+        self.assertEqual(tokenizer.tokenize_many(self.TEXTS), expected)
+        self.assertEqual(tokenizer.tokenize('Tiêm vắc xin ở đâu?'), expected[3])
+
+
+class ImportTimeTests(SimpleTestCase):
+    HEAVY_MODULES = ('pyvi', 'reportlab', 'firebase_admin')
+
+    def test_urlconf_does_not_import_heavy_modules(self):
+        # Tiến trình mới: trong tiến trình test các module này có thể đã được test khác import
+        code = (
+            'import importlib, json, sys\n'
+            'import django\n'
+            'django.setup()\n'
+            'from django.conf import settings\n'
+            'importlib.import_module(settings.ROOT_URLCONF)\n'
+            f'print(json.dumps([name for name in {self.HEAVY_MODULES!r} if name in sys.modules]))\n'
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout.splitlines()[-1]), [])
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        search._backend = None
+        self.vaccine_type = VaccineType.objects.create(name='Viêm gan')
+        self.hepatitis = self.vaccine(name='Vắc xin Viêm gan B', manufacturer='Đức Minh')
+        self.flu = self.vaccine(name='Vaxigrip cúm mùa', manufacturer='Sanofi')
+
+    def vaccine(self, **kwargs):
+        return Vaccine.objects.create(vaccine_type=self.vaccine_type, **kwargs)
+
+    def found(self, kw, **param):
+        return list(dao.load_vaccine({'kw': kw, **param}).values_list('pk', flat=True))
+
+    def test_fold(self):
+        self.assertEqual(search.fold('Vắc xin Viêm gan Đ'), 'vac xin viem gan d')
+        self.assertEqual(search.tokenize('Cúm-mùa, 2024!'), ['cum', 'mua', '2024'])
+        self.assertEqual(self.hepatitis.search_text, 'vac xin viem gan b duc minh')
+
+    def test_inverted_index(self):
+        index = search.InvertedIndex([(1, 'vac xin viem gan b'), (2, 'viem nao nhat ban'), (3, 'viem viem gan')])
+        self.assertEqual(index.expand('vi'), ['viem'])
+        # Tiền tố, mọi token phải khớp, tf-idf cao hơn xếp trước
+        self.assertEqual([pk for pk, _ in index.search('viem ga', 10)], [3, 1])
+        self.assertEqual([pk for pk, _ in index.search('viem', 10)], [3, 1, 2])
+        self.assertEqual(index.search('viem tay', 10), [])
+        self.assertEqual(index.search('!!', 10), [])
+        self.assertEqual(len(index.search('viem', 2)), 2)
+
+    def test_diacritics_and_prefixes_match(self):
+        for kw in ('vac xin', 'vắc', 'VẮC XIN viêm', 'viem ga', 'duc'):
+            with self.subTest(kw=kw):
+                self.assertEqual(self.found(kw), [self.hepatitis.pk])
+        self.assertEqual(self.found('cum'), [self.flu.pk])
+        self.assertEqual(self.found('xin cum'), [])
+
+    def test_load_vaccine_filters(self):
+        other_type = VaccineType.objects.create(name='Cúm')
+        Vaccine.objects.create(name='Vắc xin cúm', vaccine_type=other_type, status=Vaccine.Status.EXPIRED)
+        self.assertEqual(self.found('vac xin'), [self.hepatitis.pk])
+        self.assertEqual(self.found('vac', vaccine_type=other_type.pk), [])
+        self.assertEqual(list(dao.load_vaccine({}).order_by('pk').values_list('pk', flat=True)),
+                         [self.hepatitis.pk, self.flu.pk])
+
+    def test_results_follow_edits(self):
+        self.assertEqual(self.found('cum'), [self.flu.pk])
+        self.flu.name = 'Influvac Tetra'
+        self.flu.save()
+        self.assertEqual(self.found('cum'), [])
+        self.assertEqual(self.found('influ'), [self.flu.pk])
+        self.hepatitis.delete()
+        self.assertEqual(self.found('vac'), [])
+
+
+class SlotCounterTests(RedisSlotTestCase):
+    def test_rollback_returns_reserved_slot(self):
+        schedule = make_schedule(slot_count=2)
+        appointment = Appointment.objects.create(user=make_user(), schedule=schedule)
+        with self.assertRaises(RuntimeError):
+            with slots.atomic():
+                appointment.is_confirmed = True
+                appointment.save()
+                self.assertEqual(slots.available_slots(schedule.pk), 1)
+                raise RuntimeError
+        self.assertEqual(slots.available_slots(schedule.pk), 2)
+
+        appointment.refresh_from_db()
+        appointment.is_confirmed = True
+        appointment.save()
+        self.assertEqual(slots.available_slots(schedule.pk), 1)
+
+    def test_failed_save_returns_slot(self):
+        schedule = make_schedule(slot_count=2)
+        appointment = Appointment(user=make_user(), schedule=schedule, is_confirmed=True, is_inoculated=True)
+        with mock.patch.object(Appointment, 'create_vaccination_record', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                appointment.save()
+        self.assertEqual(slots.available_slots(schedule.pk), 2)
+        self.assertFalse(Appointment.objects.exists())
+
+    def test_marked_rollback_returns_slot(self):
+        schedule = make_schedule(slot_count=2)
+        with slots.atomic():
+            Appointment.objects.create(user=make_user(), schedule=schedule, is_confirmed=True)
+            transaction.set_rollback(True)
+        self.assertEqual(slots.available_slots(schedule.pk), 2)
+
+    def test_release_waits_for_commit(self):
+        schedule = make_schedule(slot_count=2)
+        appointment = Appointment.objects.create(user=make_user(), schedule=schedule, is_confirmed=True)
+        self.assertEqual(slots.available_slots(schedule.pk), 1)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                appointment.is_confirmed = False
+                appointment.save()
+                raise RuntimeError
+        self.assertEqual(slots.available_slots(schedule.pk), 1)
+
+        appointment.refresh_from_db()
+        appointment.is_confirmed = False
+        appointment.save()
+        self.assertEqual(slots.available_slots(schedule.pk), 2)
+
+    def test_sold_out(self):
+        schedule = make_schedule(slot_count=1)
+        Appointment.objects.create(user=make_user('a'), schedule=schedule, is_confirmed=True)
+        with self.assertRaises(slots.ScheduleFullError):
+            Appointment.objects.create(user=make_user('b'), schedule=schedule, is_confirmed=True)
+        self.assertEqual(slots.available_slots(schedule.pk), 0)
+        self.assertEqual(Appointment.objects.filter(is_confirmed=True).count(), 1)
+
+    def test_bulk_confirm_rollback_returns_slots(self):
+        schedule = make_schedule(slot_count=3)
+        ids = [Appointment.objects.create(user=make_user(f'u{i}'), schedule=schedule).pk for i in range(2)]
+        with self.assertRaises(RuntimeError):
+            with slots.atomic():
+                bulk.bulk_confirm(ids)
+                self.assertEqual(slots.available_slots(schedule.pk), 1)
+                raise RuntimeError
+        self.assertEqual(slots.available_slots(schedule.pk), 3)
+
+        bulk.bulk_confirm(ids)
+        self.assertEqual(slots.available_slots(schedule.pk), 1)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                bulk.bulk_confirm(ids, confirm=False)
+                raise RuntimeError
+        self.assertEqual(slots.available_slots(schedule.pk), 1)
+        bulk.bulk_confirm(ids, confirm=False)
+        self.assertEqual(slots.available_slots(schedule.pk), 3)
+
+    def test_missing_shards_are_recreated(self):
+        schedule = make_schedule(slot_count=8)
+        counter = slots.get_counter()
+        self.assertEqual(counter.available(schedule.pk), 8)
+        counter.reserve(schedule.pk)
+        caches['slots'].delete(counter.shard_key(schedule.pk, 0))
+
+        remaining = counter.available(schedule.pk)
+        self.assertLessEqual(remaining, 7)
+        self.assertEqual(len(caches['slots'].get_many(counter.shard_keys(schedule.pk))), 4)
+        # Số chỗ của phân mảnh bị mất được reconcile tính là đã dùng
+        counter.reconcile(schedule.pk)
+        schedule.refresh_from_db()
+        self.assertEqual(schedule.slot_count, remaining)
+
+
+class ListQueryCountTests(TestCase):
+    """Mỗi trang danh sách tốn số câu truy vấn cố định, không tăng theo số dòng (không N+1)."""
+    # Các danh sách danh mục có thêm truy vấn MAX(updated_date) của ConditionalGetMixin
+    ENDPOINTS = {
+        '/users/': 1,
+        '/users/current-user/history/': 1,
+        '/vaccines/': 3,
+        '/vaccine-types/': 2,
+        '/sites/': 2,
+        '/schedules/': 5,
+        '/schedules/upcoming_schedules/': 1,
+        '/appointment/': 1,
+        '/appointments/all/': 1,
+        '/appointments/history/': 1,
+        '/records/history/': 1,
+    }
+
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', email='admin@x.com', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def populate(self, count):
+        start = User.objects.count()
+        for i in range(start, start + count):
+            vaccine_type = VaccineType.objects.create(name=f'T{i}')
+            vaccine = Vaccine.objects.create(name=f'V{i}', vaccine_type=vaccine_type)
+            site = InjectionSite.objects.create(name=f'S{i}', address='addr')
+            user = make_user(f'u{i}')
+            for days in (-3 - i, 3 + i):
+                schedule = InjectionSchedule.objects.create(vaccine=vaccine, site=site,
+                                                            date=date.today() + timedelta(days=days))
+                Appointment.objects.create(user=user, schedule=schedule)
+                Appointment.objects.create(user=self.admin, schedule=schedule)
+            VaccinationRecord.objects.create(user=user, vaccine=vaccine, site=site, dose_number=1,
+                                             injection_date=date.today())
+
+    def test_list_query_counts(self):
+        # Cùng số truy vấn với 2 và 6 người dùng (mỗi người 2 lịch hẹn, 1 hồ sơ tiêm)
+        for added in (2, 4):
+            self.populate(added)
+            for url, expected in self.ENDPOINTS.items():
+                with self.subTest(url=url, users=User.objects.count()):
+                    cache.clear()
+                    with self.assertNumQueries(expected):
+                        response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertIn('results', response.json())
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(make_user())
+        self.vaccine_type = VaccineType.objects.create(name='T')
+        self.vaccines = [Vaccine.objects.create(name=f'V{i}', vaccine_type=self.vaccine_type) for i in range(2)]
+
+    def etag(self):
+        response = self.client.get('/vaccines/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        return response['ETag']
+
+    def test_if_none_match(self):
+        etag = self.etag()
+        response = self.client.get('/vaccines/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+        self.assertEqual(self.client.get('/vaccines/', HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+        # ETag gắn với cả query string
+        self.assertEqual(self.client.get('/vaccines/?page_size=1', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get('/vaccines/')['Last-Modified']
+        self.assertEqual(self.client.get('/vaccines/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_etag_changes(self):
+        def edit_vaccine():
+            self.vaccines[0].name = 'V0 mới'
+            self.vaccines[0].save()
+
+        def edit_type():
+            self.vaccine_type.name = 'T mới'
+            self.vaccine_type.save()
+
+        for change in (edit_vaccine, self.vaccines[1].delete, edit_type):
+            with self.subTest(change=change.__name__):
+                etag = self.etag()
+                change()
+                self.assertEqual(self.client.get('/vaccines/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+                self.assertNotEqual(self.etag(), etag)
+
+
+class ResponseCacheTests(TestCase):
+    MODELS = ['AppTiemChung.Vaccine']
+
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+
+    def build(self, delay=0):
+        self.builds += 1
+        time.sleep(delay)
+        return Response({'build': self.builds})
+
+    def cached(self, **kwargs):
+        return response_cache.cached('test', self.MODELS, lambda: self.build(**kwargs)).data
+
+    def test_version_bumped_on_commit(self):
+        before = response_cache.versions(self.MODELS)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response_cache.bump('AppTiemChung.Vaccine')
+            self.assertEqual(response_cache.versions(self.MODELS), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(response_cache.versions(self.MODELS), before)
+
+    def test_hit_until_write(self):
+        self.assertEqual(self.cached(), {'build': 1})
+        self.assertEqual(self.cached(), {'build': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            Vaccine.objects.create(name='V')
+        self.assertEqual(self.cached(), {'build': 2})
+        self.assertEqual(response_cache.stats()['test'], {'hits': 1, 'misses': 2, 'waits': 0, 'hit_ratio': 0.3333})
+
+    def test_list_not_stale_after_write(self):
+        client = APIClient()
+        client.force_authenticate(make_user())
+        vaccine = Vaccine.objects.create(name='Cũ')
+        self.assertEqual(client.get('/vaccines/').json()['results'][0]['name'], 'Cũ')
+        with self.captureOnCommitCallbacks(execute=True):
+            vaccine.name = 'Mới'
+            vaccine.save()
+        self.assertEqual(client.get('/vaccines/').json()['results'][0]['name'], 'Mới')
+
+    def test_single_flight(self):
+        results = []
+
+        def request():
+            results.append(self.cached(delay=0.3))
+
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(results, [{'build': 1}] * 4)
+        self.assertEqual(response_cache.stats()['test']['waits'], 3)
+
+    @override_settings(RESPONSE_CACHE_WAIT=0.1)
+    def test_waiter_builds_without_writing_when_lock_is_stuck(self):
+        key = response_cache._entry_key('test', self.MODELS, ())
+        response_cache.get_cache().add(f'{key}:lock', 1)
+        self.assertEqual(self.cached(), {'build': 1})
+        self.assertIsNone(response_cache.get_cache().get(key))
+
+
+class ListFilterTests(TestCase):
+    """Màn hình quản lý tìm và lọc phía server thay vì tải cả bảng về máy."""
+
+    def setUp(self):
+        self.staff = User.objects.create(username='staff', email='staff@x.com', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+        site = InjectionSite.objects.create(name='S', address='addr')
+        self.users = [make_user(name) for name in ('an', 'binh')]
+        vaccines = [Vaccine.objects.create(name=name, vaccine_type=VaccineType.objects.create(name=f'T{name}'))
+                    for name in ('Covid', 'Cum')]
+        self.records = [
+            VaccinationRecord.objects.create(user=user, vaccine=vaccine, site=site, dose_number=1,
+                                             injection_date=date(2024, month, 1))
+            for user, vaccine, month in zip(self.users, vaccines, (3, 5))
+        ]
+
+    def ids(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_users_search(self):
+        self.assertEqual(self.ids('/users/', {'q': 'BIN'}), [self.users[1].pk])
+
+    def test_records_search(self):
+        self.assertEqual(self.ids('/records/history/', {'q': 'covid'}), [self.records[0].pk])
+        self.assertEqual(self.ids('/records/history/', {'q': 'binh'}), [self.records[1].pk])
+        self.assertEqual(self.ids('/records/history/', {'q': str(self.records[0].pk)}), [self.records[0].pk])
+        self.assertEqual(self.ids('/records/history/', {'month': 5, 'year': 2024}), [self.records[1].pk])
+        self.assertEqual(self.ids('/records/history/', {'year': 2023}), [])
+        self.assertEqual(self.client.get('/records/history/', {'month': 'x'}).status_code, 400)
+
+    def test_records_newest_first(self):
+        self.assertEqual(self.ids('/records/history/', {}), [self.records[1].pk, self.records[0].pk])
+
+    def test_past_schedules_newest_first(self):
+        schedules = [make_schedule(days=days, name=f'S{days}') for days in (-3, -2, 1)]
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        params = {'date_from': '1900-01-01', 'date_to': yesterday, 'order': 'desc'}
+        self.assertEqual(self.ids('/schedules/search/', params), [schedules[1].pk, schedules[0].pk])
+
+
+class BulkEndpointTests(TestCase):
+    def setUp(self):
+        self.schedule = make_schedule(slot_count=5)
+        self.appointments = [Appointment.objects.create(user=make_user(f'u{i}'), schedule=self.schedule,
+                                                        is_confirmed=True) for i in range(2)]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='staff', is_staff=True))
+
+    def test_false_string_unconfirms(self):
+        ids = [appointment.pk for appointment in self.appointments]
+        response = self.client.post('/appointments/bulk-confirm/', {'ids': ids, 'is_confirmed': 'false'},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({row['status'] for row in response.json()['results']}, {'unconfirmed'})
+        self.assertFalse(Appointment.objects.filter(is_confirmed=True).exists())
+
+    def test_invalid_flag(self):
+        response = self.client.post('/appointments/bulk-inoculate/',
+                                    {'ids': [self.appointments[0].pk], 'is_inoculated': 'maybe'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Appointment.objects.filter(is_inoculated=True).exists())
+
+
+class LogBufferTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.buffer = chat_log.LogBuffer(batch_size=10, max_pending=3)
+
+    def add(self, count):
+        for i in range(count):
+            self.buffer.add(QueryLog(user=self.user, question=f'q{i}', answer='a'))
+
+    def test_rows_kept_while_database_unavailable(self):
+        self.add(5)
+        with mock.patch.object(QueryLog.objects, 'bulk_create', side_effect=OperationalError('gone away')):
+            self.assertEqual(self.buffer.flush(), 0)
+        # Chỉ giữ các dòng mới nhất trong giới hạn max_pending
+        self.assertEqual([row.question for row in self.buffer.query_logs], ['q2', 'q3', 'q4'])
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(QueryLog.objects.count(), 3)
+
+    def test_bad_rows_dropped_individually(self):
+        self.add(2)
+        self.buffer.add(QueryLog(user=self.user, question=None, answer='a'))
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(QueryLog.objects.count(), 2)
+        self.assertEqual(self.buffer.query_logs, [])
+
+
+class NearestSitesTests(TestCase):
+    def site(self, name, latitude, longitude):
+        site = InjectionSite.objects.create(name=name, address='addr', latitude=latitude, longitude=longitude)
+        vaccine_type, _ = VaccineType.objects.get_or_create(name='T')
+        vaccine, _ = Vaccine.objects.get_or_create(name='V', defaults={'vaccine_type': vaccine_type})
+        InjectionSchedule.objects.create(vaccine=vaccine, site=site, date=date.today() + timedelta(days=1))
+        return site
+
+    def test_cell_width_shrinks_with_latitude(self):
+        self.assertAlmostEqual(geo.cell_min_km(5, 0), 4.89, places=2)
+        self.assertLess(geo.cell_min_km(5, 21.0), geo.cell_min_km(5, 0))
+        self.assertLess(geo.cell_min_km(5, 60.0), 2.5)
+
+    def test_closer_site_outside_neighbour_cells(self):
+        # Vị trí ở sát mép tây của ô độ chính xác 5, vĩ độ 60 (ô rộng khoảng 2.44 km theo chiều đông-tây)
+        (lat_min, lat_max), (lng_min, lng_max) = geo.bounds(geo.encode(60.0, 10.0, 5))
+        latitude, longitude = (lat_min + lat_max) / 2, lng_min + 0.0001
+        km_per_lng = geo.KM_PER_DEGREE * math.cos(math.radians(latitude))
+        west = self.site('west', latitude, longitude - 2.6 / km_per_lng)
+        self.site('east', latitude, longitude + 4.0 / km_per_lng)
+
+        nearest = dao.load_nearest_sites(latitude, longitude, date.today(), date.today() + timedelta(days=7), limit=1)
+        self.assertEqual([site.pk for site in nearest], [west.pk])
+
+
+@override_settings(CHAT_LOG_BUFFERED=False)
+class AiChatTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(make_user())
+
+    def test_no_match_is_structured(self):
+        response = self.client.post('/ai-chat/', {'message': 'zzzz qqqq'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['success'])
+        self.assertEqual(response.json()['suggestions'], [])
+        self.assertIn('không hiểu', response.json()['message'])
+        self.assertIsInstance(views.generate_response('zzzz qqqq'), dict)
+
+    def test_invalid_question_is_an_error_and_not_cached(self):
+        with mock.patch.object(views, 'build_response', side_effect=ValueError):
+            response = self.client.post('/ai-chat/', {'message': 'lịch tiêm'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
+        self.assertNotIn('answer', response.json())
+        self.assertIsNone(chat_cache.lookup('lịch tiêm', chat_cache.version()))
+
+    def test_answer_built_before_faq_change_is_not_cached_under_new_version(self):
+        def build_then_edit_faq(message):
+            cache.set(faq_index.VERSION_KEY, chat_cache.version() + 1, timeout=None)
+            return {'answer': 'cũ', 'suggestions': [], 'navigation': None}
+
+        with mock.patch.object(views, 'build_response', side_effect=build_then_edit_faq):
+            views.generate_response('lịch tiêm')
+        self.assertIsNone(chat_cache.lookup('lịch tiêm', chat_cache.version()))
+
+
+@mock.patch.object(certificates, 'render', return_value=b'%PDF')
+class CertificateCacheTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.user = make_user()
+
+    def payload(self, lines, issue_date='2026-01-01'):
+        payload = certificates.build_payload(self.user, lines)
+        payload['issue_date'] = issue_date
+        return payload
+
+    def test_reused_within_the_issue_date(self, render):
+        first = certificates.write_certificate(self.payload(['a']), self.directory)
+        self.assertEqual(certificates.write_certificate(self.payload(['a']), self.directory), first)
+        self.assertEqual(render.call_count, 1)
+        # Ngày cấp được in trên giấy nên sang ngày mới phải vẽ lại
+        self.assertNotEqual(certificates.write_certificate(self.payload(['a'], '2026-01-02'), self.directory), first)
+        self.assertEqual(render.call_count, 2)
+        self.assertFalse([name for name in os.listdir(self.directory) if name.endswith('.tmp')])
+
+    def test_write_prunes_old_versions(self, render):
+        old = certificates.write_certificate(self.payload(['a']), self.directory)
+        other = certificates.write_certificate(dict(self.payload(['a']), user_id=self.user.pk + 10), self.directory)
+        for path in (old, other):
+            os.utime(path, (time.time() - 7200, time.time() - 7200))
+        new = certificates.write_certificate(self.payload(['a'], '2026-01-02'), self.directory)
+        self.assertFalse(os.path.exists(old))
+        # Giấy của người dùng khác không bị dọn khi ghi
+        self.assertTrue(os.path.exists(other))
+        self.assertTrue(os.path.exists(new))
+
+    def test_old_versions_kept_until_pruned(self, render):
+        old = certificates.write_certificate(self.payload(['a']), self.directory)
+        os.utime(old, (time.time() - 60, time.time() - 60))
+        new = certificates.write_certificate(self.payload(['a', 'b']), self.directory)
+        # Request đang trả file cũ vẫn mở được
+        self.assertTrue(os.path.exists(old))
+
+        self.assertEqual(certificates.prune(self.directory, grace_seconds=3600), 0)
+        self.assertEqual(certificates.prune(self.directory, grace_seconds=30), 1)
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(new))
+
+
+class FaqMiningTests(TestCase):
+    WHERE = ['Tiêm vắc xin ở đâu?', 'tiêm vắc xin ở đâu', 'Ở đâu tiêm vắc xin?', 'Tiêm vắc xin ở đâu vậy ạ?']
+    PRICE = ['Giá vắc xin cúm bao nhiêu tiền?', 'Giá vắc xin cúm bao nhiêu?']
+    FEVER = ['Trẻ bị sốt sau tiêm có sao không?']
+
+    def mine(self, asked, unanswered=()):
+        miner = faq_mining.FaqMiner()
+        miner.add_chunk([(text, None) for text in asked])
+        miner.add_chunk([(text, None) for text in unanswered], unanswered=True)
+        return miner.index.top(min_count=1)
+
+    def test_near_duplicates_cluster(self):
+        clusters = self.mine(self.WHERE + self.PRICE + self.FEVER + ['', '???'])
+        groups = [sorted(cluster.examples) for cluster in clusters]
+        self.assertEqual(groups, [sorted(faq_mining.normalize(text) for text in group)
+                                  for group in (self.WHERE, self.PRICE, self.FEVER)])
+        self.assertEqual([cluster.score for cluster in clusters], [4, 2, 1])
+
+    def test_unanswered_ranked_higher(self):
+        # Câu chưa trả lời có trong cả QueryLog và UnansweredQuestion nên được tính hai lần
+        clusters = self.mine(self.PRICE + self.FEVER * 2, unanswered=self.FEVER * 2)
+        self.assertEqual([(cluster.asked, cluster.unanswered, cluster.score) for cluster in clusters],
+                         [(2, 2, 4), (2, 0, 2)])
+
+    def test_prune_drops_rare_clusters(self):
+        index = faq_mining.ClusterIndex(num_perm=8, bands=4, max_clusters=4)
+        for i, count in enumerate((5, 1, 4, 1, 3)):
+            signature = np.full(8, i, dtype=np.uint32)
+            index.add(signature, f'q{i}', [f'q{i}'], asked=count)
+        # Vượt sức chứa: giảm về 3 cụm, bỏ các cụm có điểm thấp nhất cùng band của chúng
+        self.assertEqual(sorted(cluster.question for cluster in index.clusters.values()), ['q0', 'q2', 'q4'])
+        self.assertEqual(index.evicted, 2)
+        self.assertEqual(set(index.buckets.values()), set(index.clusters))
+
+    def test_save_candidates(self):
+        FaqCandidate.objects.create(question='Old', score=1)
+        FaqCandidate.objects.create(question='Giá vắc xin cúm bao nhiêu tiền?', status=FaqCandidate.DISMISSED)
+        clusters = self.mine(self.WHERE + self.PRICE * 2)
+        self.assertEqual(faq_mining.save_candidates(clusters), 1)
+        new = FaqCandidate.objects.get(status=FaqCandidate.NEW)
+        self.assertEqual((new.question, new.asked_count, new.score), ('tiêm vắc xin ở đâu?', 4, 4))
+        self.assertEqual(len(new.examples), 4)
+        self.assertEqual(FaqCandidate.objects.count(), 2)
+
+    def test_command(self):
+        user = make_user()
+        QueryLog.objects.bulk_create([QueryLog(user=user, question=text, answer='a') for text in self.WHERE])
+        call_command('mine_faqs', '--min-count', '2', stdout=io.StringIO())
+        self.assertEqual(list(FaqCandidate.objects.values_list('question', 'score')), [('tiêm vắc xin ở đâu?', 4)])
+
+
+class SuggestTests(TestCase):
+    WORDS = ['vắc_xin', 'viêm_gan', 'viêm_não', 'tiêm', 'tiêm_chủng', 'lịch_tiêm', 'địa_điểm', 'cúm', 'sốt', 'trẻ_em',
+             'phản_ứng', 'sau_tiêm', 'giá', 'bao_nhiêu', 'đặt_lịch', 'hủy_lịch', 'chứng_nhận', 'mũi_nhắc']
+    QUESTIONS = ['Tiêm vắc xin ở đâu?', 'Giá vắc xin cúm bao nhiêu?', 'Lịch tiêm chủng cho trẻ em',
+                 'Sốt sau tiêm phải làm sao?', 'Đặt lịch tiêm như thế nào?', 'Hủy lịch hẹn được không?']
+
+    def assertSameAsDifflib(self, vocabulary, queries):
+        suggester = suggest.NgramSuggester(vocabulary + vocabulary[:2])
+        self.assertEqual(len(suggester), len(vocabulary))
+        for query in queries:
+            with self.subTest(query=query):
+                self.assertEqual(suggester.lookup(query, 3, 0.5), get_close_matches(query, vocabulary, 3, 0.5))
+
+    def test_keywords_rank_like_difflib(self):
+        # Sai dấu, thiếu dấu, sai chữ và từ không liên quan
+        self.assertSameAsDifflib(self.WORDS, [
+            'vac_xin', 'viêm_gam', 'viêm', 'tiem', 'tiêm_chũng', 'lịch', 'đặt_lich', 'sôt', 'phản_ứg',
+            'chứng_nhân', 'mũi_nhăc', 'trẻ', 'huỷ_lịch', 'dia_diem', 'cum', 'gia', 'xyz',
+        ])
+
+    def test_questions_rank_like_difflib(self):
+        self.assertSameAsDifflib(self.QUESTIONS, [
+            'tiêm vắc xin ở đâu', 'giá vắc xin bao nhiêu', 'lịch tiêm cho trẻ', 'sốt sau khi tiêm', 'đặt lịch thế nào',
+            'huy lich hen', 'bảo hiểm y tế',
+        ])
+
+
+class FaqIndexLockTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        faq_index.get_index()
+
+    @mock.patch.object(faq_index, 'LOCK_WAIT', 0)
+    def test_update_waits_for_lock_owner(self):
+        cache.set(faq_index.LOCK_KEY, 'other-worker', timeout=faq_index.LOCK_TIMEOUT)
+        version = chat_cache.version()
+        with mock.patch('threading.Timer') as timer, self.captureOnCommitCallbacks(execute=True):
+            faq = Faq.objects.create(question_keywords='giá vắc xin', answer='100k')
+        # Không ghi snapshot và không xóa khóa của worker khác, chỉ hẹn thử lại
+        self.assertEqual(chat_cache.version(), version)
+        self.assertEqual(cache.get(faq_index.LOCK_KEY), 'other-worker')
+        apply, attempt = timer.call_args.kwargs['args']
+
+        cache.delete(faq_index.LOCK_KEY)
+        faq_index._update(apply, attempt)
+        self.assertGreater(chat_cache.version(), version)
+        self.assertIn(faq.pk, faq_index.get_index().entries)
+
+    @mock.patch.object(faq_index, 'LOCK_WAIT', 0)
+    def test_last_attempt_drops_snapshot(self):
+        cache.set(faq_index.LOCK_KEY, 'other-worker', timeout=faq_index.LOCK_TIMEOUT)
+        version = chat_cache.version()
+        faq = Faq.objects.create(question_keywords='giá vắc xin', answer='100k')
+        with self.assertLogs('AppTiemChung.faq_index', 'ERROR'):
+            faq_index._update(lambda index: index.add(faq), faq_index.UPDATE_ATTEMPTS)
+        self.assertIsNone(cache.get(faq_index.SNAPSHOT_KEY))
+        self.assertGreater(chat_cache.version(), version)
+        # Lần đọc sau dựng lại từ DB
+        self.assertIn(faq.pk, faq_index.get_index().entries)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', NOTIFICATION_LOCAL_WORKER=False)
+class NotificationTests(TestCase):
+    def enqueue(self, count):
+        for i in range(count):
+            notifications.enqueue(f'subject {i}', 'body', f'u{i}@x.com')
+
+    def test_failure_midway_keeps_sent_messages(self):
+        self.enqueue(3)
+        send = mail.get_connection().__class__.send_messages
+        calls = []
+
+        def flaky(backend, messages):
+            calls.append(messages[0].subject)
+            if len(calls) == 2:
+                raise ConnectionError('smtp reset')
+            return send(backend, messages)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', flaky):
+            self.assertEqual(notifications.deliver_due(), (2, 1))
+        statuses = dict(Notification.objects.values_list('subject', 'status'))
+        self.assertEqual(statuses, {'subject 0': 'Sent', 'subject 1': 'Pending', 'subject 2': 'Sent'})
+        self.assertFalse(Notification.objects.exclude(claimed_by='').exists())
+
+        # Thư lỗi chỉ được gửi lại khi đến hạn, thư đã gửi không bị gửi lại
+        Notification.objects.filter(status='Pending').update(next_attempt_at=timezone.now())
+        self.assertEqual(notifications.deliver_due(), (1, 0))
+        self.assertEqual(sorted(message.subject for message in mail.outbox), ['subject 0', 'subject 1', 'subject 2'])
+
+    def test_expired_claim_taken_over(self):
+        self.enqueue(1)
+        claimed = notifications.claim_due(10, 'worker-a')
+        self.assertEqual(Notification.objects.get().status, 'Sending')
+        # Chưa hết hạn giữ chỗ: worker khác không nhận
+        self.assertEqual(notifications.claim_due(10, 'worker-b'), [])
+
+        Notification.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(notifications.deliver_due(), (1, 0))
+        # Worker cũ không gửi lại thư đã bị nhận lại
+        self.assertFalse(notifications.extend_lease(claimed[0], 'worker-a'))
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class StatsTests(TestCase):
+    def setUp(self):
+        self.schedule = make_schedule()
+        stats.recompute()
+
+    def vaccinated(self):
+        return StatCounter.objects.get(name=stats.VACCINATED).value
+
+    def record(self, user, dose=1):
+        return VaccinationRecord.objects.create(user=user, vaccine=self.schedule.vaccine, dose_number=dose,
+                                                injection_date=date.today())
+
+    def test_concurrent_first_doses_counted_once(self):
+        user = make_user()
+        # Hai hồ sơ đầu tiên cùng commit trước khi hook của bên nào chạy
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.record(user, 1)
+            self.record(user, 2)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.vaccinated(), 1)
+        self.assertEqual(VaccineTally.objects.get().count, 2)
+
+    def test_last_record_deleted(self):
+        user, other = make_user(), make_user('other')
+        with self.captureOnCommitCallbacks(execute=True):
+            records = [self.record(user, 1), self.record(user, 2), self.record(other)]
+        self.assertEqual(self.vaccinated(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            records[0].delete()
+        self.assertEqual(self.vaccinated(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            records[1].delete()
+            other.delete()
+        self.assertEqual(self.vaccinated(), 0)
+        self.assertFalse(User.objects.get(pk=user.pk).vaccinated)
+
+    def test_delete_after_rollback_is_counted(self):
+        user, other = make_user(), make_user('other')
+        with self.captureOnCommitCallbacks(execute=True):
+            record, other_record = self.record(user), self.record(other)
+        try:
+            with transaction.atomic():
+                record.delete()
+                raise ValueError
+        except ValueError:
+            pass
+        # Transaction sau vẫn flush, người dùng của lần rollback được kiểm tra lại và vẫn tính là đã tiêm
+        with self.captureOnCommitCallbacks(execute=True):
+            other_record.delete()
+        self.assertEqual(self.vaccinated(), 1)
+        self.assertTrue(User.objects.get(pk=user.pk).vaccinated)
+        self.assertFalse(User.objects.get(pk=other.pk).vaccinated)
+
+    def test_snapshot_without_counters_is_read_only(self):
+        user = make_user()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record(user)
+            Appointment.objects.create(user=user, schedule=self.schedule)
+        StatCounter.objects.all().delete()
+        User.objects.update(vaccinated=False)
+        cache.clear()
+
+        expected = {'total_vaccinated': 1, 'completion_rate': 0.0, 'popular_vaccines': [{'name': 'V', 'count': 1}]}
+        self.assertEqual(stats.snapshot(), expected)
+        self.assertFalse(StatCounter.objects.exists())
+        self.assertFalse(User.objects.get(pk=user.pk).vaccinated)
+        # Lần sau đọc từ cache
+        with self.assertNumQueries(1):
+            self.assertEqual(stats.snapshot(), expected)
+
+    def test_tally_not_negative(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            stats.bump_vaccines({self.schedule.vaccine_id: -1})
+        self.assertEqual(VaccineTally.objects.get().count, 0)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.old, self.older, self.yesterday = (make_schedule(days=days, name=f'S{days}') for days in (-10, -20, -1))
+        self.users = [make_user(f'u{i}') for i in range(3)]
+        self.appointments = [
+            Appointment.objects.create(user=self.users[0], schedule=self.old, is_confirmed=True, is_inoculated=True),
+            Appointment.objects.create(user=self.users[1], schedule=self.old, is_confirmed=True),
+            Appointment.objects.create(user=self.users[2], schedule=self.old),
+            Appointment.objects.create(user=self.users[0], schedule=self.older),
+            Appointment.objects.create(user=self.users[1], schedule=self.yesterday),
+        ]
+
+    def build(self, *args):
+        call_command('build_rollups', *args, stdout=io.StringIO())
+
+    def row(self, schedule):
+        return DailyRollup.objects.get(date=schedule.date)
+
+    def test_full_build(self):
+        self.build()
+        row = self.row(self.old)
+        self.assertEqual((row.appointments, row.confirmations, row.inoculations, row.no_shows), (3, 2, 1, 1))
+        by_site = {item['site__name']: item['appointments']
+                   for item in rollups.query(self.older.date, date.today(), 'site')}
+        self.assertEqual(by_site, {'S-10': 3, 'S-20': 1, 'S-1': 1})
+        self.assertEqual([item['appointments'] for item in rollups.query(self.old.date, self.old.date, 'vaccine')], [3])
+
+    def test_incremental_window(self):
+        self.build()
+        first_run = rollups.last_run()
+        # Dòng cũ bị sửa tay: lần chạy tăng dần chỉ tính lại ngày có lịch hẹn đổi và các ngày lookback
+        DailyRollup.objects.update(appointments=99)
+        appointment = self.appointments[2]
+        appointment.is_confirmed = True
+        appointment.save()
+        self.build()
+        self.assertGreater(rollups.last_run(), first_run)
+        self.assertEqual(self.row(self.old).confirmations, 3)
+        self.assertEqual(self.row(self.old).appointments, 3)
+        self.assertEqual(self.row(self.yesterday).appointments, 1)
+        self.assertEqual(self.row(self.older).appointments, 99)
+
+        self.build('--full')
+        self.assertEqual(self.row(self.older).appointments, 1)
+
+    def test_delete_outside_lookback(self):
+        self.build()
+        first_run = rollups.last_run()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.appointments[1].delete()
+        row = self.row(self.old)
+        self.assertEqual((row.appointments, row.confirmations, row.no_shows), (2, 1, 0))
+        # Không đổi mốc lần chạy, lần tăng dần sau vẫn thấy các lịch hẹn sửa từ trước đó
+        self.assertEqual(rollups.last_run(), first_run)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.older.delete()
+        self.assertFalse(DailyRollup.objects.filter(date=self.older.date).exists())
+        self.build()
+        self.assertEqual(self.row(self.old).appointments, 2)
+
+    def test_delete_before_first_build(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.appointments[1].delete()
+        self.assertIsNone(rollups.last_run())
+
+    def test_date_range(self):
+        self.build('--from', str(self.older.date), '--to', str(self.old.date))
+        self.assertEqual(set(DailyRollup.objects.values_list('date', flat=True)), {self.old.date, self.older.date})
+        for args in (['--from', str(self.old.date)], ['--from', 'x', '--to', 'y']):
+            with self.subTest(args=args), self.assertRaises(CommandError):
+                self.build(*args)
+
+
+class ChatInboxTests(TestCase):
+    def setUp(self):
+        staff = make_user('staff')
+        staff.is_staff = True
+        staff.save()
+        self.client = APIClient()
+        self.client.force_authenticate(staff)
+
+    def test_pages_cover_conversations_with_same_timestamp(self):
+        now = timezone.now()
+        users = [make_user(f'u{i}') for i in range(5)]
+        for user in users:
+            ChatConversation.objects.create(user=user, last_message='hi', last_message_at=now)
+
+        seen, url = [], '/chat/inbox/?page_size=2'
+        while url:
+            data = self.client.get(url).json()
+            seen += [item['user_id'] for item in data['results']]
+            url = data['next']
+        self.assertEqual(seen, sorted((user.pk for user in users), reverse=True))
+
+
+class ChatMessageTests(TestCase):
+    def setUp(self):
+        self.user, self.staff = make_user(), make_user('staff')
+        self.staff.is_staff = True
+        self.staff.save()
+        self.client = APIClient()
+        self.addCleanup(chat_backends.set_backend, None)
+
+    def post(self, sender, data):
+        self.client.force_authenticate(sender)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/chat/messages/', data, format='json')
+
+    @override_settings(CHAT_BACKEND='database')
+    def test_history_from_database_backend(self):
+        chat_backends.set_backend(None)
+        self.post(self.user, {'message': 'xin chào'})
+        self.post(self.staff, {'message': 'chào bạn', 'user_id': self.user.pk})
+
+        self.client.force_authenticate(self.user)
+        data = self.client.get('/chat/messages/').json()
+        self.assertEqual([(m['text'], m['is_user']) for m in data['results']],
+                         [('chào bạn', False), ('xin chào', True)])
+        self.client.force_authenticate(self.staff)
+        data = self.client.get(f'/chat/messages/?user_id={self.user.pk}').json()
+        self.assertEqual(len(data['results']), 2)
+
+    def test_history_unavailable_without_database_backend(self):
+        chat_backends.set_backend(chat_backends.MemoryBackend())
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/chat/messages/').status_code, 404)
+
+    def test_firebase_retry_keeps_newest(self):
+        backend = chat_backends.FirebaseBackend(max_pending=3)
+        with mock.patch.object(chat_backends, 'firebase_app', side_effect=ConnectionError('offline')):
+            for i in range(3):
+                backend.message(1, f'k{i}', {'text': i})
+            backend.flush()
+            backend.message(1, 'k3', {'text': 3})
+            backend.summary(1, {'last_message': 3})
+            backend.flush()
+        self.assertEqual(list(backend.pending), ['chats/1/k2', 'chats/1/k3', 'staff_chats/1'])
+
+
+@override_settings(NOTIFICATION_LOCAL_WORKER=False)
+class ConcurrencyTests(TransactionTestCase):
+    """
+    Chạy song song bằng thread. SQLite khóa cả file nên một số luồng có thể lỗi "database is locked":
+    chỉ kiểm tra bất biến trên dữ liệu đã commit, không đòi mọi luồng thành công.
+    """
+
+    def run_threads(self, count, target):
+        barrier = threading.Barrier(count)
+        errors = []
+
+        def run(i):
+            try:
+                barrier.wait()
+                target(i)
+            except (slots.ScheduleFullError, OperationalError, IntegrityError) as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_reserve_slot_never_overbooks(self):
+        schedule = make_schedule(slot_count=3)
+        appointments = [Appointment.objects.create(user=make_user(f'u{i}'), schedule=schedule) for i in range(8)]
+        remaining = []
+
+        def confirm(i):
+            appointment = Appointment.objects.select_related('schedule').get(pk=appointments[i].pk)
+            appointment.is_confirmed = True
+            appointment.save()
+            # Giá trị trong bộ nhớ được đọc lại từ DB, không tự trừ trên bản cũ
+            remaining.append(appointment.schedule.slot_count)
+
+        self.run_threads(len(appointments), confirm)
+        schedule.refresh_from_db()
+        confirmed = Appointment.objects.filter(schedule=schedule, is_confirmed=True).count()
+        self.assertGreaterEqual(schedule.slot_count, 0)
+        self.assertGreater(confirmed, 0)
+        self.assertEqual(confirmed + schedule.slot_count, 3)
+        self.assertEqual(len(set(remaining)), len(remaining))
+        self.assertTrue(all(0 <= count < 3 for count in remaining))
+
+    def test_create_record_has_no_duplicate_doses(self):
+        schedule, user = make_schedule(), make_user()
+
+        def inject(i):
+            doses.create_record(user.pk, schedule.vaccine_id, schedule.date, schedule.site_id)
+
+        self.run_threads(6, inject)
+        dose_numbers = sorted(VaccinationRecord.objects.filter(user=user).values_list('dose_number', flat=True))
+        self.assertTrue(dose_numbers)
+        self.assertEqual(dose_numbers, list(range(1, len(dose_numbers) + 1)))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', NOTIFICATION_LOCAL_WORKER=False)
+class SendRemindsTests(TransactionTestCase):
+    def test_failure_midway_does_not_resend(self):
+        schedule = make_schedule()
+        for i in range(3):
+            Appointment.objects.create(user=make_user(f'u{i}'), schedule=schedule, is_confirmed=True,
+                                       reminder_enabled=True)
+        send = mail.get_connection().__class__.send_messages
+        calls = []
+
+        def flaky(backend, messages):
+            calls.append(messages)
+            if len(calls) == 2:
+                raise ConnectionError('smtp reset')
+            return send(backend, messages)
+
+        options = {'date': schedule.date.isoformat(), 'workers': 1, 'stdout': io.StringIO(), 'stderr': io.StringIO()}
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', flaky):
+            with self.assertRaises(CommandError):
+                call_command('send_reminds', **options)
+        self.assertEqual(Appointment.objects.filter(reminder_sent_at__isnull=False).count(), 1)
+
+        call_command('send_reminds', **options)
+        recipients = sorted(message.to[0] for message in mail.outbox)
+        self.assertEqual(recipients, ['u0@x.com', 'u1@x.com', 'u2@x.com'])
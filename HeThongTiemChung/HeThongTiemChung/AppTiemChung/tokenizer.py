@@ -0,0 +1,154 @@
+import re
+import string
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+_vi_tokenizer = None
+_lock = threading.Lock()
+_cache = None
+
+SPACES = re.compile(r'\s+')
+
+
+def get_tokenizer():
+    """
+    pyvi nạp mô hình CRF (kéo theo sklearn, mất khoảng 1 giây) nên chỉ import ở lần tách từ đầu tiên,
+    không phải lúc worker khởi động hay khi chạy các lệnh manage.py không dùng tới.
+    Trả về lớp ViTokenizer.ViTokenizer (chứa model, sylabelize, sent2features), không phải module.
+    """
+    global _vi_tokenizer
+    if _vi_tokenizer is None:
+        with _lock:
+            if _vi_tokenizer is None:
+                from pyvi import ViTokenizer
+
+                _vi_tokenizer = ViTokenizer.ViTokenizer
+    return _vi_tokenizer
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.hits = self.misses = 0
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = LRUCache(getattr(settings, 'TOKENIZER_CACHE_SIZE', 10000))
+    return _cache
+
+
+def normalize(text):
+    """Khóa cache: chuẩn hóa Unicode NFC (bàn phím gõ dấu tổ hợp) và gộp khoảng trắng; giữ chữ hoa vì pyvi dùng nó."""
+    return SPACES.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def _join(syllables, labels):
+    # Cùng quy tắc ghép âm tiết thành từ của ViTokenizer.tokenize
+    output = [syllables[0]]
+    for i in range(1, len(labels)):
+        current, previous = syllables[i], syllables[i - 1]
+        if labels[i] == 'I_W' and current not in string.punctuation and previous not in string.punctuation \
+                and not current[0].isdigit() and not previous[0].isdigit() \
+                and not (current[0].istitle() and not previous[0].istitle()):
+            output[-1] = output[-1] + '_' + current
+        else:
+            output.append(current)
+    return output
+
+
+def _tokenize_batch(texts):
+    """Tách nhiều chuỗi (đã chuẩn hóa) với một lần gọi model.predict thay vì một lần cho mỗi chuỗi."""
+    vi_tokenizer = get_tokenizer()
+    model = getattr(vi_tokenizer, 'model', None)
+    if model is None or not hasattr(vi_tokenizer, 'sylabelize'):
+        return [vi_tokenizer.tokenize(text).split() for text in texts]
+
+    results = [None] * len(texts)
+    pending, features = [], []
+    for position, text in enumerate(texts):
+        syllables = vi_tokenizer.sylabelize(text)[1]
+        if not syllables:
+            results[position] = text.split()
+        else:
+            pending.append((position, syllables))
+            features.append(vi_tokenizer.sent2features(syllables, False))
+    if features:
+        for (position, syllables), labels in zip(pending, model.predict(features)):
+            results[position] = _join(syllables, labels)
+    return results
+
+
+def tokenize(text):
+    """Tách từ tiếng Việt, trả về danh sách token (từ ghép nối bằng '_'); kết quả được cache theo chuỗi chuẩn hóa."""
+    return tokenize_many([text])[0]
+
+
+def tokenize_many(texts, processes=None, chunk_size=500):
+    """
+    Tách nhiều chuỗi một lượt (dựng chỉ mục, tác vụ offline). Chuỗi trùng và chuỗi đã có trong cache không tách lại.
+    processes > 1 chia các chuỗi chưa cache cho một pool tiến trình (mỗi tiến trình nạp mô hình riêng,
+    chỉ đáng dùng khi tách lại hàng chục nghìn chuỗi như lịch sử QueryLog).
+    """
+    cache = get_cache()
+    keys = [normalize(text) for text in texts]
+    found = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        tokens = cache.get(key)
+        if tokens is None:
+            missing.append(key)
+        else:
+            found[key] = tokens
+
+    if missing:
+        chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+        if processes and processes > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                batches = list(pool.map(_tokenize_batch, chunks))
+        else:
+            batches = [_tokenize_batch(chunk) for chunk in chunks]
+        for chunk, batch in zip(chunks, batches):
+            for key, tokens in zip(chunk, batch):
+                found[key] = tokens = tuple(tokens)
+                cache.put(key, tokens)
+
+    return [list(found[key]) for key in keys]
+
+
+def cache_info():
+    cache = get_cache()
+    return {'size': len(cache.data), 'maxsize': cache.maxsize, 'hits': cache.hits, 'misses': cache.misses}
@@ -17,5 +17,12 @@ urlpatterns = [
     path('', include(router.urls)),  # Bao gồm tất cả các URL từ router
     path('', views.index, name="index"),  # URL gốc trỏ tới index (nếu cần)
     path('stats/', views.StatsAPIView.as_view(), name='stats-api'),
+    path('stats/rollups/', views.RollupStatsAPIView.as_view(), name='stats-rollups'),
+    path('stats/response-cache/', views.response_cache_stats, name='stats-response-cache'),
+    path('sync/', views.sync_changes, name='sync'),
+    path('chat/messages/', views.chat_messages, name='chat-messages'),
+    path('chat/inbox/', views.get_staff_chats, name='chat-inbox'),
+    path('chat/inbox/<int:user_id>/read/', views.mark_chat_read, name='chat-mark-read'),
     path('ai-chat/', views.ai_chat_free_api, name='ai-chat'),
+    path('ai-chat/cache-stats/', views.ai_chat_cache_stats, name='ai-chat-cache-stats'),
 ]
@@ -1,40 +1,49 @@
-import hashlib
-import io
-import os
-from datetime import datetime
-from difflib import get_close_matches
-
-import firebase_admin
+from datetime import date, datetime, timedelta
+
+from AppTiemChung import bulk
+from AppTiemChung import certificates
+from AppTiemChung import chat
+from AppTiemChung import chat_cache
+from AppTiemChung import chat_log
+from AppTiemChung import dao
+from AppTiemChung import faq_index
 from AppTiemChung import models
+from AppTiemChung import notifications
+from AppTiemChung import response_cache
+from AppTiemChung import rollups
+from AppTiemChung import search
 from AppTiemChung import serializers
-from django.conf import settings
-from django.contrib.auth.decorators import login_required
-from django.core.cache import cache
-from django.core.mail import send_mail
-from django.db.models import Count
+from AppTiemChung import slots
+from AppTiemChung import stats
+from AppTiemChung import sync
+from AppTiemChung import tokenizer
 from django.db.models import Q
-from django.http import HttpResponse, FileResponse, JsonResponse
+from django.http import HttpResponse, FileResponse
 from django.utils import timezone
-from django.views.decorators.csrf import csrf_exempt
-from firebase_admin import credentials, db
-from pyvi import ViTokenizer
-from reportlab.pdfgen import canvas
-from rest_framework import viewsets, generics, parsers, status
+from rest_framework import fields, viewsets, generics, parsers, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Vaccine, User, Appointment, VaccinationRecord
+from .models import User
+from .conditional import ConditionalGetMixin
+from .response_cache import CachedResponseMixin
+from .paginators import (ChatMessagePaginator, CursorPaginatedMixin, CursorPaginator, InboxPaginator, RecordPaginator,
+                         SchedulePaginator, SearchPaginator, UserPaginator)
 from .permissions import IsAdminUser, IsStaffUser
 from .serializers import UserSerializer
+from .slots import ScheduleFullError
+
+
+BULK_MAX_IDS = 1000
 
 
 def index(request):
     return HttpResponse("Vaccination App")
 
 
-class UserViewSet(viewsets.ViewSet, generics.CreateAPIView):
+class UserViewSet(CursorPaginatedMixin, viewsets.ViewSet, generics.CreateAPIView):
     queryset = User.objects.filter(is_active=True)
     serializer_class = UserSerializer
     parser_classes = [parsers.MultiPartParser]
@@ -73,9 +82,8 @@ class UserViewSet(viewsets.ViewSet, generics.CreateAPIView):
             permission_classes=[IsAuthenticated])
     def history(self, request):
         user = request.user
-        user_appointments = models.Appointment.objects.filter(user=user)
-        serialized = serializers.AppointmentSerializer(user_appointments, many=True)
-        return Response(serialized.data)
+        user_appointments = dao.load_appointments().filter(user=user)
+        return self.paginated_response(user_appointments, serializers.AppointmentSerializer)
 
     def create(self, request):
         serializer = UserSerializer(data=request.data)
@@ -86,8 +94,10 @@ class UserViewSet(viewsets.ViewSet, generics.CreateAPIView):
 
     def list(self, request):
         users = models.User.objects.all()
-        serializer = serializers.UserSerializer(users, many=True)
-        return Response(serializer.data)
+        q = request.query_params.get('q', '').strip()
+        if q:
+            users = users.filter(Q(username__icontains=q) | Q(first_name__icontains=q) | Q(last_name__icontains=q))
+        return self.paginated_response(users, serializers.UserSerializer, pagination_class=UserPaginator)
 
     def retrieve(self, request, pk=None):
         try:
@@ -120,20 +130,37 @@ class UserViewSet(viewsets.ViewSet, generics.CreateAPIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class VaccineViewSet(viewsets.ModelViewSet):
-    queryset = Vaccine.objects.all()
+class VaccineViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
+    queryset = dao.load_vaccines()
+    pagination_class = CursorPaginator
     serializer_class = serializers.VaccineSerializer
     permission_classes = [IsAuthenticated]
 
+    def list(self, request, *args, **kwargs):
+        build = super().list
+        catalogue = [models.Vaccine, models.VaccineType]
+        return self.conditional_response(self.get_queryset(), lambda: self.cached_response(
+            'vaccines', catalogue, lambda: build(request, *args, **kwargs)), related=[models.VaccineType])
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        vaccines = dao.load_vaccine({
+            'kw': request.query_params.get('q', '').strip(),
+            'vaccine_type': request.query_params.get('vaccine_type'),
+        })
+        paginator = SearchPaginator()
+        page = paginator.paginate_queryset(vaccines, request, view=self)
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
 
-class VaccineTypeViewSet(viewsets.ViewSet):
+
+class VaccineTypeViewSet(ConditionalGetMixin, CachedResponseMixin, CursorPaginatedMixin, viewsets.ViewSet):
     serializer_class = serializers.VaccineTypeSerializer
     permission_classes = [IsAdminUser]
 
     def list(self, request):
         queryset = models.VaccineType.objects.all()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+        return self.conditional_response(queryset, lambda: self.cached_response(
+            'vaccine-types', [models.VaccineType], lambda: self.paginated_response(queryset)))
 
     def retrieve(self, request, pk=None):
         try:
@@ -173,25 +200,26 @@ class VaccineTypeViewSet(viewsets.ViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class AppointmentViewSet(viewsets.ViewSet):
+class AppointmentViewSet(CursorPaginatedMixin, viewsets.ViewSet):
     serializer_class = serializers.AppointmentSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
         if user.is_authenticated:
-            return models.Appointment.objects.filter(user=user)
+            return dao.load_appointments().filter(user=user)
         return models.Appointment.objects.none()
 
     def list(self, request):
-        queryset = self.get_queryset()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+        return self.paginated_response(self.get_queryset())
 
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
-            serializer.save(user=request.user)
+            try:
+                serializer.save(user=request.user)
+            except ScheduleFullError as e:
+                return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -208,7 +236,10 @@ class AppointmentViewSet(viewsets.ViewSet):
             return Response({'detail': 'Appointment not found.'}, status=status.HTTP_404_NOT_FOUND)
         serializer = self.serializer_class(appointment, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            try:
+                serializer.save()
+            except ScheduleFullError as e:
+                return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -234,12 +265,12 @@ class AppointmentViewSet(viewsets.ViewSet):
         return Response({'message': f'Reminder status updated to {reminder_value}.'})
 
 
-class AppointmentAdminViewSet(viewsets.ViewSet):
+class AppointmentAdminViewSet(CursorPaginatedMixin, viewsets.ViewSet):
     serializer_class = serializers.AppointmentSerializer
     permission_classes = [IsStaffUser]
 
     def get_queryset(self):
-        return models.Appointment.objects.all()
+        return dao.load_appointments()
 
     def perform_create(self, serializer):
         serializer.save()
@@ -252,16 +283,21 @@ class AppointmentAdminViewSet(viewsets.ViewSet):
 
     @action(methods=['get'], detail=False)
     def all(self, request):
-        appointments = models.Appointment.objects.all()
-        serializer = serializers.AppointmentSerializer(appointments, many=True)
-        return Response(serializer.data)
+        appointments = self.get_queryset()
+        q = request.query_params.get('q', '').strip()
+        if q:
+            # Tìm theo mã lịch hẹn hoặc tên tài khoản
+            match = Q(user__username__icontains=q)
+            if q.isdigit():
+                match |= Q(pk=int(q))
+            appointments = appointments.filter(match)
+        return self.paginated_response(appointments)
 
     @action(methods=['get'], detail=False)
     def history(self, request):
         today = timezone.now().date()
         past_appointments = self.get_queryset().filter(schedule__date__lt=today)
-        serializer = self.serializer_class(past_appointments, many=True)
-        return Response(serializer.data)
+        return self.paginated_response(past_appointments)
 
     @action(detail=True, methods=['patch'], url_path='mark-confirm')
     def mark_confirm(self, request, pk=None):
@@ -272,17 +308,27 @@ class AppointmentAdminViewSet(viewsets.ViewSet):
         confirm_value = request.data.get('is_confirmed')
         if confirm_value is None:
             return Response({'detail': 'Missing is_confirmed field.'}, status=400)
+        was_confirmed = appointment.is_confirmed
         appointment.is_confirmed = confirm_value
-        appointment.save()
+        try:
+            with slots.atomic():
+                appointment.save()
+                # Mail được ghi vào hàng đợi cùng transaction, worker gửi sau khi commit
+                if confirm_value:
+                    notifications.enqueue(
+                        'Appointment Confirmed',
+                        f'Your appointment on {appointment.schedule.date} at {appointment.schedule.site.name} has been confirmed.',
+                        appointment.user.email,
+                    )
+                elif was_confirmed:
+                    notifications.enqueue(
+                        'Appointment Cancelled',
+                        f'Your appointment on {appointment.schedule.date} at {appointment.schedule.site.name} has been cancelled.',
+                        appointment.user.email,
+                    )
+        except ScheduleFullError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        if confirm_value:
-            send_mail(
-                'Appointment Confirmed',
-                f'Your appointment on {appointment.schedule.date} at {appointment.schedule.site.name} has been confirmed.',
-                settings.EMAIL_HOST_USER,
-                [appointment.user.email],
-                fail_silently=False,
-            )
         return Response({'message': f'Appointment confirmation updated to {confirm_value}.'})
 
     @action(detail=True, methods=['patch'], url_path='mark-inoculated')
@@ -299,13 +345,45 @@ class AppointmentAdminViewSet(viewsets.ViewSet):
         appointment.save()
         return Response({'message': f'Appointment inoculated status updated to {inoculated_value}.'})
 
+    @action(detail=False, methods=['post'], url_path='bulk-confirm')
+    def bulk_confirm(self, request):
+        ids, error = self.parse_bulk_ids(request)
+        if error:
+            return error
+        confirm_value = self.parse_bulk_flag(request, 'is_confirmed')
+        return Response({'results': bulk.bulk_confirm(ids, confirm_value)})
+
+    @action(detail=False, methods=['post'], url_path='bulk-inoculate')
+    def bulk_inoculate(self, request):
+        ids, error = self.parse_bulk_ids(request)
+        if error:
+            return error
+        inoculated_value = self.parse_bulk_flag(request, 'is_inoculated')
+        return Response({'results': bulk.bulk_inoculate(ids, inoculated_value)})
+
+    def parse_bulk_flag(self, request, field):
+        # "false"/"0" từ form phải là False (bool("false") là True); giá trị lạ trả về 400
+        return fields.BooleanField().run_validation(request.data.get(field, True))
+
+    def parse_bulk_ids(self, request):
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids:
+            return None, Response({'detail': 'Missing ids field.'}, status=400)
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in ids))
+        except (TypeError, ValueError):
+            return None, Response({'detail': 'ids must be a list of integers.'}, status=400)
+        if len(ids) > BULK_MAX_IDS:
+            return None, Response({'detail': f'At most {BULK_MAX_IDS} ids per request.'}, status=400)
+        return ids, None
+
 
-class VaccinationRecordViewSet(viewsets.ViewSet):
+class VaccinationRecordViewSet(CursorPaginatedMixin, viewsets.ViewSet):
     serializer_class = serializers.VaccinationRecordSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return models.VaccinationRecord.objects.all()
+        return dao.load_vaccination_records()
 
     @action(detail=False, methods=['get'])
     def history(self, request):
@@ -314,73 +392,49 @@ class VaccinationRecordViewSet(viewsets.ViewSet):
         else:
             records = self.get_queryset().filter(user=request.user)
 
-        serializer = self.serializer_class(records, many=True)
-        return Response(serializer.data)
+        params = request.query_params
+        try:
+            filters = {field: int(params[name]) for name, field in [
+                ('month', 'injection_date__month'),
+                ('year', 'injection_date__year'),
+            ] if params.get(name)}
+        except ValueError:
+            return Response({'error': 'Tháng và năm phải là số.'}, status=status.HTTP_400_BAD_REQUEST)
+        records = records.filter(**filters)
+        q = params.get('q', '').strip()
+        if q:
+            # Người dùng tìm theo vaccine, nhân viên tìm theo mã hồ sơ hoặc người được tiêm
+            match = Q(vaccine__name__icontains=q) | Q(vaccine__vaccine_type__name__icontains=q) \
+                | Q(user__username__icontains=q) | Q(user__first_name__icontains=q) | Q(user__last_name__icontains=q)
+            if q.isdigit():
+                match |= Q(pk=int(q))
+            records = records.filter(match)
+        return self.paginated_response(records, pagination_class=RecordPaginator)
 
     @action(detail=True, methods=['get'], url_path='certificate')
     def download_single_certificate(self, request, pk=None):
         try:
-            record = models.VaccinationRecord.objects.select_related('vaccine', 'site').get(pk=pk)
+            record = dao.load_vaccination_records().get(pk=pk)
         except models.VaccinationRecord.DoesNotExist:
             return Response({'message': 'Vaccination record not found'}, status=404)
 
         if record.user != request.user:
             return Response({'message': 'Permission denied'}, status=403)
 
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer)
-
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(200, 800, "Vaccination Certificate")
-
-        p.setFont("Helvetica", 12)
-        p.drawString(50, 770, f"Name: {request.user.get_full_name()}")
-        p.drawString(50, 755, f"Citizen ID: {request.user.citizen_id}")
-        p.drawString(50, 740, f"Issue Date: {datetime.today().strftime('%Y-%m-%d')}")
-
-        p.drawString(50, 710, f"Vaccine: {record.vaccine.name}")
-        p.drawString(50, 690, f"Dose: {record.dose_number}")
-        p.drawString(50, 670, f"Date: {record.injection_date}")
-        p.drawString(50, 650, f"Site: {record.site.name if record.site else 'N/A'}")
-
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-
-        return FileResponse(buffer, as_attachment=True, filename=f'vaccination_{pk}_certificate.pdf')
+        payload = certificates.build_payload(request.user, certificates.single_record_lines(record),
+                                             kind=f'record{record.pk}')
+        path = certificates.write_certificate(payload)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'vaccination_{pk}_certificate.pdf')
 
     @action(detail=False, methods=['get'], url_path='certificate')
     def download_certificate(self, request):
-        records = models.VaccinationRecord.objects.filter(user=request.user)
-        if not records.exists():
+        records = list(dao.load_vaccination_records().filter(user=request.user).order_by('injection_date', 'pk'))
+        if not records:
             return Response({'message': 'No vaccination records found'}, status=404)
 
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer)
-
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(200, 800, "Vaccination Certificate")
-
-        p.setFont("Helvetica", 12)
-        p.drawString(50, 770, f"Name: {request.user.get_full_name()}")
-        p.drawString(50, 755, f"Citizen ID: {request.user.citizen_id}")
-        p.drawString(50, 740, f"Issue Date: {datetime.today().strftime('%Y-%m-%d')}")
-
-        y = 710
-        for record in records:
-            vaccine_name = record.vaccine.name
-            vaccine_type = record.vaccine.vaccine_type.name if record.vaccine.vaccine_type else "Không xác định"
-            dose_number = record.dose_number
-            injection_date = record.injection_date.strftime('%Y-%m-%d')
-
-            p.drawString(50, y, f"- {vaccine_name} ({vaccine_type}), Mũi {dose_number}, Ngày: {injection_date}")
-            y -= 20
-
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-
-        return FileResponse(buffer, as_attachment=True, filename='vaccination_certificate.pdf')
+        payload = certificates.build_payload(request.user, certificates.record_lines(records))
+        path = certificates.write_certificate(payload)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename='vaccination_certificate.pdf')
 
     @action(detail=True, methods=['patch'], url_path='add-health-note')
     def add_health_note(self, request, pk=None):
@@ -401,9 +455,12 @@ class VaccinationRecordViewSet(viewsets.ViewSet):
         return Response({'message': 'Health note updated successfully', 'health_note': record.health_note})
 
 
-class InjectionScheduleViewSet(viewsets.ViewSet):
+class InjectionScheduleViewSet(ConditionalGetMixin, CachedResponseMixin, CursorPaginatedMixin, viewsets.ViewSet):
+    catalogue = [models.InjectionSchedule, models.Vaccine, models.VaccineType, models.InjectionSite]
+
     queryset = models.InjectionSchedule.objects.all()
     serializer_class = serializers.InjectionScheduleSerializer
+    pagination_class = SchedulePaginator
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'destroy']:
@@ -413,9 +470,10 @@ class InjectionScheduleViewSet(viewsets.ViewSet):
         return [permission() for permission in permission_classes]
 
     def list(self, request):
-        schedules = models.InjectionSchedule.objects.all()
-        serializer = self.serializer_class(schedules, many=True)
-        return Response(serializer.data)
+        schedules = dao.load_schedules()
+        return self.conditional_response(schedules, lambda: self.cached_response(
+            'schedules', self.catalogue, lambda: self.paginated_response(schedules)),
+            related=[models.Vaccine, models.VaccineType, models.InjectionSite])
 
     def retrieve(self, request, pk=None):
         try:
@@ -467,8 +525,10 @@ class InjectionScheduleViewSet(viewsets.ViewSet):
 
     @action(detail=True, methods=['get'])
     def check_availability(self, request, pk=None):
-        schedule = self.get_object()
-        available_slots = schedule.slot_count
+        try:
+            available_slots = slots.available_slots(pk)
+        except KeyError:
+            return Response({'message': 'Schedule not found'}, status=404)
         if available_slots > 0:
             return Response({"message": f"Chỗ trống còn lại: {available_slots}"})
         else:
@@ -476,81 +536,149 @@ class InjectionScheduleViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['get'])
     def upcoming_schedules(self, request):
-        upcoming_schedules = models.InjectionSchedule.objects.filter(date__gte=datetime.now())
-        serializer = serializers.InjectionScheduleSerializer(upcoming_schedules, many=True)
-        return Response(serializer.data)
+        today = timezone.now().date()
+        upcoming_schedules = dao.load_schedules().filter(date__gte=today)
+        # Kết quả đổi theo ngày nên ngày hiện tại là một phần của khóa cache
+        return self.cached_response('upcoming-schedules', self.catalogue,
+                                    lambda: self.paginated_response(upcoming_schedules), parts=[today])
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        params = request.query_params
+        try:
+            date_from = datetime.strptime(params['date_from'], '%Y-%m-%d').date() \
+                if params.get('date_from') else date.today()
+            date_to = datetime.strptime(params['date_to'], '%Y-%m-%d').date() if params.get('date_to') else None
+            filters = {field: int(params[name]) for name, field in [
+                ('vaccine', 'vaccine_id'),
+                ('vaccine_type', 'vaccine__vaccine_type_id'),
+                ('site', 'site_id'),
+                ('min_slots', 'slot_count__gte'),
+            ] if params.get(name)}
+        except ValueError:
+            return Response({'error': 'Tham số ngày (YYYY-MM-DD) hoặc mã số không hợp lệ.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        schedules = dao.load_schedules().filter(date__gte=date_from, **filters)
+        if date_to:
+            schedules = schedules.filter(date__lte=date_to)
+
+        q = params.get('q', '').strip()
+        if q:
+            schedules = search.search_schedules(schedules, q)
+        elif params.get('order') == 'desc':
+            # Tra cứu lịch cũ: gần nhất trước
+            schedules = schedules.order_by('-date', '-id')
+        else:
+            schedules = schedules.order_by('date', 'id')
+        return self.paginated_response(schedules, pagination_class=SearchPaginator)
 
 
-class InjectionSiteViewSet(viewsets.ModelViewSet):
+class InjectionSiteViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     queryset = models.InjectionSite.objects.all()
+    pagination_class = CursorPaginator
     serializer_class = serializers.InjectionSiteSerializer
     permission_classes = [IsAdminUser]
+    NEAREST_MAX_DAYS = 90
+    NEAREST_MAX_LIMIT = 50
 
+    def get_permissions(self):
+        if self.action == 'nearest':
+            return [IsAuthenticated()]
+        return super().get_permissions()
 
-base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-key_path = os.path.join(base_dir, 'HeThongTiemChung', 'secure_keys', 'serviceAccountKey.json')
+    def list(self, request, *args, **kwargs):
+        build = super().list
+        return self.conditional_response(self.get_queryset(), lambda: self.cached_response(
+            'sites', [models.InjectionSite], lambda: build(request, *args, **kwargs)))
 
-if not firebase_admin._apps:
-    cred = credentials.Certificate(key_path)
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': 'https://vaccinationapp-cb597-default-rtdb.firebaseio.com'
-    })
+    @action(detail=False, methods=['get'])
+    def nearest(self, request):
+        params = request.query_params
+        try:
+            latitude, longitude = float(params['lat']), float(params['lng'])
+            vaccine_id = int(params['vaccine']) if params.get('vaccine') else None
+            days = min(int(params.get('days', 14)), self.NEAREST_MAX_DAYS)
+            limit = min(int(params.get('limit', 10)), self.NEAREST_MAX_LIMIT)
+        except (KeyError, ValueError):
+            return Response({'error': 'Cần lat, lng hợp lệ; vaccine, days, limit phải là số.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or days < 0 or limit < 1:
+            return Response({'error': 'Tọa độ hoặc tham số ngoài phạm vi.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        today = date.today()
+        sites = dao.load_nearest_sites(latitude, longitude, today, today + timedelta(days=days),
+                                       vaccine_id=vaccine_id, limit=limit)
+        data = []
+        for site in sites:
+            item = self.get_serializer(site).data
+            item['distance_km'] = round(site.distance_km, 2)
+            item['next_date'] = site.next_date
+            data.append(item)
+        return Response(data)
 
 
-@csrf_exempt
-@login_required
-def send_message(request):
-    if request.method == 'POST':
-        try:
-            data = request.POST
-            message_text = data.get('message')
-            user = request.user
-
-            # Lưu tin nhắn vào Firebase
-            ref = db.reference('chats').child(user.id).push()
-            ref.set({
-                'text': message_text,
-                'sender': user.username,
-                'timestamp': db.ServerValue.TIMESTAMP,
-                'is_user': True
-            })
-
-            # Gửi thông báo đến nhân viên (có thể cải tiến bằng Cloud Messaging)
-            staff_ref = db.reference('staff_chats')
-            staff_ref.push({
-                'user_id': user.id,
-                'user_name': user.username,
-                'last_message': message_text,
-                'timestamp': db.ServerValue.TIMESTAMP
-            })
-
-            return JsonResponse({'success': True, 'message': 'Tin nhắn đã được gửi'})
-        except Exception as e:
-            return JsonResponse({'success': False, 'detail': str(e)})
-    return JsonResponse({'success': False, 'detail': 'Phương thức không hợp lệ'})
-
-
-@csrf_exempt
-@login_required
-def get_staff_chats(request):
+def chat_user(request, user_id):
+    """Người dùng chỉ truy cập hội thoại của mình; nhân viên chọn hội thoại bằng `user_id`."""
+    if not (request.user.is_staff and user_id):
+        return request.user
+    try:
+        return User.objects.get(pk=user_id)
+    except (User.DoesNotExist, ValueError):
+        return None
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def chat_messages(request):
+    """
+    GET: lịch sử tin nhắn, mới nhất trước, phân trang theo cursor (chỉ với CHAT_BACKEND='database').
+    POST: người dùng gửi tin nhắn cho nhân viên; nhân viên trả lời bằng cách gửi kèm `user_id` của người dùng.
+    """
     if request.method == 'GET':
-        try:
-            staff_ref = db.reference('staff_chats').order_by_child('timestamp')
-            chats = staff_ref.get()
-            if chats:
-                chat_list = [
-                    {
-                        'user_id': key,
-                        'user_name': value['user_name'],
-                        'last_message': value['last_message'],
-                        'timestamp': value['timestamp']
-                    }
-                    for key, value in chats.items()
-                ]
-                return JsonResponse({'success': True, 'chats': chat_list})
-            return JsonResponse({'success': True, 'chats': []})
-        except Exception as e:
-            return JsonResponse({'success': False, 'detail': str(e)})
+        user = chat_user(request, request.query_params.get('user_id'))
+        if user is None:
+            return Response({'success': False, 'detail': 'Không tìm thấy người dùng'},
+                            status=status.HTTP_404_NOT_FOUND)
+        messages = chat.messages(user.pk)
+        if messages is None:
+            return Response({'success': False, 'detail': 'Lịch sử tin nhắn được lưu trên Firebase'},
+                            status=status.HTTP_404_NOT_FOUND)
+        paginator = ChatMessagePaginator()
+        page = paginator.paginate_queryset(messages, request)
+        return paginator.get_paginated_response(serializers.ChatMessageSerializer(page, many=True).data)
+
+    message_text = (request.data.get('message') or '').strip()
+    if not message_text:
+        return Response({'success': False, 'detail': 'Tin nhắn không được để trống'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    user = chat_user(request, request.data.get('user_id'))
+    if user is None:
+        return Response({'success': False, 'detail': 'Không tìm thấy người dùng'},
+                        status=status.HTTP_404_NOT_FOUND)
+    is_user = user is request.user
+
+    chat.post_message(user, message_text, sender=request.user.username, is_user=is_user)
+    return Response({'success': True, 'message': 'Tin nhắn đã được gửi'})
+
+
+@api_view(['GET'])
+@permission_classes([IsStaffUser])
+def get_staff_chats(request):
+    """Hộp thư nhân viên: mỗi người dùng một dòng, mới nhất trước, phân trang theo cursor."""
+    conversations = chat.inbox(unread_only=request.query_params.get('unread') in ('1', 'true'))
+    paginator = InboxPaginator()
+    page = paginator.paginate_queryset(conversations, request)
+    return paginator.get_paginated_response(serializers.ChatConversationSerializer(page, many=True).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsStaffUser])
+def mark_chat_read(request, user_id):
+    if not chat.mark_read(user_id):
+        return Response({'success': False, 'detail': 'Không tìm thấy hội thoại'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'success': True})
 
 
 APP_FUNCTIONS = {
@@ -583,75 +711,60 @@ APP_FUNCTIONS = {
 
 
 def generate_response(message):
-    message = message.lower().strip()
+    message = chat_cache.normalize(message)
 
-    # Kiểm tra cache
-    cache_key = f"faq_response_{hashlib.md5(message.encode('utf-8')).hexdigest()}"
-    cached_response = cache.get(cache_key)
-    if cached_response:
+    # Kiểm tra cache (lưu nguyên cấu trúc câu trả lời, kể cả khi không tìm thấy)
+    version = chat_cache.version()
+    cached_response = chat_cache.lookup(message, version)
+    if cached_response is not None:
         return cached_response
 
-    try:
-        message_tokens = ViTokenizer.tokenize(message).split()
-
-        for function, info in APP_FUNCTIONS.items():
-            if any(keyword in message for keyword in info["keywords"]):
-                return {
-                    "answer": f"{info['message']} Bạn có muốn chuyển đến màn hình {function.title()} không?",
-                    "navigation": info["screen"],
-                    "suggestions": []  # Không cần gợi ý thêm vì đã có câu trả lời cụ thể
-                }
-
-        faqs = models.Faq.objects.filter(
-            Q(question_keywords__icontains=message_tokens[0]) |
-            Q(question_keywords__icontains=message_tokens[-1] if message_tokens else '')
-        )
-
-        best_match = None
-        best_score = 0
-        for faq in faqs:
-            keywords = ViTokenizer.tokenize(faq.question_keywords.lower()).split()
-            score = sum(1 for keyword in keywords if keyword in message_tokens)
-            if score > best_score:
-                best_score = score
-                best_match = faq.answer
-
-        all_keywords = [keyword for faq in models.Faq.objects.all() for keyword in
-                        ViTokenizer.tokenize(faq.question_keywords.lower()).split()]
-
-        # Tìm gợi ý từ khóa gần đúng cho từng token trong câu hỏi
-        suggestions = set()
-        for token in message_tokens:
-            close_matches = get_close_matches(token, all_keywords, n=3, cutoff=0.5)
-            suggestions.update(close_matches)
-
-        # Nếu không có gợi ý từ khóa, tìm gợi ý câu hỏi gần đúng
-        if not suggestions:
-            all_questions = [faq.question_keywords.lower() for faq in models.Faq.objects.all()]
-            close_questions = get_close_matches(message, all_questions, n=3, cutoff=0.5)
-            suggestions.update(close_questions)
-
-        if not best_match:
-            if suggestions:
-                return {
-                    "message": "Xin lỗi, tôi không hiểu câu hỏi của bạn.",
-                    "suggestions": list(suggestions)[:3]  # Giới hạn 3 gợi ý
-                }
-            else:
-                return "Xin lỗi, tôi không hiểu câu hỏi của bạn. Vui lòng thử lại với câu hỏi khác."
-
-        cache.set(cache_key, best_match, timeout=3600)
-
-        # Trả về câu trả lời và gợi ý (nếu có)
+    # Lỗi được để ai_chat_free_api trả về mã lỗi, không lưu vào cache như một câu trả lời
+    response = build_response(message)
+    chat_cache.store(message, response, version)
+    return response
+
+
+def build_response(message):
+    message_tokens = tokenizer.tokenize(message)
+
+    for function, info in APP_FUNCTIONS.items():
+        if any(keyword in message for keyword in info["keywords"]):
+            return {
+                "answer": f"{info['message']} Bạn có muốn chuyển đến màn hình {function.title()} không?",
+                "navigation": info["screen"],
+                "suggestions": []  # Không cần gợi ý thêm vì đã có câu trả lời cụ thể
+            }
+
+    index = faq_index.get_index()
+    best_match = index.best_match(message_tokens)
+
+    # Tìm gợi ý từ khóa gần đúng cho từng token trong câu hỏi
+    suggestions = set()
+    for token in message_tokens:
+        suggestions.update(index.suggest_keywords(token))
+
+    # Nếu không có gợi ý từ khóa, tìm gợi ý câu hỏi gần đúng
+    if not suggestions:
+        suggestions.update(index.suggest_questions(message))
+
+    if not best_match:
+        if suggestions:
+            return {
+                "message": "Xin lỗi, tôi không hiểu câu hỏi của bạn.",
+                "suggestions": list(suggestions)[:3]  # Giới hạn 3 gợi ý
+            }
         return {
-            "answer": best_match,
-            "suggestions": list(suggestions)[:3] if suggestions else [],
-            "navigation": None  # Không có chuyển hướng nếu là câu hỏi FAQ
+            "message": "Xin lỗi, tôi không hiểu câu hỏi của bạn. Vui lòng thử lại với câu hỏi khác.",
+            "suggestions": []
         }
 
-    except Exception as e:
-        print(f"Error in generate_response: {e}")
-        return "Câu hỏi không hợp lệ. Vui lòng thử lại với câu hỏi khác."
+    # Trả về câu trả lời và gợi ý (nếu có)
+    return {
+        "answer": best_match,
+        "suggestions": list(suggestions)[:3] if suggestions else [],
+        "navigation": None  # Không có chuyển hướng nếu là câu hỏi FAQ
+    }
 
 
 @api_view(['POST'])
@@ -666,18 +779,9 @@ def ai_chat_free_api(request):
     try:
         response = generate_response(message)
 
-        if isinstance(response, dict) and "message" in response:
-            # Lưu câu hỏi không có câu trả lời vào UnansweredQuestion
-            models.UnansweredQuestion.objects.create(
-                question=message,
-                user=request.user
-            )
-            # Lưu vào QueryLog
-            models.QueryLog.objects.create(
-                user=request.user,
-                question=message,
-                answer=response['message']
-            )
+        if "message" in response:
+            # Lưu câu hỏi không có câu trả lời vào UnansweredQuestion và QueryLog
+            chat_log.log_query(request.user, message, response['message'], unanswered=True)
             return Response({
                 'message': response['message'],
                 'suggestions': response['suggestions'],
@@ -685,74 +789,93 @@ def ai_chat_free_api(request):
                 'navigation': None
             }, status=status.HTTP_200_OK)
 
-        if isinstance(response, dict) and "answer" in response:
-            # Lưu vào QueryLog
-            models.QueryLog.objects.create(
-                user=request.user,
-                question=message,
-                answer=response['answer']
-            )
-            return Response({
-                'user_message': message,
-                'ai_response': response['answer'],
-                'suggestions': response['suggestions'],
-                'navigation': response.get('navigation', None),
-                'success': True
-            }, status=status.HTTP_200_OK)
-
-        # Nếu không có câu trả lời, lưu câu hỏi vào UnansweredQuestion
-        if response == "Xin lỗi, tôi không hiểu câu hỏi của bạn. Vui lòng thử lại với câu hỏi khác.":
-            models.UnansweredQuestion.objects.create(
-                question=message,
-                user=request.user
-            )
-
         # Lưu vào QueryLog
-        models.QueryLog.objects.create(
-            user=request.user,
-            question=message,
-            answer=response
-        )
-
+        chat_log.log_query(request.user, message, response['answer'])
         return Response({
             'user_message': message,
-            'ai_response': response,
-            'suggestions': [],
-            'navigation': None,
+            'ai_response': response['answer'],
+            'suggestions': response['suggestions'],
+            'navigation': response.get('navigation', None),
             'success': True
         }, status=status.HTTP_200_OK)
 
     except Exception as e:
         print(f"Error in ai_chat_free_api: {e}")
         # Lưu vào QueryLog cho trường hợp lỗi
-        models.QueryLog.objects.create(
-            user=request.user,
-            question=message if 'message' in locals() else "Không xác định",
-            answer="Câu hỏi không hợp lệ. Vui lòng thử lại với câu hỏi khác."
-        )
+        chat_log.log_query(request.user, message if 'message' in locals() else "Không xác định",
+                           "Câu hỏi không hợp lệ. Vui lòng thử lại với câu hỏi khác.")
         return Response({
             'detail': 'Câu hỏi không hợp lệ. Vui lòng thử lại với câu hỏi khác.',
             'success': False,
             'navigation': None
-        }, status=status.HTTP_200_OK)
+        }, status=status.HTTP_400_BAD_REQUEST)
 
 
 class StatsAPIView(APIView):
     def get(self, request):
-        total_vaccinated = VaccinationRecord.objects.values('user').distinct().count()
-        total_appointments = Appointment.objects.count()
-        completed_appointments = Appointment.objects.filter(is_inoculated=True).count()
-        completion_rate = (completed_appointments / total_appointments) if total_appointments > 0 else 0
-        popular_vaccines_qs = VaccinationRecord.objects.values('vaccine__name') \
-                                  .annotate(count=Count('id')) \
-                                  .order_by('-count')[:3]
-        popular_vaccines = [
-            {"name": item['vaccine__name'], "count": item['count']}
-            for item in popular_vaccines_qs
-        ]
-        data = {
-            "total_vaccinated": total_vaccinated,
-            "completion_rate": round(completion_rate * 100, 2),
-            "popular_vaccines": popular_vaccines,
-        }
-        return Response(data)
+        # Đọc từ bộ đếm được cập nhật dần qua signal thay vì quét VaccinationRecord / Appointment
+        return Response(stats.snapshot())
+
+
+class RollupStatsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+    MAX_DAYS = 730
+
+    def get(self, request):
+        group_by = request.query_params.get('group_by', 'date')
+        if group_by not in rollups.GROUPS:
+            return Response({'error': f"group_by phải là một trong: {', '.join(rollups.GROUPS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            days = int(request.query_params.get('days', 90))
+            site = int(request.query_params['site']) if request.query_params.get('site') else None
+            vaccine = int(request.query_params['vaccine']) if request.query_params.get('vaccine') else None
+        except ValueError:
+            return Response({'error': 'Tham số days, site, vaccine phải là số.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days <= self.MAX_DAYS:
+            return Response({'error': f'days phải trong khoảng 1-{self.MAX_DAYS}.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        date_to = date.today()
+        date_from = date_to - timedelta(days=days - 1)
+        results = []
+        for row in rollups.query(date_from, date_to, group_by, site=site, vaccine=vaccine):
+            if group_by == 'date':
+                item = {'date': row['date']}
+            else:
+                item = {'id': row[group_by], 'name': row[f'{group_by}__name']}
+            item.update({measure: row[measure] for measure in rollups.MEASURES})
+            results.append(item)
+
+        return Response({
+            'from': date_from,
+            'to': date_to,
+            'group_by': group_by,
+            'last_built': rollups.last_run(),
+            'results': results,
+        })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def ai_chat_cache_stats(request):
+    return Response(chat_cache.stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def response_cache_stats(request):
+    return Response(response_cache.stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_changes(request):
+    """
+    Đồng bộ gia tăng cho app: lịch hẹn, hồ sơ tiêm của người dùng và lịch tiêm thay đổi sau `since`.
+    Gọi lại với `cursor` trả về cho tới khi has_more = false; reset = true nghĩa là app phải thay toàn bộ dữ liệu.
+    """
+    try:
+        data = sync.changes(request.user, request.query_params.get('since') or None, {'request': request})
+    except sync.InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(data)
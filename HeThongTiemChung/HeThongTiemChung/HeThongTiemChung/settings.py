@@ -204,3 +204,57 @@ CACHES = {
         'LOCATION': 'redis://127.0.0.1:6379/1',
     }
 }
+
+# Chế độ giữ chỗ lịch tiêm: 'db' trừ slot_count trực tiếp bằng UPDATE có điều kiện,
+# 'redis' giữ số chỗ trong các bộ đếm phân mảnh của CACHES và để reconcile_slots ghi lại vào DB
+SLOT_RESERVATION_MODE = 'db'
+SLOT_COUNTER_CACHE = 'default'
+SLOT_COUNTER_SHARDS = 8
+
+# Thời gian lưu cache câu trả lời ai-chat (giây); câu hỏi không có câu trả lời lưu ngắn hơn
+CHAT_RESPONSE_CACHE_TTL = 3600
+CHAT_NEGATIVE_CACHE_TTL = 300
+
+# Ghi QueryLog / UnansweredQuestion theo lô ở nền thay vì INSERT trong request ai-chat
+CHAT_LOG_BUFFERED = True
+CHAT_LOG_BATCH_SIZE = 100
+CHAT_LOG_FLUSH_INTERVAL = 2.0
+
+# Hàng đợi thông báo e-mail: luồng gửi nền trong tiến trình web (hoặc chạy run_notifications --loop)
+NOTIFICATION_LOCAL_WORKER = True
+NOTIFICATION_POLL_INTERVAL = 30.0
+NOTIFICATION_MAX_ATTEMPTS = 5
+
+# Thư mục cache giấy chứng nhận PDF (theo mã băm nội dung), không nằm trong MEDIA_ROOT
+CERTIFICATE_CACHE_DIR = BASE_DIR / 'cache' / 'certificates'
+
+# Tìm kiếm vaccine / lịch tiêm: 'auto' dùng FULLTEXT trên MySQL, chỉ mục trong bộ nhớ với CSDL khác
+SEARCH_BACKEND = 'auto'
+SEARCH_MAX_MATCHES = 500
+
+# Cache dữ liệu response của danh mục theo phiên bản model (khóa hết hiệu lực khi model đổi, TTL chỉ để dọn bộ nhớ)
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 86400
+RESPONSE_CACHE_LOCK_TIMEOUT = 10
+RESPONSE_CACHE_WAIT = 2.0
+
+# API sync cho app: số dòng tối đa mỗi loại mỗi lần gọi, độ lùi cursor (giây) cho transaction commit muộn,
+# số ngày giữ dấu vết bản ghi đã xóa (cursor cũ hơn phải đồng bộ lại từ đầu)
+SYNC_PAGE_SIZE = 500
+SYNC_CURSOR_SKEW = 5
+SYNC_TOMBSTONE_DAYS = 30
+
+# Nơi ghi tin nhắn chat: 'firebase' (app đang nghe realtime), 'database' (bảng ChatMessage),
+# 'memory' (kiểm thử) hoặc None để tắt. Firebase chỉ khởi tạo ở lần ghi đầu, các lần ghi được gom theo lô
+CHAT_BACKEND = 'firebase'
+CHAT_BACKEND_BATCH_SIZE = 100
+CHAT_BACKEND_FLUSH_INTERVAL = 0.5
+FIREBASE_CREDENTIALS = BASE_DIR / 'secure_keys' / 'serviceAccountKey.json'
+FIREBASE_DATABASE_URL = 'https://vaccinationapp-cb597-default-rtdb.firebaseio.com'
+FIREBASE_HTTP_TIMEOUT = 10
+
+# Ngân sách thời gian import khi worker khởi động (manage.py import_profile), tính bằng mili giây
+IMPORT_TIME_BUDGET_MS = 1000
+
+# Số chuỗi đã tách từ (pyvi) giữ trong cache LRU của mỗi tiến trình
+TOKENIZER_CACHE_SIZE = 10000
@@ -3,22 +3,19 @@ import { View, Text, FlatList, TouchableOpacity, StatusBar, StyleSheet, Activity
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import AsyncStorage from "@react-native-async-storage/async-storage";
 import { authApis, endpoints } from "../../configs/Apis";
+import usePagedList from "../../configs/usePagedList";
 import { Searchbar } from "react-native-paper";
 import { Alert } from "react-native";
 
 const AccountManagement = ({ navigation, route }) => {
-  const [users, setUsers] = useState([]);
-  const [filteredUsers, setFilteredUsers] = useState([]);
-  const [loading, setLoading] = useState(false);
+  const { items: users, loading, loadingMore, load, loadMore } = usePagedList();
   const [q, setQ] = useState("");
-  const [page, setPage] = useState(1);
-  const [isLoadingMore, setIsLoadingMore] = useState(false);
-  const itemsPerPage = 4;
 
+  // Tìm theo tên tài khoản / họ tên phía server (sắp theo username), chờ ngừng gõ rồi mới tải lại
   useEffect(() => {
-    console.log("Initial fetchUsers on mount");
-    fetchUsers();
-  }, []);
+    const timer = setTimeout(() => fetchUsers(), 300);
+    return () => clearTimeout(timer);
+  }, [q]);
 
   // Kiểm tra tham số refresh từ route.params
   useEffect(() => {
@@ -33,67 +30,15 @@ const AccountManagement = ({ navigation, route }) => {
 
   const fetchUsers = async () => {
     try {
-      setLoading(true);
-      const token = await AsyncStorage.getItem("token");
-      if (!token) throw new Error("Token không tồn tại.");
-
-      const response = await authApis(token).get(endpoints["user"]());
-      console.log("Users API response:", JSON.stringify(response.data, null, 2));
-
-      // Sắp xếp danh sách theo username (A-Z)
-      const sortedUsers = response.data.sort((a, b) =>
-        (a.username || "").localeCompare(b.username || "")
-      );
-      setUsers(sortedUsers);
-      filterUsers(sortedUsers, q, 1);
+      const query = q.trim();
+      await load(endpoints["user"](), query ? { q: query } : {});
     } catch (error) {
       console.error("Lỗi khi tải danh sách tài khoản:", error.response?.data || error.message);
       Alert.alert(
         "Lỗi",
         error.response?.data?.detail || "Không thể tải danh sách tài khoản. Vui lòng kiểm tra quyền truy cập."
       );
-      setUsers([]);
-      setFilteredUsers([]);
-    } finally {
-      setLoading(false);
-    }
-  };
-
-  const filterUsers = (data, searchQuery, pageNum) => {
-    let filtered = [...data];
-
-    if (searchQuery) {
-      filtered = filtered.filter(
-        (user) =>
-          (user.username || "").toLowerCase().includes(searchQuery.toLowerCase()) ||
-          (user.first_name || "").toLowerCase().includes(searchQuery.toLowerCase()) ||
-          (user.last_name || "").toLowerCase().includes(searchQuery.toLowerCase())
-      );
     }
-
-    const startIndex = (pageNum - 1) * itemsPerPage;
-    const endIndex = startIndex + itemsPerPage;
-    const paginatedUsers = filtered.slice(startIndex, endIndex);
-
-    setFilteredUsers((prev) =>
-      pageNum === 1 ? paginatedUsers : [...prev, ...paginatedUsers]
-    );
-  };
-
-  const loadMoreUsers = () => {
-    if (isLoadingMore || filteredUsers.length >= users.length) return;
-
-    setIsLoadingMore(true);
-    const nextPage = page + 1;
-    filterUsers(users, q, nextPage);
-    setPage(nextPage);
-    setIsLoadingMore(false);
-  };
-
-  const search = (value) => {
-    setQ(value);
-    setPage(1);
-    filterUsers(users, value, 1);
   };
 
   const handleDelete = (userId) => {
@@ -175,7 +120,7 @@ const AccountManagement = ({ navigation, route }) => {
       <View style={styles.searchContainer}>
         <Searchbar
           placeholder="Nhập tên tài khoản / tên người dùng"
-          onChangeText={search}
+          onChangeText={setQ}
           value={q}
           style={styles.searchbar}
           inputStyle={styles.searchbarInput}
@@ -188,7 +133,7 @@ const AccountManagement = ({ navigation, route }) => {
       ) : (
         <View style={styles.contentContainer}>
           <FlatList
-            data={filteredUsers}
+            data={users}
             renderItem={renderUser}
             keyExtractor={(item) => (item.id ? item.id.toString() : Math.random().toString())}
             ListEmptyComponent={
@@ -197,10 +142,10 @@ const AccountManagement = ({ navigation, route }) => {
               </Text>
             }
             contentContainerStyle={styles.listContainer}
-            onEndReached={loadMoreUsers}
+            onEndReached={loadMore}
             onEndReachedThreshold={0.5}
             ListFooterComponent={
-              isLoadingMore ? (
+              loadingMore ? (
                 <ActivityIndicator size="small" color="#0c5776" style={styles.loader} />
               ) : null
             }
@@ -3,7 +3,7 @@ import { View, Text, TextInput, ScrollView, TouchableOpacity, StatusBar, StyleSh
 import { Picker } from "@react-native-picker/picker";
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import AsyncStorage from "@react-native-async-storage/async-storage";
-import { authApis, endpoints } from "../../configs/Apis";
+import { authApis, endpoints, fetchAll } from "../../configs/Apis";
 
 const vietnameseMonths = ["Tháng 1", "Tháng 2", "Tháng 3", "Tháng 4", "Tháng 5", "Tháng 6", "Tháng 7",
 "Tháng 8", "Tháng 9", "Tháng 10", "Tháng 11", "Tháng 12" ];
@@ -64,7 +64,7 @@ const AddVaccine = ({ navigation }) => {
         const token = await AsyncStorage.getItem("token");
         console.log("Fetching vaccine types with token:", token ? token.substring(0, 10) + "..." : "Missing");
         console.log("Endpoint:", endpoints.vaccineTypes());
-        const response = await authApis(token).get(endpoints.vaccineTypes());
+        const response = await fetchAll(authApis(token), endpoints.vaccineTypes());
         console.log("VaccineTypes API response:", JSON.stringify(response.data, null, 2));
         let data = Array.isArray(response.data) ? response.data : response.data.results || [];
         if (Array.isArray(data)) {
@@ -177,7 +177,8 @@ const AddVaccine = ({ navigation }) => {
       console.log("Submit payload:", JSON.stringify(payload, null, 2));
       await authApis(token).post(endpoints.vaccines(), payload);
 
-      const updatedVaccinesResponse = await authApis(token).get(
+      const updatedVaccinesResponse = await fetchAll(
+        authApis(token),
         endpoints.vaccines()
       );
       const updatedVaccines = updatedVaccinesResponse.data;
@@ -2,15 +2,14 @@ import React, { useState, useEffect } from "react";
 import { View, Text, FlatList, TouchableOpacity, StatusBar, StyleSheet, ActivityIndicator, Alert, Modal, TextInput } from "react-native";
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import AsyncStorage from "@react-native-async-storage/async-storage";
-import { authApis, endpoints } from "../../configs/Apis";
+import { authApis, endpoints, fetchAll, pastSchedulesParams } from "../../configs/Apis";
+import usePagedList from "../../configs/usePagedList";
 import { Switch } from "react-native";
 
 const InjectionManagement = ({ navigation }) => {
-  const [schedules, setSchedules] = useState([]);
-  const [displayedSchedules, setDisplayedSchedules] = useState([]);
+  const { items: schedules, loading, loadingMore, load, loadMore } = usePagedList();
   const [vaccines, setVaccines] = useState([]);
   const [sites, setSites] = useState([]);
-  const [loading, setLoading] = useState(false);
   const [modalVisible, setModalVisible] = useState(false);
   const [siteModalVisible, setSiteModalVisible] = useState(false);
   const [isEditing, setIsEditing] = useState(false);
@@ -30,39 +29,24 @@ const InjectionManagement = ({ navigation }) => {
   });
   const [originalSchedule, setOriginalSchedule] = useState(null);
   const [currentSite, setCurrentSite] = useState({ id: null, name: "", address: "", phone: "" });
-  const [page, setPage] = useState(1);
-  const pageSize = 4;
-
   const currentDate = new Date();
 
   useEffect(() => {
-    fetchSchedules();
     fetchVaccines();
     fetchSites();
   }, []);
 
+  useEffect(() => {
+    fetchSchedules();
+  }, [showPastSchedules]);
+
+  // Đợt tiêm sắp tới (theo ngày tăng dần) hoặc đợt cũ (gần nhất trước), tải từng trang
   const fetchSchedules = async () => {
     try {
-      setLoading(true);
-      const token = await AsyncStorage.getItem("token");
-      if (!token) throw new Error("Token không tồn tại.");
-
-      const scheduleEndpoint = endpoints["schedules"]();
-      if (typeof scheduleEndpoint !== "string") {
-        throw new Error("Endpoint 'schedules' không trả về chuỗi hợp lệ.");
-      }
-
-      const response = await authApis(token).get(scheduleEndpoint);
-      console.log("Schedules API response:", JSON.stringify(response.data, null, 2));
-      const sortedSchedules = response.data.sort((a, b) => new Date(a.date) - new Date(b.date));
-      setSchedules(sortedSchedules);
-      setDisplayedSchedules(sortedSchedules.slice(0, pageSize)); // Hiển thị trang đầu tiên
-      setPage(1);
+      await load(endpoints["searchSchedules"], showPastSchedules ? pastSchedulesParams() : {});
     } catch (error) {
       console.error("Error fetching schedules:", error.message || error);
       Alert.alert("Lỗi", "Không thể tải danh sách đợt tiêm. Vui lòng kiểm tra kết nối hoặc cấu hình API.");
-    } finally {
-      setLoading(false);
     }
   };
 
@@ -70,7 +54,7 @@ const InjectionManagement = ({ navigation }) => {
     try {
       const token = await AsyncStorage.getItem("token");
       if (!token) throw new Error("Token không tồn tại.");
-      const response = await authApis(token).get(endpoints["vaccines"]());
+      const response = await fetchAll(authApis(token), endpoints["vaccines"]());
       console.log("Vaccines API response:", JSON.stringify(response.data, null, 2));
       setVaccines(response.data);
     } catch (error) {
@@ -83,7 +67,7 @@ const InjectionManagement = ({ navigation }) => {
     try {
       const token = await AsyncStorage.getItem("token");
       if (!token) throw new Error("Token không tồn tại.");
-      const response = await authApis(token).get(endpoints["sites"]());
+      const response = await fetchAll(authApis(token), endpoints["sites"]());
       console.log("Sites API response:", JSON.stringify(response.data, null, 2));
       const uniqueSites = response.data.map((site, index) => ({
         id: site.id || index + 1,
@@ -98,18 +82,6 @@ const InjectionManagement = ({ navigation }) => {
     }
   };
 
-  const loadMoreSchedules = () => {
-    if (displayedSchedules.length >= schedules.length) return;
-
-    const nextPage = page + 1;
-    const newSchedules = schedules.slice(0, nextPage * pageSize);
-    setDisplayedSchedules(newSchedules);
-    setPage(nextPage);
-
-    console.log("loadMoreSchedules - New page:", nextPage);
-    console.log("loadMoreSchedules - New displayed schedules:", newSchedules.length);
-  };
-
   const openModal = (schedule = null) => {
     if (schedule) {
       setIsEditing(true);
@@ -453,7 +425,7 @@ const InjectionManagement = ({ navigation }) => {
     : "--/--/----";
 
   const renderFooter = () => {
-    if (displayedSchedules.length >= schedules.length) return null;
+    if (!loadingMore) return null;
     return (
       <View style={styles.footerLoader}>
         <ActivityIndicator size="small" color="#0c5776" />
@@ -502,9 +474,7 @@ const InjectionManagement = ({ navigation }) => {
       ) : (
         <View style={styles.contentContainer}>
           <FlatList
-            data={displayedSchedules.filter((item) =>
-              showPastSchedules ? new Date(item.date) < currentDate : new Date(item.date) >= currentDate
-            )}
+            data={schedules}
             renderItem={renderItem}
             keyExtractor={(item) => item.id.toString()}
             ListEmptyComponent={
@@ -513,7 +483,7 @@ const InjectionManagement = ({ navigation }) => {
               </Text>
             }
             contentContainerStyle={styles.listContainer}
-            onEndReached={loadMoreSchedules}
+            onEndReached={loadMore}
             onEndReachedThreshold={0.5}
             ListFooterComponent={renderFooter}
           />
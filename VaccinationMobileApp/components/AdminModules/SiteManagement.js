@@ -2,7 +2,7 @@ import React, { useState, useEffect } from "react";
 import { View, Text, FlatList, TouchableOpacity, StatusBar, TextInput, Modal, ActivityIndicator, Alert, StyleSheet } from "react-native";
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import AsyncStorage from "@react-native-async-storage/async-storage";
-import { authApis, endpoints } from "../../configs/Apis";
+import { authApis, endpoints, fetchAll } from "../../configs/Apis";
 
 const SiteManagement = ({ navigation }) => {
   const [sites, setSites] = useState([]);
@@ -25,7 +25,7 @@ const SiteManagement = ({ navigation }) => {
       setLoading(true);
       const token = await AsyncStorage.getItem("token");
       console.log("Fetching sites from:", endpoints.sites());
-      const response = await authApis(token).get(endpoints.sites());
+      const response = await fetchAll(authApis(token), endpoints.sites());
       console.log("Sites API response:", response.data);
       const sortedSites = response.data.sort((a, b) =>
         a.name.localeCompare(b.name)
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from "react";
 import { View, Text, FlatList, TouchableOpacity, StatusBar, TextInput, Modal, ActivityIndicator, Alert, StyleSheet } from "react-native";
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import AsyncStorage from "@react-native-async-storage/async-storage";
-import { authApis, endpoints } from "../../configs/Apis";
+import { authApis, endpoints, fetchAll } from "../../configs/Apis";
 
 const TypeManagement = ({ navigation }) => {
   const [vaccineTypes, setVaccineTypes] = useState([]);
@@ -26,7 +26,7 @@ const TypeManagement = ({ navigation }) => {
       setLoading(true);
       const token = await AsyncStorage.getItem("token");
       console.log("Fetching vaccine types from:", endpoints.vaccineTypes());
-      const response = await authApis(token).get(endpoints.vaccineTypes());
+      const response = await fetchAll(authApis(token), endpoints.vaccineTypes());
       console.log("VaccineTypes API response:", response.data);
       const sortedTypes = response.data.sort((a, b) =>
         a.name.localeCompare(b.name)
@@ -3,7 +3,7 @@ import { View, Text, TextInput, ScrollView, TouchableOpacity, StatusBar, StyleSh
 import { Picker } from "@react-native-picker/picker";
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import AsyncStorage from "@react-native-async-storage/async-storage";
-import { authApis, endpoints } from "../../configs/Apis";
+import { authApis, endpoints, fetchAll } from "../../configs/Apis";
 
 const vietnameseMonths = [ "Tháng 1", "Tháng 2", "Tháng 3", "Tháng 4", "Tháng 5", "Tháng 6", 
   "Tháng 7", "Tháng 8", "Tháng 9", "Tháng 10", "Tháng 11", "Tháng 12"];
@@ -61,7 +61,7 @@ const UpdateVaccine = ({ navigation, route }) => {
     const fetchVaccineTypes = async () => {
       try {
         const token = await AsyncStorage.getItem("token");
-        const response = await authApis(token).get(endpoints.vaccineTypes());
+        const response = await fetchAll(authApis(token), endpoints.vaccineTypes());
         let data = Array.isArray(response.data)
           ? response.data
           : response.data.results || [];
@@ -210,7 +210,8 @@ const UpdateVaccine = ({ navigation, route }) => {
       console.log("Submit payload:", payload);
       await authApis(token).patch(endpoints.vaccines(vaccineId), payload);
 
-      const updatedVaccinesResponse = await authApis(token).get(
+      const updatedVaccinesResponse = await fetchAll(
+        authApis(token),
         endpoints.vaccines()
       );
       const updatedVaccines = updatedVaccinesResponse.data;
@@ -252,7 +253,8 @@ const UpdateVaccine = ({ navigation, route }) => {
             const { vaccineId } = route.params;
             await authApis(token).delete(endpoints.vaccines(vaccineId));
 
-            const updatedVaccinesResponse = await authApis(token).get(
+            const updatedVaccinesResponse = await fetchAll(
+              authApis(token),
               endpoints.vaccines()
             );
             const updatedVaccines = updatedVaccinesResponse.data;
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from "react";
 import { View, Text, FlatList, TouchableOpacity, StatusBar, StyleSheet, ActivityIndicator, TextInput, Modal } from "react-native";
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import AsyncStorage from "@react-native-async-storage/async-storage";
-import { authApis, endpoints } from "../../configs/Apis";
+import { authApis, endpoints, fetchAll } from "../../configs/Apis";
 import { Picker } from "@react-native-picker/picker";
 
 const VaccineManagement = ({ navigation, route }) => {
@@ -34,7 +34,7 @@ const VaccineManagement = ({ navigation, route }) => {
   const fetchVaccineTypes = async () => {
     try {
       const token = await AsyncStorage.getItem("token");
-      const response = await authApis(token).get(endpoints.vaccineTypes());
+      const response = await fetchAll(authApis(token), endpoints.vaccineTypes());
       let data = Array.isArray(response.data)
         ? response.data
         : response.data.results || [];
@@ -58,7 +58,7 @@ const VaccineManagement = ({ navigation, route }) => {
     try {
       setLoading(true);
       const token = await AsyncStorage.getItem("token");
-      const response = await authApis(token).get(endpoints.vaccines());
+      const response = await fetchAll(authApis(token), endpoints.vaccines());
       const sortedVaccines = response.data.sort((a, b) =>
         a.name.localeCompare(b.name)
       );
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from "react";
 import { View, Text, FlatList, TouchableOpacity, StatusBar, StyleSheet, ActivityIndicator, Alert } from "react-native";
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import AsyncStorage from "@react-native-async-storage/async-storage";
-import { authApis, endpoints } from "../../configs/Apis";
+import { authApis, endpoints, fetchAll } from "../../configs/Apis";
 
 const BookingAppointment = ({ navigation }) => {
   const [schedules, setSchedules] = useState([]);
@@ -28,7 +28,7 @@ const BookingAppointment = ({ navigation }) => {
       const token = await AsyncStorage.getItem("token");
       if (!token) throw new Error("Token không tồn tại.");
       console.log("Fetching schedules with token:", token.substring(0, 10) + "...");
-      const response = await authApis(token).get(endpoints["upcomingSchedules"]);
+      const response = await fetchAll(authApis(token), endpoints["upcomingSchedules"]);
       console.log("Schedules API response:", JSON.stringify(response.data, null, 2));
       const sortedSchedules = response.data
         .filter((item) => item.date && new Date(item.date) >= currentDate)
@@ -54,7 +54,7 @@ const BookingAppointment = ({ navigation }) => {
       if (!token) throw new Error("Token không tồn tại.");
       console.log("Fetching appointments with token:", token.substring(0, 10) + "...");
       console.log("Appointment endpoint:", endpoints.appointment());
-      const response = await authApis(token).get(endpoints.appointment());
+      const response = await fetchAll(authApis(token), endpoints.appointment());
       console.log("Appointments API response:", JSON.stringify(response.data, null, 2));
       if (!Array.isArray(response.data)) {
         console.warn("Appointments data is not an array:", response.data);
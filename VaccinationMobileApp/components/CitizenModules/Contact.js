@@ -3,7 +3,7 @@ import { View, Text, TextInput, TouchableOpacity, FlatList, StyleSheet, Keyboard
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import AsyncStorage from "@react-native-async-storage/async-storage";
 import { authApis, endpoints } from "../../configs/Apis";
-import { database, ref, onValue, push, set, update } from "../../components/Home/firebase";
+import { database, ref, onValue } from "../../components/Home/firebase";
 
 console.log("Database instance:", database);
 
@@ -92,56 +92,12 @@ const Contact = ({ navigation }) => {
     if (!trimmedText) return;
 
     try {
-      const userData = await fetchCurrentUser(); // Lấy lại userData để đảm bảo thông tin hiện tại
-      if (!userData || !userData.id || !userData.username) {
-        console.error("Không tìm thấy thông tin người dùng khi gửi tin nhắn.");
-        return;
-      }
-
-      const userId = userData.id;
-      const username = userData.username;
-
       setInputText("");
       setIsTyping(true);
 
-      const userMessage = {
-        text: trimmedText,
-        sender: username,
-        timestamp: Date.now(),
-        is_user: true,
-      };
-
-      const newMessageRef = ref(database, `chats/${userId}`);
-      const newMessageKey = push(newMessageRef);
-      await set(newMessageKey, userMessage);
-
-      const staffChatRef = ref(database, "staff_chats");
-      const queryRef = ref(database, `staff_chats`);
-      onValue(queryRef, async (snapshot) => {
-        const data = snapshot.val();
-        let found = false;
-        if (data) {
-          for (const chatId in data) {
-            if (data[chatId].user_id === userId) {
-              await update(ref(database, `staff_chats/${chatId}`), {
-                last_message: trimmedText,
-                timestamp: Date.now(),
-              });
-              found = true;
-              break;
-            }
-          }
-        }
-        if (!found) {
-          const newStaffChatRef = push(staffChatRef);
-          await set(newStaffChatRef, {
-            user_id: userId,
-            user_name: username,
-            last_message: trimmedText,
-            timestamp: Date.now(),
-          });
-        }
-      }, { onlyOnce: true });
+      // Server lưu tin nhắn, cập nhật hộp thư nhân viên rồi đẩy sang Firebase; app chỉ nghe chats/{userId}
+      const token = await AsyncStorage.getItem("token");
+      await authApis(token).post(endpoints.chatMessages, { message: trimmedText });
 
       setIsTyping(false);
       scrollToBottom();
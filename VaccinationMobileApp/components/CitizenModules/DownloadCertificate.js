@@ -3,6 +3,7 @@ import { View, Text, FlatList, TouchableOpacity, StatusBar, StyleSheet, Activity
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import AsyncStorage from "@react-native-async-storage/async-storage";
 import { authApis, endpoints } from "../../configs/Apis";
+import usePagedList from "../../configs/usePagedList";
 import * as FileSystem from "expo-file-system";
 import * as Sharing from "expo-sharing";
 import { Searchbar } from "react-native-paper";
@@ -24,86 +25,37 @@ const vietnameseMonths = [
 ];
 
 const DownloadCertificate = ({ navigation }) => {
-  const [vaccinationRecords, setVaccinationRecords] = useState([]);
-  const [filteredRecords, setFilteredRecords] = useState([]);
-  const [loading, setLoading] = useState(false);
+  const { items: vaccinationRecords, loading, loadingMore, load, loadMore } = usePagedList();
   const [downloadingId, setDownloadingId] = useState(null);
   const [filterMonth, setFilterMonth] = useState("");
   const [filterYear, setFilterYear] = useState("");
+  const [filter, setFilter] = useState({ month: "", year: "" }); // Bộ lọc đang áp dụng
   const [isFilterVisible, setIsFilterVisible] = useState(false);
-  const [page, setPage] = useState(1);
-  const [isLoadingMore, setIsLoadingMore] = useState(false);
-  const itemsPerPage = 4;
   const [q, setQ] = useState("");
 
   const months = Array.from({ length: 12 }, (_, i) => (i + 1).toString().padStart(2, "0"));
   const currentYear = new Date().getFullYear();
   const years = Array.from({ length: currentYear - 1900 + 1 }, (_, i) => (currentYear - i).toString());
 
+  // Server lọc theo tên / loại vaccine, tháng, năm và trả về ngày tiêm gần nhất trước
   useEffect(() => {
-    fetchVaccinationRecords();
-  }, []);
+    const timer = setTimeout(() => fetchVaccinationRecords(), 300);
+    return () => clearTimeout(timer);
+  }, [q, filter]);
 
   const fetchVaccinationRecords = async () => {
+    const params = {};
+    if (q.trim()) params.q = q.trim();
+    if (filter.month) params.month = filter.month;
+    if (filter.year) params.year = filter.year;
     try {
-      setLoading(true);
-      const token = await AsyncStorage.getItem("token");
-      const response = await authApis(token).get(endpoints["recordSearch"]);
-      const sortedRecords = response.data.sort(
-        (a, b) => new Date(b.injection_date) - new Date(a.injection_date)
-      );
-      setVaccinationRecords(sortedRecords);
-      filterRecords(sortedRecords, q, filterMonth, filterYear, 1);
+      await load(endpoints["recordSearch"], params);
     } catch (error) {
       console.error("Error fetching vaccination records:", error);
       Alert.alert("Lỗi", "Không thể tải danh sách tiêm chủng.");
-    } finally {
-      setLoading(false);
     }
   };
 
-  const filterRecords = (records, searchQuery, month, year, pageNum) => {
-    let filtered = records;
-
-    if (month || year) {
-      filtered = filtered.filter((record) => {
-        const recordDate = new Date(record.injection_date);
-        const recordMonth = (recordDate.getMonth() + 1).toString().padStart(2, "0");
-        const recordYear = recordDate.getFullYear().toString();
-        return (
-          (!month || recordMonth === month) &&
-          (!year || recordYear === year)
-        );
-      });
-    }
-
-    // Tìm kiếm theo vaccine_name hoặc vaccine_type_name
-    if (searchQuery) {
-      filtered = filtered.filter((record) =>
-        record.vaccine_name.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        (record.vaccine_type_name && record.vaccine_type_name.toLowerCase().includes(searchQuery.toLowerCase()))
-      );
-    }
-
-    const startIndex = (pageNum - 1) * itemsPerPage;
-    const endIndex = startIndex + itemsPerPage;
-    const paginatedRecords = filtered.slice(startIndex, endIndex);
-
-    setFilteredRecords((prev) =>
-      pageNum === 1 ? paginatedRecords : [...prev, ...paginatedRecords]
-    );
-  };
-
-  const loadMoreRecords = () => {
-    if (isLoadingMore || filteredRecords.length >= vaccinationRecords.length) return;
-
-    setIsLoadingMore(true);
-    const nextPage = page + 1;
-    filterRecords(vaccinationRecords, q, filterMonth, filterYear, nextPage);
-    setPage(nextPage);
-    setIsLoadingMore(false);
-  };
-
   // Xử lý áp dụng bộ lọc
   const applyFilter = () => {
     const validation = validateDate(filterMonth, filterYear);
@@ -111,8 +63,7 @@ const DownloadCertificate = ({ navigation }) => {
       Alert.alert("Lỗi", validation.error);
       return;
     }
-    setPage(1);
-    filterRecords(vaccinationRecords, q, filterMonth, filterYear, 1);
+    setFilter({ month: filterMonth, year: filterYear });
     setIsFilterVisible(false);
   };
 
@@ -121,8 +72,7 @@ const DownloadCertificate = ({ navigation }) => {
     setFilterMonth("");
     setFilterYear("");
     setQ(""); // Xóa từ khóa tìm kiếm khi xóa bộ lọc
-    setPage(1);
-    filterRecords(vaccinationRecords, "", "", "", 1);
+    setFilter({ month: "", year: "" });
     setIsFilterVisible(false);
   };
 
@@ -144,13 +94,6 @@ const DownloadCertificate = ({ navigation }) => {
     return { isValid: true };
   };
 
-  // Xử lý tìm kiếm
-  const search = (value) => {
-    setQ(value);
-    setPage(1);
-    filterRecords(vaccinationRecords, value, filterMonth, filterYear, 1);
-  };
-
   const handleDownload = async (recordId) => {
     try {
       setDownloadingId(recordId);
@@ -257,7 +200,7 @@ const DownloadCertificate = ({ navigation }) => {
       <View style={styles.searchContainer}>
         <Searchbar
           placeholder="Nhập tên hoặc loại vaccine"
-          onChangeText={search}
+          onChangeText={setQ}
           value={q}
           style={styles.searchbar}
           inputStyle={styles.searchbarInput}
@@ -270,21 +213,21 @@ const DownloadCertificate = ({ navigation }) => {
       ) : (
         <View style={styles.contentContainer}>
           <FlatList
-            data={filteredRecords}
+            data={vaccinationRecords}
             renderItem={renderVaccinationRecord}
             keyExtractor={(item) => item.id.toString()}
             ListEmptyComponent={
               <Text style={styles.emptyText}>
-                {q || filterMonth || filterYear
+                {q || filter.month || filter.year
                   ? "Không tìm thấy lịch sử tiêm với bộ lọc này."
                   : "Không có lịch sử tiêm chủng để tải."}
               </Text>
             }
             contentContainerStyle={styles.listContainer}
-            onEndReached={loadMoreRecords}
+            onEndReached={loadMore}
             onEndReachedThreshold={0.5}
             ListFooterComponent={
-              isLoadingMore ? (
+              loadingMore ? (
                 <ActivityIndicator size="small" color="#0c5776" style={styles.loader} />
               ) : null
             }
@@ -1,136 +1,69 @@
 import React, { useState, useEffect } from "react";
 import { View, Text, FlatList, TouchableOpacity, StatusBar, StyleSheet, ActivityIndicator, Modal, Alert, Switch } from "react-native";
 import { MaterialCommunityIcons } from "@expo/vector-icons";
-import AsyncStorage from "@react-native-async-storage/async-storage";
-import { authApis, endpoints } from "../../configs/Apis";
+import { endpoints, pastSchedulesParams } from "../../configs/Apis";
+import usePagedList from "../../configs/usePagedList";
 import { Searchbar } from "react-native-paper";
 import { Picker } from "@react-native-picker/picker";
 
 const InjectionSearch = ({ navigation }) => {
-  const [schedules, setSchedules] = useState([]);
-  const [filteredSchedules, setFilteredSchedules] = useState([]);
+  const { items: schedules, loading, loadingMore, load, loadMore } = usePagedList();
   const [sites, setSites] = useState([]);
-  const [loading, setLoading] = useState(false);
   const [filterSite, setFilterSite] = useState("");
+  const [site, setSite] = useState(""); // Địa điểm đang lọc
   const [isFilterVisible, setIsFilterVisible] = useState(false);
-  const [page, setPage] = useState(1);
-  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [q, setQ] = useState("");
   const [showPastSchedules, setShowPastSchedules] = useState(false);
-  const itemsPerPage = 4;
 
+  // Server tìm theo tên / loại vaccine và lọc địa điểm, khoảng ngày; chờ ngừng gõ rồi mới tải lại
   useEffect(() => {
-    fetchSchedules();
-  }, [showPastSchedules]);
+    const timer = setTimeout(() => fetchSchedules(), 300);
+    return () => clearTimeout(timer);
+  }, [q, site, showPastSchedules]);
+
+  // Danh sách địa điểm để lọc gom từ các lịch đã tải (người dân không gọi được API điểm tiêm)
+  useEffect(() => {
+    setSites((prev) => {
+      const known = new Set(prev.map((item) => item.id));
+      const added = [];
+      schedules.forEach((schedule) => {
+        if (!schedule.site_name || known.has(schedule.site)) return;
+        known.add(schedule.site);
+        added.push({ id: schedule.site, name: schedule.site_name });
+      });
+      return added.length ? [...prev, ...added] : prev;
+    });
+  }, [schedules]);
 
   const fetchSchedules = async () => {
+    const params = showPastSchedules ? pastSchedulesParams() : {};
+    if (q.trim()) params.q = q.trim();
+    if (site) params.site = site;
     try {
-      setLoading(true);
-      const token = await AsyncStorage.getItem("token");
-      const endpoint = showPastSchedules
-        ? endpoints["allSchedules"] || "/api/schedules/"
-        : endpoints["upcomingSchedules"] || "/api/schedules/upcoming/";
-      console.log("Fetching schedules from:", endpoint);
-      const response = await authApis(token).get(endpoint);
-      console.log("Schedules API response:", JSON.stringify(response.data, null, 2));
-
-      const sortedSchedules = response.data.sort((a, b) =>
-        showPastSchedules
-          ? new Date(b.date) - new Date(a.date)
-          : new Date(a.date) - new Date(b.date)
-      );
-
-      // Lọc client-side
-      const filteredData = showPastSchedules
-        ? sortedSchedules.filter((schedule) => new Date(schedule.date).getTime() < new Date().setHours(0, 0, 0, 0)) 
-        : sortedSchedules.filter((schedule) => new Date(schedule.date).getTime() >= new Date().setHours(0, 0, 0, 0));
-
-      const uniqueSites = [
-        ...new Set(
-          sortedSchedules
-            .filter((schedule) => schedule.site_name)
-            .map((schedule) => schedule.site_name)
-        ),
-      ].map((name, index) => ({ id: index + 1, name }));
-      console.log("Unique sites:", JSON.stringify(uniqueSites));
-
-      setSites(uniqueSites);
-      setSchedules(filteredData);
-      filterSchedules(filteredData, q, filterSite, 1);
+      await load(endpoints["searchSchedules"], params);
     } catch (error) {
       console.error("Error fetching schedules:", error);
       Alert.alert("Lỗi", "Không thể tải danh sách lịch tiêm.");
-      setSchedules([]);
-      setFilteredSchedules([]);
-      setSites([]);
-    } finally {
-      setLoading(false);
-    }
-  };
-
-  const filterSchedules = (data, searchQuery, site, pageNum) => {
-    let filtered = data;
-
-    if (site) {
-      filtered = filtered.filter((schedule) => schedule.site_name === site);
     }
-
-    if (searchQuery) {
-      filtered = filtered.filter((schedule) =>
-        (schedule.vaccine_name &&
-          schedule.vaccine_name.toLowerCase().includes(searchQuery.toLowerCase())) ||
-        (schedule.vaccine_type_name &&
-          schedule.vaccine_type_name.toLowerCase().includes(searchQuery.toLowerCase()))
-      );
-    }
-
-    const startIndex = (pageNum - 1) * itemsPerPage;
-    const endIndex = startIndex + itemsPerPage;
-    const paginatedSchedules = filtered.slice(startIndex, endIndex);
-
-    setFilteredSchedules((prev) =>
-      pageNum === 1 ? paginatedSchedules : [...prev, ...paginatedSchedules]
-    );
-  };
-
-  const loadMore = () => {
-    if (isLoadingMore || filteredSchedules.length >= schedules.length) return;
-
-    setIsLoadingMore(true);
-    const nextPage = page + 1;
-    filterSchedules(schedules, q, filterSite, nextPage);
-    setPage(nextPage);
-    setIsLoadingMore(false);
-  };
-
-  // Xử lý tìm kiếm
-  const search = (value) => {
-    setQ(value);
-    setPage(1);
-    filterSchedules(schedules, value, filterSite, 1);
   };
 
   // Áp dụng bộ lọc
   const applyFilter = () => {
-    setPage(1);
-    filterSchedules(schedules, q, filterSite, 1);
+    setSite(filterSite);
     setIsFilterVisible(false);
   };
 
   // Xóa bộ lọc
   const clearFilter = () => {
     setFilterSite("");
+    setSite("");
     setQ("");
-    setPage(1);
-    filterSchedules(schedules, "", "", 1);
     setIsFilterVisible(false);
   };
 
   // Toggle lịch cũ
   const togglePastSchedules = () => {
     setShowPastSchedules((prev) => !prev);
-    setPage(1);
-    setFilteredSchedules([]);
   };
 
   const renderSchedule = ({ item }) => (
@@ -172,7 +105,7 @@ const InjectionSearch = ({ navigation }) => {
       <View style={styles.searchContainer}>
         <Searchbar
           placeholder="Tìm kiếm theo tên hoặc loại vaccine"
-          onChangeText={search}
+          onChangeText={setQ}
           value={q}
           style={styles.searchbar}
           inputStyle={styles.searchbarInput}
@@ -196,12 +129,12 @@ const InjectionSearch = ({ navigation }) => {
       ) : (
         <View style={styles.contentContainer}>
           <FlatList
-            data={filteredSchedules}
+            data={schedules}
             renderItem={renderSchedule}
             keyExtractor={(item) => item.id.toString()}
             ListEmptyComponent={
               <Text style={styles.emptyText}>
-                {q || filterSite
+                {q || site
                   ? "Không tìm thấy lịch tiêm với bộ lọc này."
                   : "Không có lịch tiêm."}
               </Text>
@@ -210,7 +143,7 @@ const InjectionSearch = ({ navigation }) => {
             onEndReached={loadMore}
             onEndReachedThreshold={0.5}
             ListFooterComponent={
-              isLoadingMore ? (
+              loadingMore ? (
                 <ActivityIndicator size="small" color="#0c5776" style={styles.loader} />
               ) : null
             }
@@ -235,7 +168,7 @@ const InjectionSearch = ({ navigation }) => {
               >
                 <Picker.Item label="Tất cả" value="" />
                 {sites.map((site) => (
-                  <Picker.Item key={site.id} label={site.name} value={site.name} />
+                  <Picker.Item key={site.id} label={site.name} value={site.id} />
                 ))}
               </Picker>
             </View>
@@ -1,8 +1,8 @@
 import React, { useState, useEffect } from "react";
 import { View, Text, FlatList, TouchableOpacity, StatusBar, StyleSheet, ActivityIndicator, Alert, Modal} from "react-native";
 import { MaterialCommunityIcons } from "@expo/vector-icons";
-import AsyncStorage from "@react-native-async-storage/async-storage";
-import { authApis, endpoints } from "../../configs/Apis";
+import { endpoints } from "../../configs/Apis";
+import usePagedList from "../../configs/usePagedList";
 import { Searchbar } from "react-native-paper";
 import { Picker } from "@react-native-picker/picker";
 
@@ -12,101 +12,34 @@ const vietnameseMonths = [
 ];
 
 const RecordSearch = ({ navigation }) => {
-  const [vaccinationRecords, setVaccinationRecords] = useState([]);
-  const [filteredRecords, setFilteredRecords] = useState([]);
-  const [displayedRecords, setDisplayedRecords] = useState([]);
-  const [loading, setLoading] = useState(false);
-  const [page, setPage] = useState(1);
-  const pageSize = 4;
+  const { items: vaccinationRecords, loading, loadingMore, load, loadMore } = usePagedList();
   const [q, setQ] = useState("");
   const [filterMonth, setFilterMonth] = useState(""); // Bộ lọc tháng
   const [filterYear, setFilterYear] = useState(""); // Bộ lọc năm
+  const [filter, setFilter] = useState({ month: "", year: "" }); // Bộ lọc đang áp dụng
   const [isFilterVisible, setIsFilterVisible] = useState(false);
 
   const months = Array.from({ length: 12 }, (_, i) => (i + 1).toString().padStart(2, "0"));
   const currentYear = new Date().getFullYear();
   const years = Array.from({ length: currentYear - 1900 + 1 }, (_, i) => (currentYear - i).toString());
 
+  // Server lọc theo tên / loại vaccine, tháng, năm và trả về ngày tiêm gần nhất trước
   useEffect(() => {
-    fetchRecordSearch();
-  }, []);
+    const timer = setTimeout(() => fetchRecordSearch(), 300);
+    return () => clearTimeout(timer);
+  }, [q, filter]);
 
   const fetchRecordSearch = async () => {
+    const params = {};
+    if (q.trim()) params.q = q.trim();
+    if (filter.month) params.month = filter.month;
+    if (filter.year) params.year = filter.year;
     try {
-      setLoading(true);
-      const token = await AsyncStorage.getItem("token");
-      const response = await authApis(token).get(endpoints["recordSearch"]);
-
-      // Sắp xếp theo ngày tiêm gần nhất đến xa nhất
-      const sortedRecords = response.data.sort(
-        (a, b) => new Date(b.injection_date) - new Date(a.injection_date)
-      );
-
-      setVaccinationRecords(sortedRecords);
-      filterRecords(sortedRecords, q, filterMonth, filterYear);
+      await load(endpoints["recordSearch"], params);
     } catch (error) {
       console.error("Error fetching vaccination history:", error);
       Alert.alert("Lỗi", "Không thể tải lịch sử tiêm chủng.");
-    } finally {
-      setLoading(false);
-    }
-  };
-
-  const filterRecords = (records, searchQuery, month, year) => {
-    let filtered = records;
-
-    // Lọc theo tháng và năm
-    if (month || year) {
-      filtered = filtered.filter((record) => {
-        const recordDate = new Date(record.injection_date);
-        const recordMonth = (recordDate.getMonth() + 1).toString().padStart(2, "0");
-        const recordYear = recordDate.getFullYear().toString();
-        return (
-          (!month || recordMonth === month) &&
-          (!year || recordYear === year)
-        );
-      });
-    }
-
-    if (searchQuery) {
-      filtered = filtered.filter((record) =>
-        record.vaccine_name.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        (record.vaccine_type_name && record.vaccine_type_name.toLowerCase().includes(searchQuery.toLowerCase()))
-      );
-    }
-
-    setFilteredRecords(filtered);
-
-    setDisplayedRecords(filtered.slice(0, pageSize));
-    setPage(1);
-
-    console.log("filterRecords - Total filtered records:", filtered.length);
-    console.log("filterRecords - Displayed records (initial):", filtered.slice(0, pageSize).length);
-    console.log("filterRecords - Current page:", 1);
-  };
-
-  const loadMoreRecords = () => {
-    console.log("loadMoreRecords - Triggered");
-    console.log("loadMoreRecords - Current displayed records:", displayedRecords.length);
-    console.log("loadMoreRecords - Total filtered records:", filteredRecords.length);
-
-    if (displayedRecords.length >= filteredRecords.length) {
-      console.log("loadMoreRecords - No more records to load");
-      return;
     }
-
-    const nextPage = page + 1;
-    const newRecords = filteredRecords.slice(0, nextPage * pageSize);
-    setDisplayedRecords(newRecords);
-    setPage(nextPage);
-
-    console.log("loadMoreRecords - New page:", nextPage);
-    console.log("loadMoreRecords - New displayed records:", newRecords.length);
-  };
-
-  const search = (value) => {
-    setQ(value);
-    filterRecords(vaccinationRecords, value, filterMonth, filterYear);
   };
 
   // Xử lý áp dụng bộ lọc
@@ -116,7 +49,7 @@ const RecordSearch = ({ navigation }) => {
       Alert.alert("Lỗi", validation.error);
       return;
     }
-    filterRecords(vaccinationRecords, q, filterMonth, filterYear);
+    setFilter({ month: filterMonth, year: filterYear });
     setIsFilterVisible(false);
   };
 
@@ -124,7 +57,7 @@ const RecordSearch = ({ navigation }) => {
   const clearFilter = () => {
     setFilterMonth("");
     setFilterYear("");
-    filterRecords(vaccinationRecords, q, "", "");
+    setFilter({ month: "", year: "" });
     setIsFilterVisible(false);
   };
 
@@ -181,7 +114,7 @@ const RecordSearch = ({ navigation }) => {
       <View style={styles.searchContainer}>
         <Searchbar
           placeholder="Nhập tên hoặc loại vaccine"
-          onChangeText={search}
+          onChangeText={setQ}
           value={q}
           style={styles.searchbar}
           inputStyle={styles.searchbarInput}
@@ -193,21 +126,21 @@ const RecordSearch = ({ navigation }) => {
         <ActivityIndicator size="large" color="#0c5776" style={styles.loader} />
       ) : (
         <FlatList
-          data={displayedRecords}
+          data={vaccinationRecords}
           renderItem={renderVaccinationRecord}
           keyExtractor={(item) => item.id.toString()}
-          onEndReached={loadMoreRecords}
+          onEndReached={loadMore}
           onEndReachedThreshold={0.5}
           ListEmptyComponent={
             <Text style={styles.emptyText}>
-              {q || filterMonth || filterYear
+              {q || filter.month || filter.year
                 ? "Không tìm thấy lịch sử tiêm với bộ lọc này."
                 : "Không có lịch sử tiêm chủng."}
             </Text>
           }
           contentContainerStyle={styles.listContainer}
           ListFooterComponent={
-            displayedRecords.length < filteredRecords.length && (
+            loadingMore && (
               <ActivityIndicator size="small" color="#0c5776" style={styles.footerLoader} />
             )
           }
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from "react";
 import { View, Text, FlatList, TouchableOpacity, StatusBar, StyleSheet, Switch, Alert, ActivityIndicator } from "react-native";
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import AsyncStorage from "@react-native-async-storage/async-storage";
-import { authApis, endpoints } from "../../configs/Apis";
+import { authApis, endpoints, fetchAll } from "../../configs/Apis";
 
 const Reminders = ({ navigation }) => {
   const [appointments, setAppointments] = useState([]);
@@ -25,7 +25,7 @@ const Reminders = ({ navigation }) => {
         throw new Error("Endpoint 'appointment' không trả về chuỗi hợp lệ.");
       }
 
-      const response = await authApis(token).get(appointmentEndpoint);
+      const response = await fetchAll(authApis(token), appointmentEndpoint);
       console.log("Appointments API response:", JSON.stringify(response.data, null, 2));
 
       // Lọc các lịch hẹn: is_confirmed = true và ngày trong tương lai
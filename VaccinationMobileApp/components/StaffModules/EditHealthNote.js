@@ -3,59 +3,34 @@ import { View, Text, FlatList, TextInput, TouchableOpacity, StatusBar, StyleShee
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import AsyncStorage from "@react-native-async-storage/async-storage";
 import { authApis, endpoints } from "../../configs/Apis";
+import usePagedList from "../../configs/usePagedList";
 
 const EditHealthNote = ({ navigation }) => {
-  const [records, setRecords] = useState([]);
-  const [filteredRecords, setFilteredRecords] = useState([]);
-  const [displayedRecords, setDisplayedRecords] = useState([]);
-  const [loading, setLoading] = useState(true);
+  const { items: records, setItems: setRecords, loading, loadingMore, load, loadMore } = usePagedList();
   const [searchQuery, setSearchQuery] = useState("");
   const [saving, setSaving] = useState({});
   const [notes, setNotes] = useState({});
-  const [page, setPage] = useState(1);
-  const pageSize = 4;
 
+  // Tìm theo mã hồ sơ / người được tiêm phía server, chờ ngừng gõ rồi mới tải lại
   useEffect(() => {
-    fetchRecords();
-  }, []);
+    const timer = setTimeout(() => fetchRecords(searchQuery.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
 
-  const fetchRecords = async () => {
-    try {
-      setLoading(true);
-      const token = await AsyncStorage.getItem("token");
-      if (!token) throw new Error("Token không tồn tại.");
-
-      console.log("Token from AsyncStorage:", token.substring(0, 10) + "...");
-      const url = endpoints["recordSearch"];
-      console.log("Fetching records from:", url);
-
-      const response = await authApis(token).get(url);
-
-      if (response.status !== 200) {
-        throw new Error(`Server returned status ${response.status}: ${JSON.stringify(response.data)}`);
-      }
-
-      console.log("Records API response:", JSON.stringify(response.data, null, 2));
-
-      if (!response.data || !Array.isArray(response.data)) {
-        throw new Error("Dữ liệu trả về không phải là danh sách hoặc rỗng.");
-      }
-
-      const recordsWithNotes = response.data.map((item) => ({
-        ...item,
-        health_note: item.health_note || "",
-      }));
-      setRecords(recordsWithNotes);
-      setFilteredRecords(recordsWithNotes);
-
-      const initialNotes = recordsWithNotes.reduce((acc, item) => {
-        acc[item.id] = item.health_note || "";
-        return acc;
-      }, {});
-      setNotes(initialNotes);
+  // Ghi chú ban đầu cho các hồ sơ mới tải về, giữ nguyên ghi chú đang sửa
+  useEffect(() => {
+    setNotes((prev) => {
+      const merged = { ...prev };
+      records.forEach((item) => {
+        if (!(item.id in merged)) merged[item.id] = item.health_note || "";
+      });
+      return merged;
+    });
+  }, [records]);
 
-      setDisplayedRecords(recordsWithNotes.slice(0, pageSize));
-      setPage(1);
+  const fetchRecords = async (query) => {
+    try {
+      await load(endpoints["recordSearch"], query ? { q: query } : {});
     } catch (error) {
       console.error("Error fetching records:", error.message, error.response?.data, error.response?.status);
       let errorMessage = `Không thể tải danh sách hồ sơ. Chi tiết: ${error.message}`;
@@ -67,43 +42,9 @@ const EditHealthNote = ({ navigation }) => {
         errorMessage = "Forbidden: Bạn không có quyền truy cập.";
       }
       Alert.alert("Lỗi", errorMessage);
-    } finally {
-      setLoading(false);
     }
   };
 
-  const handleSearch = (text) => {
-    setSearchQuery(text);
-    if (text) {
-      const filtered = records.filter(
-        (item) =>
-          item.id?.toString().includes(text) ||
-          (item.username || "").toLowerCase().includes(text.toLowerCase()) ||
-          (item.user?.first_name || "").toLowerCase().includes(text.toLowerCase()) ||
-          (item.user?.last_name || "").toLowerCase().includes(text.toLowerCase())
-      );
-      setFilteredRecords(filtered);
-      setDisplayedRecords(filtered.slice(0, pageSize));
-      setPage(1);
-    } else {
-      setFilteredRecords(records);
-      setDisplayedRecords(records.slice(0, pageSize));
-      setPage(1);
-    }
-  };
-
-  const loadMoreRecords = () => {
-    if (displayedRecords.length >= filteredRecords.length) return;
-
-    const nextPage = page + 1;
-    const newRecords = filteredRecords.slice(0, nextPage * pageSize);
-    setDisplayedRecords(newRecords);
-    setPage(nextPage);
-
-    console.log("loadMoreRecords - New page:", nextPage);
-    console.log("loadMoreRecords - New displayed records:", newRecords.length);
-  };
-
   const updateHealthNote = async (recordId, currentNote) => {
     setSaving((prev) => ({ ...prev, [recordId]: true }));
 
@@ -134,16 +75,6 @@ const EditHealthNote = ({ navigation }) => {
                 item.id === recordId ? { ...item, health_note: currentNote || "" } : item
               )
             );
-            setFilteredRecords((prev) =>
-              prev.map((item) =>
-                item.id === recordId ? { ...item, health_note: currentNote || "" } : item
-              )
-            );
-            setDisplayedRecords((prev) =>
-              prev.map((item) =>
-                item.id === recordId ? { ...item, health_note: currentNote || "" } : item
-              )
-            );
             Alert.alert("Thành công", "Ghi chú đã được cập nhật!");
           } catch (error) {
             console.error("Error updating health note:", error.response?.data || error.message);
@@ -211,7 +142,7 @@ const EditHealthNote = ({ navigation }) => {
   };
 
   const renderFooter = () => {
-    if (displayedRecords.length >= filteredRecords.length) return null;
+    if (!loadingMore) return null;
     return (
       <View style={styles.footerLoader}>
         <ActivityIndicator size="small" color="#0c5776" />
@@ -236,7 +167,7 @@ const EditHealthNote = ({ navigation }) => {
           style={styles.searchInput}
           placeholder="Nhập ID hồ sơ hoặc tên người dùng"
           value={searchQuery}
-          onChangeText={handleSearch}
+          onChangeText={setSearchQuery}
           autoCapitalize="none"
         />
       </View>
@@ -245,12 +176,12 @@ const EditHealthNote = ({ navigation }) => {
         <ActivityIndicator size="large" color="#0c5776" style={styles.loader} />
       ) : (
         <FlatList
-          data={displayedRecords}
+          data={records}
           renderItem={renderItem}
           keyExtractor={(item) => item.id?.toString()}
           ListEmptyComponent={<Text style={styles.emptyText}>Không có hồ sơ nào.</Text>}
           contentContainerStyle={styles.listContainer}
-          onEndReached={loadMoreRecords}
+          onEndReached={loadMore}
           onEndReachedThreshold={0.5}
           ListFooterComponent={renderFooter}
         />
@@ -3,48 +3,21 @@ import { View, Text, FlatList, TextInput, TouchableOpacity, StatusBar, StyleShee
 import { MaterialCommunityIcons } from "@expo/vector-icons";
 import AsyncStorage from "@react-native-async-storage/async-storage";
 import { authApis, endpoints } from "../../configs/Apis";
+import usePagedList from "../../configs/usePagedList";
 
 const RecordManagement = ({ navigation }) => {
-  const [appointments, setAppointments] = useState([]);
-  const [filteredAppointments, setFilteredAppointments] = useState([]);
-  const [displayedAppointments, setDisplayedAppointments] = useState([]);
-  const [loading, setLoading] = useState(true);
+  const { items: appointments, setItems: setAppointments, loading, loadingMore, load, loadMore } = usePagedList();
   const [searchQuery, setSearchQuery] = useState("");
-  const [page, setPage] = useState(1);
-  const pageSize = 4;
 
+  // Tìm theo mã lịch hẹn / tên tài khoản phía server, chờ người dùng ngừng gõ rồi mới tải lại
   useEffect(() => {
-    fetchAppointments();
-  }, []);
+    const timer = setTimeout(() => fetchAppointments(searchQuery.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
 
-  const fetchAppointments = async () => {
+  const fetchAppointments = async (query) => {
     try {
-      setLoading(true);
-      const token = await AsyncStorage.getItem("token");
-      if (!token) throw new Error("Token không tồn tại.");
-
-      console.log("Token from AsyncStorage:", token.substring(0, 10) + "...");
-
-      const endpoint = endpoints["allAppointment"];
-      if (!endpoint) throw new Error("Endpoint 'allAppointment' không được định nghĩa.");
-      console.log("Fetching appointments from endpoint:", endpoint);
-
-      const response = await authApis(token).get(endpoint);
-
-      if (response.status !== 200) {
-        throw new Error(`Server returned status ${response.status}: ${JSON.stringify(response.data)}`);
-      }
-
-      console.log("Appointments API response:", JSON.stringify(response.data, null, 2));
-
-      if (!response.data || !Array.isArray(response.data)) {
-        throw new Error("Dữ liệu trả về không phải là danh sách hoặc rỗng.");
-      }
-
-      setAppointments(response.data);
-      setFilteredAppointments(response.data);
-      setDisplayedAppointments(response.data.slice(0, pageSize));
-      setPage(1);
+      await load(endpoints["allAppointment"], query ? { q: query } : {});
     } catch (error) {
       console.error("Error fetching appointments:", error.message, error.response?.data, error.response?.status);
       let errorMessage = `Không thể tải danh sách cuộc hẹn. Chi tiết: ${error.message}`;
@@ -54,40 +27,9 @@ const RecordManagement = ({ navigation }) => {
         errorMessage = "Forbidden: Bạn không có quyền truy cập với vai trò staff.";
       }
       Alert.alert("Lỗi", errorMessage);
-    } finally {
-      setLoading(false);
-    }
-  };
-
-  const handleSearch = (text) => {
-    setSearchQuery(text);
-    if (text) {
-      const filtered = appointments.filter((item) =>
-        item.id?.toString().includes(text) ||
-        (item.user_name || "").toLowerCase().includes(text.toLowerCase())
-      );
-      setFilteredAppointments(filtered);
-      setDisplayedAppointments(filtered.slice(0, pageSize)); // Hiển thị trang đầu tiên sau tìm kiếm
-      setPage(1);
-    } else {
-      setFilteredAppointments(appointments);
-      setDisplayedAppointments(appointments.slice(0, pageSize)); // Hiển thị trang đầu tiên khi xóa tìm kiếm
-      setPage(1);
     }
   };
 
-  const loadMoreAppointments = () => {
-    if (displayedAppointments.length >= filteredAppointments.length) return;
-
-    const nextPage = page + 1;
-    const newAppointments = filteredAppointments.slice(0, nextPage * pageSize);
-    setDisplayedAppointments(newAppointments);
-    setPage(nextPage);
-
-    console.log("loadMoreAppointments - New page:", nextPage);
-    console.log("loadMoreAppointments - New displayed appointments:", newAppointments.length);
-  };
-
   const toggleStatus = async (appointmentId, field, currentValue) => {
     Alert.alert(
       "Xác nhận",
@@ -123,16 +65,6 @@ const RecordManagement = ({ navigation }) => {
                   item.id === appointmentId ? { ...item, [field]: !currentValue } : item
                 )
               );
-              setFilteredAppointments((prev) =>
-                prev.map((item) =>
-                  item.id === appointmentId ? { ...item, [field]: !currentValue } : item
-                )
-              );
-              setDisplayedAppointments((prev) =>
-                prev.map((item) =>
-                  item.id === appointmentId ? { ...item, [field]: !currentValue } : item
-                )
-              );
               Alert.alert("Thành công", `Đã cập nhật trạng thái ${field === "is_confirmed" ? "xác nhận" : "hoàn thành"}!`);
             } catch (error) {
               console.error(`Error updating ${field}:`, error.response?.data || error.message);
@@ -196,7 +128,7 @@ const RecordManagement = ({ navigation }) => {
   };
 
   const renderFooter = () => {
-    if (displayedAppointments.length >= filteredAppointments.length) return null;
+    if (!loadingMore) return null;
     return (
       <View style={styles.footerLoader}>
         <ActivityIndicator size="small" color="#0c5776" />
@@ -221,7 +153,7 @@ const RecordManagement = ({ navigation }) => {
           style={styles.searchInput}
           placeholder="Nhập ID hồ sơ hoặc tên người dùng"
           value={searchQuery}
-          onChangeText={handleSearch}
+          onChangeText={setSearchQuery}
           autoCapitalize="none"
         />
       </View>
@@ -230,14 +162,14 @@ const RecordManagement = ({ navigation }) => {
         <ActivityIndicator size="large" color="#0c5776" style={styles.loader} />
       ) : (
         <FlatList
-          data={displayedAppointments}
+          data={appointments}
           renderItem={renderItem}
           keyExtractor={(item) => item.id?.toString()}
           ListEmptyComponent={
             <Text style={styles.emptyText}>Không có cuộc hẹn nào.</Text>
           }
           contentContainerStyle={styles.listContainer}
-          onEndReached={loadMoreAppointments}
+          onEndReached={loadMore}
           onEndReachedThreshold={0.5}
           ListFooterComponent={renderFooter}
         />
@@ -1,7 +1,9 @@
 import React, { useState, useEffect, useRef } from "react";
 import { View, Text, TextInput, TouchableOpacity, FlatList, StyleSheet, KeyboardAvoidingView, Platform } from "react-native";
 import { MaterialCommunityIcons } from "@expo/vector-icons";
-import { database, ref, onValue, push, set, update } from "../../components/Home/firebase";
+import AsyncStorage from "@react-native-async-storage/async-storage";
+import { authApis, endpoints } from "../../configs/Apis";
+import { database, ref, onValue } from "../../components/Home/firebase";
 
 const StaffChatDetail = ({ route, navigation }) => {
   const { userId, userName } = route.params;
@@ -17,7 +19,17 @@ const StaffChatDetail = ({ route, navigation }) => {
     }
   };
 
+  const markRead = async () => {
+    try {
+      const token = await AsyncStorage.getItem("token");
+      await authApis(token).post(endpoints.chatRead(userId));
+    } catch (error) {
+      console.error("Lỗi khi đánh dấu đã đọc:", error);
+    }
+  };
+
   useEffect(() => {
+    markRead();
     const messagesRef = ref(database, `chats/${userId}`);
     const unsubscribe = onValue(messagesRef, (snapshot) => {
       const data = snapshot.val();
@@ -43,48 +55,16 @@ const StaffChatDetail = ({ route, navigation }) => {
     const trimmedText = inputText.trim();
     if (!trimmedText) return;
 
-    const staffMessage = {
-      text: trimmedText,
-      sender: "Staff",
-      timestamp: Date.now(),
-      is_user: false,
-    };
-
     setInputText("");
 
-    // Gửi tin nhắn vào chats
-    const messagesRef = ref(database, `chats/${userId}`);
-    const newMessageKey = push(messagesRef);
-    await set(newMessageKey, staffMessage);
-
-    // Cập nhật staff_chats với tin nhắn mới
-    const staffChatRef = ref(database, "staff_chats");
-    const queryRef = ref(database, `staff_chats`);
-    onValue(queryRef, async (snapshot) => {
-      const data = snapshot.val();
-      if (data) {
-        let found = false;
-        for (const chatId in data) {
-          if (data[chatId].user_id === userId) {
-            await update(ref(database, `staff_chats/${chatId}`), {
-              last_message: trimmedText,
-              timestamp: Date.now(),
-            });
-            found = true;
-            break;
-          }
-        }
-        if (!found) {
-          const newStaffChatRef = push(staffChatRef);
-          await set(newStaffChatRef, {
-            user_id: userId,
-            user_name: userName,
-            last_message: trimmedText,
-            timestamp: Date.now(),
-          });
-        }
-      }
-    }, { onlyOnce: true });
+    // Server lưu tin nhắn và cập nhật hộp thư (trả lời cũng đánh dấu đã đọc) rồi đẩy sang Firebase
+    try {
+      const token = await AsyncStorage.getItem("token");
+      await authApis(token).post(endpoints.chatMessages, { message: trimmedText, user_id: userId });
+    } catch (error) {
+      console.error("Lỗi khi gửi tin nhắn:", error);
+      setInputText(trimmedText);
+    }
   };
 
   const renderMessage = ({ item }) => (
@@ -1,43 +1,46 @@
 import React, { useState, useEffect } from "react";
 import { View, Text, FlatList, TouchableOpacity, StyleSheet, ActivityIndicator } from "react-native";
 import { MaterialCommunityIcons } from "@expo/vector-icons";
+import AsyncStorage from "@react-native-async-storage/async-storage";
+import { authApis, endpoints } from "../../configs/Apis";
 import { database, ref, onValue } from "../../components/Home/firebase";
 
 const StaffChatScreen = ({ navigation }) => {
   const [chats, setChats] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [next, setNext] = useState(null);
 
-  useEffect(() => {
-    const chatsRef = ref(database, "staff_chats");
-    const unsubscribe = onValue(chatsRef, (snapshot) => {
-      const data = snapshot.val();
-      if (data) {
-        const chatList = Object.keys(data)
-          .map((key) => ({
-            id: key,
-            ...data[key],
-            timestamp: data[key].timestamp
-              ? new Date(data[key].timestamp).toLocaleTimeString("vi-VN", {
-                  hour: "2-digit",
-                  minute: "2-digit",
-                })
-              : "Vừa xong",
-          }))
-          .sort((a, b) => {
-            // Sắp xếp theo thời gian giảm dần
-            const timestampA = data[a.id].timestamp || 0;
-            const timestampB = data[b.id].timestamp || 0;
-            return timestampB - timestampA;
-          });
-        setChats(chatList);
-      } else {
-        setChats([]);
-      }
+  // Hộp thư lấy từ server (mới nhất trước, phân trang cursor); append = tải thêm trang `url`
+  const loadInbox = async (url = endpoints.chatInbox, append = false) => {
+    try {
+      const token = await AsyncStorage.getItem("token");
+      const response = await authApis(token).get(url);
+      const page = response.data.results.map((item) => ({
+        ...item,
+        timestamp: new Date(item.last_message_at).toLocaleTimeString("vi-VN", {
+          hour: "2-digit",
+          minute: "2-digit",
+        }),
+      }));
+      setChats((prev) => (append ? [...prev, ...page] : page));
+      setNext(response.data.next);
+    } catch (error) {
+      console.error("Lỗi khi tải danh sách chat:", error);
+    } finally {
       setLoading(false);
-    });
+    }
+  };
 
-    return () => unsubscribe();
-  }, []);
+  useEffect(() => {
+    // staff_chats trên Firebase chỉ dùng làm tín hiệu có tin nhắn mới, dữ liệu đọc lại từ server
+    const unsubscribe = onValue(ref(database, "staff_chats"), () => loadInbox());
+    const unsubscribeFocus = navigation.addListener("focus", () => loadInbox());
+
+    return () => {
+      unsubscribe();
+      unsubscribeFocus();
+    };
+  }, [navigation]);
 
   const handleChatPress = (userId, userName) => {
     navigation.navigate("StaffChatDetail", { userId, userName });
@@ -49,7 +52,10 @@ const StaffChatScreen = ({ navigation }) => {
       onPress={() => handleChatPress(item.user_id, item.user_name)}
     >
       <View style={styles.chatInfo}>
-        <Text style={styles.chatUserName}>{item.user_name}</Text>
+        <Text style={styles.chatUserName}>
+          {item.user_name}
+          {item.unread_count > 0 ? ` (${item.unread_count})` : ""}
+        </Text>
         <Text style={styles.chatLastMessage} numberOfLines={1}>
           {item.last_message}
         </Text>
@@ -79,8 +85,9 @@ const StaffChatScreen = ({ navigation }) => {
       <FlatList
         data={chats}
         renderItem={renderChatItem}
-        keyExtractor={(item) => item.id}
+        keyExtractor={(item) => String(item.user_id)}
         contentContainerStyle={styles.chatList}
+        onEndReached={() => next && loadInbox(next, true)}
         ListEmptyComponent={
           <Text style={styles.emptyText}>Không có cuộc chat nào</Text>
         }
@@ -12,6 +12,7 @@ export const endpoints = {
   injectionSites: "sites/",
   allSchedules: "schedules/",
   upcomingSchedules: "schedules/upcoming_schedules/",
+  searchSchedules: "schedules/search/",
   appointment: (id) => (id ? `appointment/${id}/` : "appointment/"),
   allAppointment: "appointments/all/",
   confirmAppointment: (id) => `appointments/${id}/mark-confirm/`,
@@ -23,7 +24,9 @@ export const endpoints = {
   toggleReminder: (id) => `/appointment/${id}/toggle-reminder/`,
   records: (recordId) => `records/${recordId}/add-health-note/`,
   user: (id) => (id ? `users/${id}/` : "users/"),
-  chatMessages: "chat-messages/",
+  chatMessages: "chat/messages/",
+  chatInbox: "chat/inbox/",
+  chatRead: (userId) => `chat/inbox/${userId}/read/`,
   aiChat: "ai-chat/",
 };
 
@@ -36,6 +39,41 @@ export const authApis = (token) => {
   });
 };
 
+// Các API danh sách trả về trang cursor { results, next, previous }: đọc lần lượt các trang theo link next
+// và trả về response có data là mảng gộp, để các màn hình vẫn dùng response.data như một mảng.
+// Chỉ dùng cho danh sách nhỏ có giới hạn (loại vaccine, vaccine, điểm tiêm, lịch hẹn của chính người dùng);
+// danh sách lớn (người dùng, hồ sơ, lịch hẹn, lịch tiêm) tải từng trang bằng fetchPage / usePagedList
+export const fetchAll = async (api, url, config = {}) => {
+  const first = await api.get(url, { ...config, params: { page_size: 100, ...(config.params || {}) } });
+  if (!first.data || !Array.isArray(first.data.results)) return first;
+  const items = [...first.data.results];
+  let next = first.data.next;
+  while (next) {
+    const page = await api.get(next, { headers: config.headers });
+    items.push(...page.data.results);
+    next = page.data.next;
+  }
+  return { ...first, data: items };
+};
+
+// Tải một trang: url là endpoint (kèm params lọc) hoặc link next của trang trước
+export const fetchPage = async (api, url, params) => {
+  const response = await api.get(url, params ? { params } : undefined);
+  return { items: response.data.results, next: response.data.next };
+};
+
+// Tham số schedules/search cho lịch tiêm cũ: đến hết hôm qua, gần nhất trước
+export const pastSchedulesParams = () => {
+  const yesterday = new Date();
+  yesterday.setDate(yesterday.getDate() - 1);
+  const dateTo = [
+    yesterday.getFullYear(),
+    (yesterday.getMonth() + 1).toString().padStart(2, "0"),
+    yesterday.getDate().toString().padStart(2, "0"),
+  ].join("-");
+  return { date_from: "1900-01-01", date_to: dateTo, order: "desc" };
+};
+
 export default axios.create({
   baseURL: BASE_URL,
 });
\ No newline at end of file
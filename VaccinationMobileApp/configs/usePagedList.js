@@ -0,0 +1,50 @@
+import { useRef, useState } from "react";
+import AsyncStorage from "@react-native-async-storage/async-storage";
+import { authApis, fetchPage } from "./Apis";
+
+// Danh sách tải theo trang: load(url, params) đọc lại trang đầu (khi mở màn hình hoặc đổi bộ lọc),
+// loadMore() gắn vào onEndReached của FlatList để đọc trang kế theo link next
+const usePagedList = () => {
+  const [items, setItems] = useState([]);
+  const [next, setNext] = useState(null);
+  const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Gõ tìm kiếm liên tục: bỏ kết quả của các lần load cũ về sau lần mới nhất
+  const requestId = useRef(0);
+
+  const load = async (url, params) => {
+    const id = ++requestId.current;
+    setLoading(true);
+    try {
+      const token = await AsyncStorage.getItem("token");
+      if (!token) throw new Error("Token không tồn tại.");
+      const page = await fetchPage(authApis(token), url, { page_size: 20, ...params });
+      if (id !== requestId.current) return;
+      setItems(page.items);
+      setNext(page.next);
+    } finally {
+      if (id === requestId.current) setLoading(false);
+    }
+  };
+
+  const loadMore = async () => {
+    if (!next || loading || loadingMore) return;
+    const id = requestId.current;
+    setLoadingMore(true);
+    try {
+      const token = await AsyncStorage.getItem("token");
+      const page = await fetchPage(authApis(token), next);
+      if (id !== requestId.current) return;
+      setItems((prev) => [...prev, ...page.items]);
+      setNext(page.next);
+    } catch (error) {
+      console.error("Lỗi khi tải thêm trang:", error.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  return { items, setItems, next, loading, loadingMore, load, loadMore };
+};
+
+export default usePagedList;